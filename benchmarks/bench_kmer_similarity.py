@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Benchmark k-mer similarity engines on the example FASTA files.
+
+Compares the pairwise dictionary path (kmer_frequency + cosine_similarity)
+with the sparse count matrix and reduced-alphabet counting. Each example
+is padded with mutated copies of its sequences so the timings are not
+dominated by start-up costs.
+
+Usage:
+    python benchmarks/bench_kmer_similarity.py --copies 50 --kmer-size 6
+"""
+
+import argparse
+import glob
+import os
+import random
+import time
+import numpy as np
+
+from msaligner.orf_detection import process_sequences
+from msaligner.kmer_similarity import (
+    compute_kmer_similarity, kmer_frequency, cosine_similarity, use_dense_counts,
+    KMER_ALPHABETS
+)
+
+AMINO_ACIDS = 'ACDEFGHIKLMNPQRSTVWY'
+
+def dict_similarity(sequences, k):
+    """Pairwise cosine similarity with k-mer dictionaries."""
+    seq_ids = list(sequences)
+    freqs = [kmer_frequency(sequences[seq_id]['amino_acid'], k) for seq_id in seq_ids]
+    matrix = np.eye(len(seq_ids))
+    for i in range(len(seq_ids)):
+        for j in range(i + 1, len(seq_ids)):
+            matrix[i, j] = matrix[j, i] = cosine_similarity(freqs[i], freqs[j])
+    return matrix
+
+def with_copies(sequences, copies, mutation_rate, rng):
+    """Add mutated copies of every sequence."""
+    expanded = {seq_id: {'amino_acid': data['amino_acid']} for seq_id, data in sequences.items()}
+    for seq_id, data in sequences.items():
+        for copy in range(copies):
+            residues = [rng.choice(AMINO_ACIDS) if rng.random() < mutation_rate else aa
+                        for aa in data['amino_acid']]
+            expanded[f"{seq_id}_copy{copy}"] = {'amino_acid': ''.join(residues)}
+    return expanded
+
+def timed(function, *args, **kwargs):
+    """Run a function and return (result, seconds)."""
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--data', default=os.path.join(os.path.dirname(__file__), '..', 'data'),
+                        help='Directory with example*.fasta files')
+    parser.add_argument('--copies', type=int, default=50,
+                        help='Mutated copies added per sequence (default: 50)')
+    parser.add_argument('--mutation-rate', type=float, default=0.05,
+                        help='Per-residue substitution rate of the copies (default: 0.05)')
+    parser.add_argument('--kmer-size', type=int, default=6, help='k-mer size (default: 6)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+    args = parser.parse_args()
+    
+    rng = random.Random(args.seed)
+    k = args.kmer_size
+    print(f"{'file':<16}{'seqs':>6}  {'engine':<22}{'seconds':>9}  {'max |diff| vs dict':>18}")
+    
+    for fasta_file in sorted(glob.glob(os.path.join(args.data, 'example*.fasta'))):
+        sequences = with_copies(process_sequences(fasta_file), args.copies, args.mutation_rate, rng)
+        name = os.path.basename(fasta_file)
+        reference, seconds = timed(dict_similarity, sequences, k)
+        print(f"{name:<16}{len(sequences):>6}  {'dict':<22}{seconds:>9.3f}  {'-':>18}")
+        
+        for alphabet in KMER_ALPHABETS:
+            dense = use_dense_counts(len(sequences), k, alphabet)
+            engine = f"{alphabet} ({'dense' if dense else 'sparse'})"
+            (matrix, _), seconds = timed(compute_kmer_similarity, sequences, k, alphabet=alphabet)
+            diff = np.abs(matrix - reference).max()
+            print(f"{name:<16}{len(sequences):>6}  {engine:<22}{seconds:>9.3f}  {diff:>18.4f}")
+
+if __name__ == '__main__':
+    main()
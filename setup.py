@@ -11,6 +11,7 @@ setup(
     package_dir={"": "src"},
     install_requires=[
         "numpy>=1.21.0",
+        "scipy>=1.7.0",
         "pandas>=1.3.0",
         "matplotlib>=3.5.0",
         "biopython>=1.79",
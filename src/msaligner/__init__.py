@@ -12,6 +12,7 @@ __author__ = "Taylor C. Powell"
 from msaligner.orf_detection import detect_orf, translate_sequence
 from msaligner.kmer_similarity import compute_kmer_similarity, sort_sequences_by_similarity
 from msaligner.alignment import needleman_wunsch, progressive_alignment
+from msaligner.alignment_matrix import AlignmentMatrix
 from msaligner.back_translation import back_translate_single_sequence, create_codon_alignment
 from msaligner.statistics import calculate_codon_statistics
 from msaligner.visualization import plot_codon_variability
\ No newline at end of file
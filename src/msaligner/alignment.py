@@ -3,9 +3,16 @@
 Sequence alignment module using Needleman-Wunsch algorithm.
 """
 
+import heapq
 import logging
-from typing import Dict, Tuple, List
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Tuple, List, Optional
 import numpy as np
+from collections import Counter, defaultdict
+
+from msaligner.kmer_similarity import generate_kmers, paired_cosine_similarity
+from msaligner.alignment_matrix import AlignmentMatrix
+from msaligner.sequence_store import amino_acid_bytes
 
 # BLOSUM62 substitution matrix (complete, symmetric for standard 20 amino acids)
 # Amino acids: A R N D C Q E G H I L K M F P S T W Y V
@@ -54,9 +61,69 @@ def get_blosum_score(aa1: str, aa2: str) -> int:
         return -1
     return BLOSUM62.get((aa1, aa2), -4)  # Default penalty for uncommon pairs
 
-def needleman_wunsch(seq1: str, seq2: str, gap_penalty: int = -8) -> Tuple[str, str, float]:
+# Integer residue alphabet: the 20 standard amino acids, then 'X', then
+# every other symbol (stop codons, lowercase, rare residues)
+AMINO_ACIDS = ''.join(_BLOSUM62_ROWS)
+UNKNOWN_CODE = len(AMINO_ACIDS)
+OTHER_CODE = UNKNOWN_CODE + 1
+ALPHABET_SIZE = OTHER_CODE + 1
+
+_AA_LOOKUP = np.full(256, OTHER_CODE, dtype=np.uint8)
+for _code, _aa in enumerate(AMINO_ACIDS):
+    _AA_LOOKUP[ord(_aa)] = _code
+_AA_LOOKUP[ord('X')] = UNKNOWN_CODE
+
+# BLOSUM62 as a dense array over the integer alphabet, matching get_blosum_score
+BLOSUM62_ARRAY = np.full((ALPHABET_SIZE, ALPHABET_SIZE), -4, dtype=np.int32)
+for (_aa1, _aa2), _score in BLOSUM62.items():
+    BLOSUM62_ARRAY[_AA_LOOKUP[ord(_aa1)], _AA_LOOKUP[ord(_aa2)]] = _score
+BLOSUM62_ARRAY[UNKNOWN_CODE, :] = -1
+BLOSUM62_ARRAY[:, UNKNOWN_CODE] = -1
+
+# Largest DP matrix (in cells) filled with a full traceback before
+# progressive alignment switches to linear-memory Hirschberg alignment
+DEFAULT_MAX_CELLS = 25_000_000
+
+# Batches created per worker process, so uneven pair costs still balance out
+BATCHES_PER_WORKER = 4
+
+# Count profiles hold one column per residue code plus a final gap column
+GAP_CODE = ALPHABET_SIZE
+PROFILE_WIDTH = ALPHABET_SIZE + 1
+
+# Subproblems below this many cells end the Hirschberg recursion
+HIRSCHBERG_BASE_CELLS = 65_536
+
+# Banded alignment: seed k-mer size, minimum half-width of the band, the most
+# occurrences of one k-mer used for seeding (skips low-complexity repeats) and
+# the votes a diagonal needs to count towards the band width
+BAND_SEED_K = 3
+BAND_MIN_WIDTH = 8
+BAND_MAX_SEED_HITS = 32
+BAND_MIN_SEED_VOTES = 2
+
+# Wavefront alignment penalties (match = 0); the gap-linear variant uses
+# WFA_GAP_EXTEND per gapped residue with no opening cost
+WFA_MISMATCH = 4
+WFA_GAP_OPEN = 6
+WFA_GAP_EXTEND = 2
+
+# Offset of diagonals a wavefront has not reached
+WFA_UNREACHED = -(1 << 40)
+
+# The 'auto' backend uses wavefront alignment for pairs differing at up to
+# WFA_MAX_DIVERGENCE of their residues. A substitution breaks the k k-mers
+# covering it, so such pairs still share about (1 - d) ** k of their k-mers,
+# which is their k-mer cosine similarity (k = WFA_KMER_SIZE) as in
+# compute_kmer_similarity
+WFA_MAX_DIVERGENCE = 0.05
+WFA_KMER_SIZE = 6
+WFA_MIN_SIMILARITY = (1 - WFA_MAX_DIVERGENCE) ** WFA_KMER_SIZE
+
+def needleman_wunsch_reference(seq1: str, seq2: str,
+                               gap_penalty: int = -8) -> Tuple[str, str, float]:
     """
-    Perform Needleman-Wunsch global alignment.
+    Perform Needleman-Wunsch global alignment (pure Python reference backend).
     
     Args:
         seq1: First sequence
@@ -115,41 +182,982 @@ def needleman_wunsch(seq1: str, seq2: str, gap_penalty: int = -8) -> Tuple[str,
     
     aligned1 = ''.join(reversed(aligned1))
     aligned2 = ''.join(reversed(aligned2))
-
+    
     return aligned1, aligned2, score_matrix[m, n]
 
-def progressive_alignment(sequences: Dict[str, dict], sorted_ids: List[str], 
-                         gap_penalty: int = -8) -> Dict[str, str]:
+def encode_protein(sequence) -> np.ndarray:
     """
-    Perform progressive multiple sequence alignment.
+    Encode an amino acid sequence as BLOSUM62 alphabet indices.
+    
+    Args:
+        sequence: Amino acid sequence, as a string or uint8 ASCII array
+        
+    Returns:
+        uint8 array of residue codes (see AMINO_ACIDS)
+    """
+    if isinstance(sequence, str):
+        sequence = np.frombuffer(sequence.encode('ascii', 'replace'), dtype=np.uint8)
+    return _AA_LOOKUP[sequence]
+
+def _substitution_row(rows: np.ndarray, lookup: np.ndarray, i: int) -> np.ndarray:
+    """
+    Get the substitution scores of row i against every column.
+    
+    Args:
+        rows: Residue codes, or a 2-D array of per-row weights over lookup rows
+        lookup: Substitution scores, indexed as lookup[row_code, j]
+        i: Row index
+        
+    Returns:
+        Scores of row i against each column
+    """
+    if rows.ndim == 1:
+        return lookup[rows[i]]
+    return rows[i] @ lookup
+
+def _nw_fill(rows: np.ndarray, lookup: np.ndarray,
+             gap_penalty: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Fill the Needleman-Wunsch traceback matrix row by row.
+    
+    Each row is solved in one pass: the diagonal and vertical moves only
+    depend on the previous row, and the horizontal gap chain is resolved
+    with a running maximum over score - j * gap_penalty.
+    
+    Args:
+        rows: Residue codes of the first sequence (or profile weights)
+        lookup: Substitution scores, indexed as lookup[row_code, j]
+        gap_penalty: Gap penalty score
+        
+    Returns:
+        Tuple of (int8 traceback matrix, final row of scores)
+    """
+    m, n = len(rows), lookup.shape[1]
+    traceback = np.empty((m + 1, n + 1), dtype=np.int8)
+    traceback[0, :] = 2  # Left
+    traceback[:, 0] = 1  # Up
+    traceback[0, 0] = 0
+    
+    offsets = np.arange(n + 1, dtype=lookup.dtype) * gap_penalty
+    previous = offsets.copy()
+    shifted = np.empty(n + 1, dtype=lookup.dtype)
+    
+    for i in range(1, m + 1):
+        match_score = previous[:-1] + _substitution_row(rows, lookup, i - 1)
+        delete_score = previous[1:] + gap_penalty
+        best = np.maximum(match_score, delete_score)
+        
+        # Ties prefer diagonal over up over left, as in the reference backend
+        shifted[0] = i * gap_penalty
+        shifted[1:] = best - offsets[1:]
+        running = np.maximum.accumulate(shifted)
+        traceback[i, 1:] = np.where(running[1:] > shifted[1:], 2,
+                                    delete_score > match_score)
+        previous = running + offsets
+    
+    return traceback, previous
+
+def _nw_fill_batch(row_weights: np.ndarray, query_codes: np.ndarray,
+                   gap_penalty: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Fill Needleman-Wunsch traceback matrices for many queries at once.
+    
+    Every query is one lane of a 2-D row: all lanes share the same rows and
+    are advanced together, so the per-row Python overhead is paid once per
+    batch. Queries are right-padded; padding never influences the cells
+    inside a query.
+    
+    Args:
+        row_weights: Substitution scores of each row against every residue code
+        query_codes: B x n array of padded query residue codes
+        gap_penalty: Gap penalty score
+        
+    Returns:
+        Tuple of (int8 traceback of shape (m + 1, B, n + 1), final score rows)
+    """
+    m = len(row_weights)
+    lanes, n = query_codes.shape
+    traceback = np.empty((m + 1, lanes, n + 1), dtype=np.int8)
+    traceback[0] = 2  # Left
+    traceback[:, :, 0] = 1  # Up
+    traceback[0, :, 0] = 0
+    
+    offsets = np.arange(n + 1, dtype=row_weights.dtype) * gap_penalty
+    previous = np.tile(offsets, (lanes, 1))
+    shifted = np.empty((lanes, n + 1), dtype=row_weights.dtype)
+    
+    for i in range(1, m + 1):
+        match_score = previous[:, :-1] + row_weights[i - 1][query_codes]
+        delete_score = previous[:, 1:] + gap_penalty
+        best = np.maximum(match_score, delete_score)
+        
+        shifted[:, 0] = i * gap_penalty
+        shifted[:, 1:] = best - offsets[1:]
+        running = np.maximum.accumulate(shifted, axis=1)
+        traceback[i, :, 1:] = np.where(running[:, 1:] > shifted[:, 1:], 2,
+                                       delete_score > match_score)
+        previous = running + offsets
+    
+    return traceback, previous
+
+def _pad_codes(code_arrays: List[np.ndarray]) -> np.ndarray:
+    """
+    Stack residue code arrays into a right-padded 2-D array.
+    
+    Args:
+        code_arrays: Residue codes of each query
+        
+    Returns:
+        B x max_length uint8 array, padded with OTHER_CODE
+    """
+    padded = np.full((len(code_arrays), max(map(len, code_arrays), default=0)),
+                     OTHER_CODE, dtype=np.uint8)
+    for lane, codes in enumerate(code_arrays):
+        padded[lane, :len(codes)] = codes
+    return padded
+
+def _nw_last_row(rows: np.ndarray, lookup: np.ndarray,
+                 gap_penalty: int) -> np.ndarray:
+    """
+    Compute the last row of the Needleman-Wunsch score matrix in linear memory.
+    
+    Args:
+        rows: Residue codes of the first sequence (or profile weights)
+        lookup: Substitution scores, indexed as lookup[row_code, j]
+        gap_penalty: Gap penalty score
+        
+    Returns:
+        Scores of aligning all of rows against every prefix of the columns
+    """
+    n = lookup.shape[1]
+    offsets = np.arange(n + 1, dtype=lookup.dtype) * gap_penalty
+    previous = offsets.copy()
+    shifted = np.empty(n + 1, dtype=lookup.dtype)
+    
+    for i in range(1, len(rows) + 1):
+        best = np.maximum(previous[:-1] + _substitution_row(rows, lookup, i - 1),
+                          previous[1:] + gap_penalty)
+        shifted[0] = i * gap_penalty
+        shifted[1:] = best - offsets[1:]
+        previous = np.maximum.accumulate(shifted) + offsets
+    
+    return previous
+
+def _hirschberg_path(rows: np.ndarray, lookup: np.ndarray, gap_penalty: int,
+                     base_cells: int = HIRSCHBERG_BASE_CELLS) -> np.ndarray:
+    """
+    Find an optimal alignment path with Hirschberg's divide and conquer.
+    
+    The first sequence is split in half, the matching split point in the
+    second sequence is found from a forward and a reverse score row, and
+    both halves are solved recursively. Subproblems of at most base_cells
+    cells are solved with the full traceback kernel.
+    
+    Args:
+        rows: Residue codes of the first sequence (or profile weights)
+        lookup: Substitution scores, indexed as lookup[row_code, j]
+        gap_penalty: Gap penalty score
+        base_cells: Largest subproblem solved with a full traceback matrix
+        
+    Returns:
+        uint8 array of moves in alignment order
+    """
+    m, n = len(rows), lookup.shape[1]
+    if m <= 1 or n <= 1 or m * n <= base_cells:
+        traceback, _ = _nw_fill(rows, lookup, gap_penalty)
+        return _trace_path(traceback)
+    
+    mid = m // 2
+    forward = _nw_last_row(rows[:mid], lookup, gap_penalty)
+    backward = _nw_last_row(rows[mid:][::-1], lookup[:, ::-1], gap_penalty)
+    split = int(np.argmax(forward + backward[::-1]))
+    
+    return np.concatenate([
+        _hirschberg_path(rows[:mid], lookup[:, :split], gap_penalty, base_cells),
+        _hirschberg_path(rows[mid:], lookup[:, split:], gap_penalty, base_cells),
+    ])
+
+def find_band(seq1: str, seq2: str, k: int = BAND_SEED_K,
+              min_width: int = BAND_MIN_WIDTH) -> Optional[Tuple[int, int]]:
+    """
+    Estimate a diagonal band for global alignment from shared k-mers.
+    
+    Every shared k-mer votes for its diagonal (j - i). The band is centred
+    on the dominant diagonal, widened to cover 90% of the votes on diagonals
+    hit clearly more often than chance, and always contains both corners of
+    the DP matrix.
+    
+    Args:
+        seq1: First sequence
+        seq2: Second sequence
+        k: Seed k-mer size
+        min_width: Minimum half-width of the band
+        
+    Returns:
+        Tuple of (lowest diagonal, highest diagonal) or None if no k-mer is shared
+    """
+    positions = defaultdict(list)
+    for j, kmer in enumerate(generate_kmers(seq2, k)):
+        positions[kmer].append(j)
+    
+    diagonals = Counter()
+    for i, kmer in enumerate(generate_kmers(seq1, k)):
+        hits = positions.get(kmer)
+        if hits and len(hits) <= BAND_MAX_SEED_HITS:
+            diagonals.update(j - i for j in hits)
+    
+    if not diagonals:
+        return None
+    
+    dominant = diagonals.most_common(1)[0][0]
+    offsets = np.abs(np.fromiter(diagonals.keys(), dtype=np.int64) - dominant)
+    counts = np.fromiter(diagonals.values(), dtype=np.int64)
+    
+    # Chance matches scatter a few hits over all diagonals; true homology
+    # stacks many seeds on the same diagonal
+    expected = len(seq1) * len(seq2) / (len(AMINO_ACIDS) ** k * (len(seq1) + len(seq2)))
+    repeated = counts >= BAND_MIN_SEED_VOTES + int(np.ceil(4 * expected))
+    if repeated.any():
+        offsets, counts = offsets[repeated], counts[repeated]
+    order = np.argsort(offsets)
+    covered = np.searchsorted(np.cumsum(counts[order]), 0.9 * counts.sum())
+    width = max(min_width, int(offsets[order][covered]))
+    
+    end_diagonal = len(seq2) - len(seq1)
+    low = min(0, end_diagonal, dominant - width)
+    high = max(0, end_diagonal, dominant + width)
+    return max(low, -len(seq1)), min(high, len(seq2))
+
+def _banded_fill(rows: np.ndarray, lookup: np.ndarray, gap_penalty: int,
+                 low: int, high: int) -> Tuple[np.ndarray, float]:
+    """
+    Fill the Needleman-Wunsch traceback restricted to a diagonal band.
+    
+    Cell (i, j) is stored at band column j - i - low, so the diagonal
+    predecessor shares the column index and the upper one is one to the right.
+    Band cells left of the matrix hold a large negative score; cells right of
+    it are never read by cells inside the matrix.
+    
+    Args:
+        rows: Residue codes of the first sequence
+        lookup: Substitution scores, indexed as lookup[row_code, j]
+        gap_penalty: Gap penalty score
+        low: Lowest diagonal (j - i) inside the band
+        high: Highest diagonal (j - i) inside the band
+        
+    Returns:
+        Tuple of (int8 banded traceback matrix, alignment score)
+    """
+    m, n = len(rows), lookup.shape[1]
+    width = high - low + 1
+    floor = np.iinfo(np.int32).min // 4
+    
+    # Substitution scores for band columns outside the matrix are never used
+    pad = 1 - low
+    padded = np.zeros((lookup.shape[0], pad + n + m + high + 1), dtype=np.int32)
+    padded[:, pad:pad + n] = lookup
+    
+    offsets = (low + np.arange(width, dtype=np.int32)) * gap_penalty
+    traceback = np.full((m + 1, width), 2, dtype=np.int8)
+    previous = np.where(low + np.arange(width) >= 0, offsets, floor).astype(np.int32)
+    delete_score = np.full(width, floor, dtype=np.int32)
+    
+    for i in range(1, m + 1):
+        start = pad + i - 1 + low
+        match_score = previous + padded[rows[i - 1], start:start + width]
+        delete_score[:-1] = previous[1:] + gap_penalty
+        best = np.maximum(match_score, delete_score)
+        
+        # Column j = 0 can only be reached from above
+        first = -(i + low)
+        if 0 <= first < width:
+            best[first] = i * gap_penalty
+            delete_score[first] = best[first]
+        
+        row_offsets = offsets + i * gap_penalty
+        shifted = best - row_offsets
+        running = np.maximum.accumulate(shifted)
+        traceback[i] = np.where(running > shifted, 2, delete_score > match_score)
+        if 0 <= first < width:
+            traceback[i, first] = 1
+        previous = running + row_offsets
+    
+    return traceback, float(previous[n - m - low])
+
+def _trace_band(traceback: np.ndarray, low: int, high: int,
+                n: int) -> Tuple[np.ndarray, bool]:
+    """
+    Walk a banded traceback matrix and check whether the path hit the band edge.
+    
+    Args:
+        traceback: Banded traceback matrix from _banded_fill
+        low: Lowest diagonal inside the band
+        high: Highest diagonal inside the band
+        n: Length of the second sequence
+        
+    Returns:
+        Tuple of (moves in alignment order, True if the path touched an edge
+        that could still be widened)
+    """
+    m = traceback.shape[0] - 1
+    width = traceback.shape[1]
+    path = []
+    touched = False
+    i, j = m, n
+    
+    while i > 0 or j > 0:
+        column = j - i - low
+        if (column == 0 and low > -m) or (column == width - 1 and high < n):
+            touched = True
+        move = 1 if j == 0 else (2 if i == 0 else traceback[i, column])
+        path.append(move)
+        if move == 0:
+            i -= 1
+            j -= 1
+        elif move == 1:
+            i -= 1
+        else:
+            j -= 1
+    
+    return np.array(path[::-1], dtype=np.uint8), touched
+
+def _trace_path(traceback: np.ndarray) -> np.ndarray:
+    """
+    Walk a traceback matrix from the bottom-right corner.
+    
+    Args:
+        traceback: Traceback matrix (0 = diagonal, 1 = up, 2 = left)
+        
+    Returns:
+        uint8 array of moves in alignment order
+    """
+    path = []
+    i, j = traceback.shape[0] - 1, traceback.shape[1] - 1
+    
+    while i > 0 or j > 0:
+        move = traceback[i, j]
+        path.append(move)
+        if move == 0:
+            i -= 1
+            j -= 1
+        elif move == 1:
+            i -= 1
+        else:
+            j -= 1
+    
+    return np.array(path[::-1], dtype=np.uint8)
+
+def _render_path(seq1: str, seq2: str, path: np.ndarray) -> Tuple[str, str]:
+    """
+    Build gapped sequences from an alignment path.
+    
+    Args:
+        seq1: First sequence
+        seq2: Second sequence
+        path: Moves in alignment order (0 = diagonal, 1 = up, 2 = left)
+        
+    Returns:
+        Tuple of (aligned_seq1, aligned_seq2)
+    """
+    residues1, residues2 = iter(seq1), iter(seq2)
+    aligned1 = ''.join('-' if move == 2 else next(residues1) for move in path)
+    aligned2 = ''.join('-' if move == 1 else next(residues2) for move in path)
+    return aligned1, aligned2
+
+def needleman_wunsch_numpy(seq1: str, seq2: str,
+                           gap_penalty: int = -8) -> Tuple[str, str, float]:
+    """
+    Perform Needleman-Wunsch global alignment with the NumPy row kernel.
+    
+    Produces the same alignment and score as needleman_wunsch_reference.
+    
+    Args:
+        seq1: First sequence
+        seq2: Second sequence
+        gap_penalty: Gap penalty score
+        
+    Returns:
+        Tuple of (aligned_seq1, aligned_seq2, alignment_score)
+    """
+    codes1, codes2 = encode_protein(seq1), encode_protein(seq2)
+    traceback, last_row = _nw_fill(codes1, BLOSUM62_ARRAY[:, codes2], gap_penalty)
+    aligned1, aligned2 = _render_path(seq1, seq2, _trace_path(traceback))
+    return aligned1, aligned2, float(last_row[-1])
+
+def needleman_wunsch_hirschberg(seq1: str, seq2: str,
+                                gap_penalty: int = -8) -> Tuple[str, str, float]:
+    """
+    Perform Needleman-Wunsch global alignment in O(m + n) memory.
+    
+    Returns an optimal alignment with the same score as the other backends;
+    among equally scoring alignments a different one may be chosen.
+    
+    Args:
+        seq1: First sequence
+        seq2: Second sequence
+        gap_penalty: Gap penalty score
+        
+    Returns:
+        Tuple of (aligned_seq1, aligned_seq2, alignment_score)
+    """
+    codes1, codes2 = encode_protein(seq1), encode_protein(seq2)
+    lookup = BLOSUM62_ARRAY[:, codes2]
+    path = _hirschberg_path(codes1, lookup, gap_penalty)
+    score = _nw_last_row(codes1, lookup, gap_penalty)[-1]
+    
+    aligned1, aligned2 = _render_path(seq1, seq2, path)
+    return aligned1, aligned2, float(score)
+
+def needleman_wunsch_banded(seq1: str, seq2: str,
+                            gap_penalty: int = -8) -> Tuple[str, str, float]:
+    """
+    Perform Needleman-Wunsch global alignment inside a k-mer seeded band.
+    
+    The band comes from find_band; whenever the optimal path touches the band
+    edge, the band is doubled and the alignment retried. Pairs without shared
+    seeds fall back to the full NumPy backend.
+    
+    Args:
+        seq1: First sequence
+        seq2: Second sequence
+        gap_penalty: Gap penalty score
+        
+    Returns:
+        Tuple of (aligned_seq1, aligned_seq2, alignment_score)
+    """
+    m, n = len(seq1), len(seq2)
+    band = find_band(seq1, seq2)
+    if band is None:
+        return needleman_wunsch_numpy(seq1, seq2, gap_penalty)
+    
+    codes1, codes2 = encode_protein(seq1), encode_protein(seq2)
+    lookup = BLOSUM62_ARRAY[:, codes2]
+    low, high = band
+    
+    while True:
+        traceback, score = _banded_fill(codes1, lookup, gap_penalty, low, high)
+        path, touched = _trace_band(traceback, low, high, n)
+        if not touched:
+            break
+        
+        extra = max(BAND_MIN_WIDTH, high - low)
+        low, high = max(low - extra, -m), min(high + extra, n)
+        logging.debug(f"Alignment path touched band edge, widening to [{low}, {high}]")
+    
+    aligned1, aligned2 = _render_path(seq1, seq2, path)
+    return aligned1, aligned2, score
+
+def needleman_wunsch_score(seq1: str, seq2: str, gap_penalty: int = -8) -> float:
+    """
+    Compute the Needleman-Wunsch global alignment score only.
+    
+    Keeps two rolling score rows and no traceback, so it is the cheapest way
+    to get exact alignment scores for distance calculations.
+    
+    Args:
+        seq1: First sequence
+        seq2: Second sequence
+        gap_penalty: Gap penalty score
+        
+    Returns:
+        Alignment score, equal to the score returned by needleman_wunsch
+    """
+    # Put the longer sequence along the vectorized axis
+    if len(seq1) > len(seq2):
+        seq1, seq2 = seq2, seq1
+    lookup = BLOSUM62_ARRAY[:, encode_protein(seq2)]
+    return float(_nw_last_row(encode_protein(seq1), lookup, gap_penalty)[-1])
+
+def needleman_wunsch_batch(seq1: str, queries: List[str],
+                           gap_penalty: int = -8) -> List[Tuple[str, str, float]]:
+    """
+    Globally align many query sequences against one sequence at once.
+    
+    Queries are padded into a 2-D array and their DP matrices are filled
+    together, one query per lane. The traceback needs
+    (len(seq1) + 1) * len(queries) * (longest query + 1) bytes, so group
+    queries of similar length.
+    
+    Args:
+        seq1: Sequence every query is aligned to
+        queries: Query sequences
+        gap_penalty: Gap penalty score
+        
+    Returns:
+        One (aligned_seq1, aligned_query, alignment_score) tuple per query,
+        identical to needleman_wunsch(seq1, query)
+    """
+    if not queries:
+        return []
+    
+    code_arrays = [encode_protein(query) for query in queries]
+    row_weights = BLOSUM62_ARRAY[encode_protein(seq1)]
+    traceback, last_rows = _nw_fill_batch(row_weights, _pad_codes(code_arrays), gap_penalty)
+    
+    results = []
+    for lane, query in enumerate(queries):
+        path = _trace_path(traceback[:, lane, :len(query) + 1])
+        aligned1, aligned2 = _render_path(seq1, query, path)
+        results.append((aligned1, aligned2, float(last_rows[lane, len(query)])))
+    
+    return results
+
+def _wfa_extend(offsets: np.ndarray, diagonals: np.ndarray,
+                codes1: np.ndarray, codes2: np.ndarray, window: int = 32) -> None:
+    """
+    Slide wavefront offsets along their diagonals over matching residues.
+    
+    All diagonals are compared a window of residues at a time; codes1 and
+    codes2 must end with `window` sentinel values that never match each other.
+    
+    Args:
+        offsets: Offsets into seq2 of each diagonal (negative = unreached), updated in place
+        diagonals: Diagonal (j - i) of each offset
+        codes1: Padded first sequence
+        codes2: Padded second sequence
+        window: Residues compared per step
+    """
+    steps = np.arange(window)
+    active = np.flatnonzero(offsets >= 0)
+    
+    while active.size:
+        j = offsets[active]
+        i = j - diagonals[active]
+        matches = codes1[i[:, None] + steps] == codes2[j[:, None] + steps]
+        run = np.where(matches.all(axis=1), window, np.argmin(matches, axis=1))
+        offsets[active] += run
+        active = active[run == window]
+
+def _wfa_offsets(wavefront, kind: int, low: int, high: int) -> np.ndarray:
+    """
+    Read one component of a wavefront on diagonals low..high.
+    
+    Args:
+        wavefront: (low, high, (M, I, D) offsets) tuple, or None
+        kind: Component (0 = M, 1 = I, 2 = D)
+        low: First diagonal
+        high: Last diagonal
+        
+    Returns:
+        Offsets, WFA_UNREACHED outside the wavefront
+    """
+    values = np.full(high - low + 1, WFA_UNREACHED, dtype=np.int64)
+    if wavefront is None:
+        return values
+    wf_low, wf_high, components = wavefront
+    start, stop = max(low, wf_low), min(high, wf_high)
+    if start <= stop:
+        values[start - low:stop - low + 1] = components[kind][start - wf_low:stop - wf_low + 1]
+    return values
+
+def wavefront_align(seq1: str, seq2: str, mismatch: int = WFA_MISMATCH,
+                    gap_open: int = WFA_GAP_OPEN,
+                    gap_extend: int = WFA_GAP_EXTEND) -> Tuple[str, str, int]:
+    """
+    Perform global alignment with the wavefront algorithm (WFA).
+    
+    Minimizes a penalty (match 0, mismatch, gap of length L costs
+    gap_open + L * gap_extend) by growing, for each penalty s, the furthest
+    offset reached on every diagonal. Time and memory grow with the penalty
+    of the alignment instead of len(seq1) * len(seq2), so it is fast for
+    near-identical sequences and slow for distant ones. gap_open = 0 gives
+    the gap-linear variant.
+    
+    Args:
+        seq1: First sequence
+        seq2: Second sequence
+        mismatch: Mismatch penalty
+        gap_open: Gap opening penalty
+        gap_extend: Gap extension penalty per residue
+        
+    Returns:
+        Tuple of (aligned_seq1, aligned_seq2, alignment_penalty)
+    """
+    if mismatch <= 0 or gap_extend <= 0 or gap_open < 0:
+        raise ValueError("Wavefront penalties must be positive")
+    
+    m, n = len(seq1), len(seq2)
+    window = 32
+    codes1 = np.concatenate([np.frombuffer(seq1.encode('ascii', 'replace'), dtype=np.uint8),
+                             np.zeros(window, dtype=np.uint8)])
+    codes2 = np.concatenate([np.frombuffer(seq2.encode('ascii', 'replace'), dtype=np.uint8),
+                             np.ones(window, dtype=np.uint8)])
+    gap_first = gap_open + gap_extend
+    final_diagonal = n - m
+    
+    def wavefront(score):
+        return wavefronts[score] if score >= 0 else None
+    
+    def reached_end(score):
+        return _wfa_offsets(wavefront(score), 0, final_diagonal, final_diagonal)[0] >= n
+    
+    # Wavefront 0: the diagonal through the origin, extended over matches
+    start = np.zeros(1, dtype=np.int64)
+    _wfa_extend(start, np.zeros(1, dtype=np.int64), codes1, codes2, window)
+    unreached = np.full(1, WFA_UNREACHED, dtype=np.int64)
+    wavefronts = [(0, 0, (start, unreached, unreached))]
+    score = 0
+    
+    while not reached_end(score):
+        score += 1
+        sources = [wavefront(score - cost) for cost in (mismatch, gap_first, gap_extend)]
+        sources = [source for source in sources if source is not None]
+        if not sources:
+            wavefronts.append(None)
+            continue
+        
+        low = max(min(source[0] for source in sources) - 1, -m)
+        high = min(max(source[1] for source in sources) + 1, n)
+        diagonals = np.arange(low, high + 1, dtype=np.int64)
+        opening, extending = wavefront(score - gap_first), wavefront(score - gap_extend)
+        
+        # Insertions consume a residue of seq2 and come from diagonal k - 1,
+        # deletions consume a residue of seq1 and come from diagonal k + 1
+        insert = np.maximum(_wfa_offsets(opening, 0, low - 1, high - 1),
+                            _wfa_offsets(extending, 1, low - 1, high - 1)) + 1
+        delete = np.maximum(_wfa_offsets(opening, 0, low + 1, high + 1),
+                            _wfa_offsets(extending, 2, low + 1, high + 1))
+        match = np.maximum(_wfa_offsets(wavefront(score - mismatch), 0, low, high) + 1,
+                           np.maximum(insert, delete))
+        
+        for offsets in (match, insert, delete):
+            offsets[(offsets < 0) | (offsets > n) | (offsets - diagonals > m)] = WFA_UNREACHED
+        _wfa_extend(match, diagonals, codes1, codes2, window)
+        wavefronts.append((low, high, (match, insert, delete)))
+    
+    def offset(score, kind, diagonal):
+        return _wfa_offsets(wavefront(score), kind, diagonal, diagonal)[0]
+    
+    # Backtrace from the end of the final wavefront
+    path = []
+    s, kind, k, j = score, 0, final_diagonal, n
+    while True:
+        if kind == 0:
+            if s == 0:
+                path.extend([0] * j)
+                break
+            mismatched = offset(s - mismatch, 0, k) + 1
+            inserted, deleted = offset(s, 1, k), offset(s, 2, k)
+            previous = max(mismatched, inserted, deleted)
+            path.extend([0] * (j - previous))
+            j = previous
+            if previous == mismatched:
+                path.append(0)
+                s, j = s - mismatch, j - 1
+            else:
+                kind = 1 if previous == inserted else 2
+        elif kind == 1:
+            path.append(2)
+            if offset(s - gap_first, 0, k - 1) + 1 == j:
+                s, kind = s - gap_first, 0
+            else:
+                s -= gap_extend
+            k, j = k - 1, j - 1
+        else:
+            path.append(1)
+            if offset(s - gap_first, 0, k + 1) == j:
+                s, kind = s - gap_first, 0
+            else:
+                s -= gap_extend
+            k += 1
+    
+    aligned1, aligned2 = _render_path(seq1, seq2, np.array(path[::-1], dtype=np.uint8))
+    return aligned1, aligned2, score
+
+def alignment_score(aligned1: str, aligned2: str, gap_penalty: int = -8) -> float:
+    """
+    Score an existing pairwise alignment with BLOSUM62 and linear gaps.
+    
+    Args:
+        aligned1: First aligned sequence
+        aligned2: Second aligned sequence
+        gap_penalty: Gap penalty score
+        
+    Returns:
+        Alignment score, comparable to the needleman_wunsch score
+    """
+    row1 = np.frombuffer(aligned1.encode('ascii', 'replace'), dtype=np.uint8)
+    row2 = np.frombuffer(aligned2.encode('ascii', 'replace'), dtype=np.uint8)
+    paired = (row1 != ord('-')) & (row2 != ord('-'))
+    substitutions = BLOSUM62_ARRAY[encode_protein(row1[paired]), encode_protein(row2[paired])]
+    return float(substitutions.sum() + gap_penalty * (len(row1) - paired.sum()))
+
+def needleman_wunsch_wfa(seq1: str, seq2: str,
+                         gap_penalty: int = -8) -> Tuple[str, str, float]:
+    """
+    Align with the gap-linear wavefront algorithm.
+    
+    The alignment minimizes WFA_MISMATCH / WFA_GAP_EXTEND penalties rather
+    than maximizing BLOSUM62, so on divergent pairs it can differ from the
+    Needleman-Wunsch backends; the returned score is its BLOSUM62 score.
+    
+    Args:
+        seq1: First sequence
+        seq2: Second sequence
+        gap_penalty: Gap penalty used to score the alignment
+        
+    Returns:
+        Tuple of (aligned_seq1, aligned_seq2, alignment_score)
+    """
+    aligned1, aligned2, _ = wavefront_align(seq1, seq2, WFA_MISMATCH, 0, WFA_GAP_EXTEND)
+    return aligned1, aligned2, alignment_score(aligned1, aligned2, gap_penalty)
+
+def needleman_wunsch_wfa_affine(seq1: str, seq2: str,
+                                gap_penalty: int = -8) -> Tuple[str, str, float]:
+    """
+    Align with the gap-affine wavefront algorithm.
+    
+    Like needleman_wunsch_wfa, but a gap costs WFA_GAP_OPEN once plus
+    WFA_GAP_EXTEND per residue, which keeps indels together.
+    
+    Args:
+        seq1: First sequence
+        seq2: Second sequence
+        gap_penalty: Gap penalty used to score the alignment
+        
+    Returns:
+        Tuple of (aligned_seq1, aligned_seq2, alignment_score)
+    """
+    aligned1, aligned2, _ = wavefront_align(seq1, seq2, WFA_MISMATCH,
+                                            WFA_GAP_OPEN, WFA_GAP_EXTEND)
+    return aligned1, aligned2, alignment_score(aligned1, aligned2, gap_penalty)
+
+def select_backend(seq1: str, seq2: str) -> str:
+    """
+    Choose the backend used by 'auto' for one sequence pair.
+    
+    Args:
+        seq1: First sequence
+        seq2: Second sequence
+        
+    Returns:
+        'wfa' if the pair's k-mer cosine similarity reaches WFA_MIN_SIMILARITY,
+        otherwise 'numpy'
+    """
+    return pair_backends([(seq1, seq2)], 'auto')[0]
+
+def needleman_wunsch_auto(seq1: str, seq2: str,
+                          gap_penalty: int = -8) -> Tuple[str, str, float]:
+    """
+    Align near-identical pairs with WFA and all others with the NumPy backend.
+    
+    Args:
+        seq1: First sequence
+        seq2: Second sequence
+        gap_penalty: Gap penalty score
+        
+    Returns:
+        Tuple of (aligned_seq1, aligned_seq2, alignment_score)
+    """
+    return ALIGNMENT_BACKENDS[select_backend(seq1, seq2)](seq1, seq2, gap_penalty)
+
+def needleman_wunsch(seq1: str, seq2: str, gap_penalty: int = -8,
+                     backend: str = 'numpy') -> Tuple[str, str, float]:
+    """
+    Perform Needleman-Wunsch global alignment.
+    
+    Args:
+        seq1: First sequence
+        seq2: Second sequence
+        gap_penalty: Gap penalty score
+        backend: Name of the alignment backend (see ALIGNMENT_BACKENDS)
+        
+    Returns:
+        Tuple of (aligned_seq1, aligned_seq2, alignment_score)
+    """
+    if backend not in ALIGNMENT_BACKENDS:
+        raise ValueError(f"Unknown alignment backend: {backend}")
+    return ALIGNMENT_BACKENDS[backend](seq1, seq2, gap_penalty)
+
+# Pairwise alignment backends selectable by name
+ALIGNMENT_BACKENDS = {
+    'numpy': needleman_wunsch_numpy,
+    'reference': needleman_wunsch_reference,
+    'hirschberg': needleman_wunsch_hirschberg,
+    'banded': needleman_wunsch_banded,
+    'wfa': needleman_wunsch_wfa,
+    'wfa-affine': needleman_wunsch_wfa_affine,
+    'auto': needleman_wunsch_auto,
+}
+
+# Backends whose memory grows with m * n
+FULL_MATRIX_BACKENDS = ('numpy', 'reference')
+
+def balance_batches(costs: List[int], n_batches: int) -> List[List[int]]:
+    """
+    Split tasks into batches of similar total cost.
+    
+    Tasks are assigned largest first to the currently lightest batch, and
+    each batch keeps its tasks in input order.
+    
+    Args:
+        costs: Estimated cost of each task
+        n_batches: Number of batches to create
+        
+    Returns:
+        List of non-empty batches of task indices
+    """
+    loads = [(0, batch) for batch in range(max(1, min(n_batches, len(costs))))]
+    batches = [[] for _ in loads]
+    
+    for index in sorted(range(len(costs)), key=lambda i: (-costs[i], i)):
+        load, batch = heapq.heappop(loads)
+        batches[batch].append(index)
+        heapq.heappush(loads, (load + costs[index], batch))
+    
+    return [sorted(batch) for batch in batches if batch]
+
+def pair_backend(seq1: str, seq2: str, backend: str = 'numpy',
+                 max_cells: int = DEFAULT_MAX_CELLS) -> str:
+    """
+    Resolve the backend actually used for one sequence pair.
+    
+    Args:
+        seq1: First sequence
+        seq2: Second sequence
+        backend: Requested backend ('auto' picks one per pair)
+        max_cells: Pairs above this DP size use Hirschberg with full-matrix backends
+        
+    Returns:
+        Backend name (see ALIGNMENT_BACKENDS)
+    """
+    return pair_backends([(seq1, seq2)], backend, max_cells)[0]
+
+def pair_backends(pairs: List[Tuple[str, str]], backend: str = 'numpy',
+                  max_cells: int = DEFAULT_MAX_CELLS) -> List[str]:
+    """
+    Resolve the backend actually used for each of many sequence pairs.
+    
+    For 'auto', the k-mer similarities of all pairs are computed together
+    with paired_cosine_similarity.
+    
+    Args:
+        pairs: (seq1, seq2) tuples
+        backend: Requested backend ('auto' picks one per pair)
+        max_cells: Pairs above this DP size use Hirschberg with full-matrix backends
+        
+    Returns:
+        Backend name of each pair (see ALIGNMENT_BACKENDS)
+    """
+    backends = [backend] * len(pairs)
+    if backend == 'auto' and pairs:
+        residues = [tuple(np.frombuffer(seq.encode('ascii', 'replace'), dtype=np.uint8)
+                          for seq in pair) for pair in pairs]
+        similarities = paired_cosine_similarity(residues, WFA_KMER_SIZE)
+        backends = ['wfa' if similarity >= WFA_MIN_SIMILARITY else 'numpy'
+                    for similarity in similarities]
+    return ['hirschberg' if name in FULL_MATRIX_BACKENDS and len(seq1) * len(seq2) > max_cells
+            else name for name, (seq1, seq2) in zip(backends, pairs)]
+
+def _align_batch(tasks: List[Tuple[int, str, str, str]], gap_penalty: int,
+                 score_only: bool) -> List[Tuple[int, object]]:
+    """
+    Align a batch of sequence pairs (worker entry point).
+    
+    Args:
+        tasks: (index, seq1, seq2, backend) tuples, with backends resolved
+            by pair_backends
+        gap_penalty: Gap penalty score
+        score_only: Return only scores instead of alignments
+        
+    Returns:
+        List of (index, result) pairs
+    """
+    if score_only:
+        return [(index, needleman_wunsch_score(seq1, seq2, gap_penalty))
+                for index, seq1, seq2, _ in tasks]
+    return [(index, needleman_wunsch(seq1, seq2, gap_penalty, backend))
+            for index, seq1, seq2, backend in tasks]
+
+def parallel_pairwise_alignments(pairs: List[Tuple[str, str]], gap_penalty: int = -8,
+                                 backend: str = 'numpy',
+                                 max_cells: int = DEFAULT_MAX_CELLS,
+                                 threads: int = 1,
+                                 score_only: bool = False,
+                                 batch_size: int = 1) -> list:
+    """
+    Align many independent sequence pairs, optionally over a process pool.
+    
+    Pairs are grouped into batches balanced by their m * n cost, and results
+    are returned in input order, so the output does not depend on threads
+    or batch_size.
+    
+    Args:
+        pairs: (seq1, seq2) tuples
+        gap_penalty: Gap penalty score
+        backend: Pairwise alignment backend (see ALIGNMENT_BACKENDS)
+        max_cells: Pairs above this DP size use Hirschberg with full-matrix backends
+        threads: Number of worker processes (1 runs in this process)
+        score_only: Return needleman_wunsch_score results instead of alignments
+        batch_size: Pairs per worker task when above 1; otherwise the pairs
+            are split into BATCHES_PER_WORKER tasks per worker
+        
+    Returns:
+        List of needleman_wunsch tuples (or scores), one per pair
+    """
+    backends = [None] * len(pairs) if score_only else pair_backends(pairs, backend, max_cells)
+    tasks = [(index, seq1, seq2, name)
+             for index, ((seq1, seq2), name) in enumerate(zip(pairs, backends))]
+    
+    if threads <= 1 or len(tasks) <= 1:
+        return [result for _, result in _align_batch(tasks, gap_penalty, score_only)]
+    
+    costs = [max(1, len(seq1) * len(seq2)) for seq1, seq2 in pairs]
+    n_batches = -(-len(tasks) // batch_size) if batch_size > 1 else threads * BATCHES_PER_WORKER
+    batches = balance_batches(costs, n_batches)
+    results = [None] * len(tasks)
+    
+    with ProcessPoolExecutor(max_workers=threads) as executor:
+        futures = [
+            executor.submit(_align_batch, [tasks[i] for i in batch], gap_penalty, score_only)
+            for batch in batches
+        ]
+        for future in futures:
+            for index, result in future.result():
+                results[index] = result
+    
+    logging.debug(f"Aligned {len(tasks)} pairs in {len(batches)} batches on {threads} workers")
+    return results
+
+def pairwise_progressive_alignment(sequences: Dict[str, dict], sorted_ids: List[str],
+                                   gap_penalty: int = -8,
+                                   max_cells: int = DEFAULT_MAX_CELLS,
+                                   backend: str = 'numpy',
+                                   threads: int = 1,
+                                   batch_size: int = 1) -> AlignmentMatrix:
+    """
+    Perform progressive alignment of every sequence against the first one.
     
     Args:
         sequences: Dictionary of processed sequences
         sorted_ids: Sequence IDs sorted by similarity
         gap_penalty: Gap penalty for alignment
+        max_cells: Largest pairwise DP matrix aligned with a full traceback;
+            bigger pairs use linear-memory Hirschberg alignment
+        backend: Pairwise alignment backend (see ALIGNMENT_BACKENDS)
+        threads: Worker processes for the pairwise alignments
+        batch_size: Pairs sent to a worker at a time (see
+            parallel_pairwise_alignments)
         
     Returns:
-        Dictionary mapping sequence IDs to aligned sequences
+        AlignmentMatrix of the aligned sequences
     """
     if not sorted_ids:
-        return {}
+        return AlignmentMatrix.from_dict({})
     
     # Start with first sequence
-    aligned_seqs = {sorted_ids[0]: sequences[sorted_ids[0]]['amino_acid']}
+    ref_seq_id = sorted_ids[0]
+    aligned_seqs = {ref_seq_id: sequences[ref_seq_id]['amino_acid']}
     
-    for seq_id in sorted_ids[1:]:
-        current_seq = sequences[seq_id]['amino_acid']
-        
-        # Align with existing profile (simplified: align with first sequence)
-        # In a full implementation, this would use profile-profile alignment
-        ref_seq_id = sorted_ids[0]  # Simplified approach
-        ref_aligned = aligned_seqs[ref_seq_id]
-        
-        # Align current sequence with reference
-        aligned_current, aligned_ref, score = needleman_wunsch(
-            current_seq, ref_aligned.replace('-', ''), gap_penalty
-        )
-        
+    # Every sequence is aligned to the ungapped first sequence, so all pairs
+    # are independent and can be aligned up front
+    ref_seq = aligned_seqs[ref_seq_id].replace('-', '')
+    pairs = [(sequences[seq_id]['amino_acid'], ref_seq) for seq_id in sorted_ids[1:]]
+    pair_alignments = parallel_pairwise_alignments(
+        pairs, gap_penalty, backend, max_cells, threads, batch_size=batch_size
+    )
+    
+    for seq_id, (aligned_current, aligned_ref, score) in zip(sorted_ids[1:], pair_alignments):
         # Add gaps to all existing sequences to match new alignment
         for existing_id in aligned_seqs:
             if existing_id != ref_seq_id:
@@ -160,7 +1168,320 @@ def progressive_alignment(sequences: Dict[str, dict], sorted_ids: List[str],
         
         aligned_seqs[seq_id] = aligned_current
     
-    return aligned_seqs
+    return AlignmentMatrix.from_dict(aligned_seqs)
+
+def sequence_profile(sequence) -> np.ndarray:
+    """
+    Build the column count profile of a single amino acid sequence.
+    
+    Args:
+        sequence: Amino acid sequence (gaps allowed), as a string or uint8 ASCII array
+        
+    Returns:
+        L x PROFILE_WIDTH array of residue counts, gap counts in the last column
+    """
+    if isinstance(sequence, str):
+        sequence = np.frombuffer(sequence.encode('ascii', 'replace'), dtype=np.uint8)
+    codes = encode_protein(sequence)
+    codes[sequence == ord('-')] = GAP_CODE
+    profile = np.zeros((len(codes), PROFILE_WIDTH))
+    profile[np.arange(len(codes)), codes] = 1
+    return profile
+
+def profile_frequencies(profile: np.ndarray, n_seqs: int) -> np.ndarray:
+    """
+    Convert a count profile into per-column residue frequencies.
+    
+    Gaps are left out, so a column that is half gaps scores half as much.
+    
+    Args:
+        profile: Count profile
+        n_seqs: Number of sequences in the profile
+        
+    Returns:
+        L x ALPHABET_SIZE array of residue frequencies
+    """
+    return profile[:, :ALPHABET_SIZE] / n_seqs
+
+def align_profiles(profile1: np.ndarray, n_seqs1: int,
+                   profile2: np.ndarray, n_seqs2: int,
+                   gap_penalty: int = -8,
+                   max_cells: int = DEFAULT_MAX_CELLS) -> np.ndarray:
+    """
+    Globally align two count profiles.
+    
+    Column pairs are scored as freq1 @ BLOSUM62 @ freq2.T, evaluated one
+    DP row at a time. A single sequence is a profile of one, so this covers
+    both profile-sequence and profile-profile alignment.
+    
+    Args:
+        profile1: First count profile
+        n_seqs1: Number of sequences in the first profile
+        profile2: Second count profile
+        n_seqs2: Number of sequences in the second profile
+        gap_penalty: Gap penalty for inserting a gap column
+        max_cells: Largest DP matrix aligned with a full traceback;
+            bigger pairs use linear-memory Hirschberg alignment
+            
+    Returns:
+        uint8 array of moves in alignment order (0 = both columns,
+        1 = column of profile1 only, 2 = column of profile2 only)
+    """
+    rows = profile_frequencies(profile1, n_seqs1) @ BLOSUM62_ARRAY
+    lookup = profile_frequencies(profile2, n_seqs2).T
+    
+    if len(rows) * lookup.shape[1] > max_cells:
+        return _hirschberg_path(rows, lookup, gap_penalty)
+    traceback, _ = _nw_fill(rows, lookup, gap_penalty)
+    return _trace_path(traceback)
+
+def align_batch_to_profile(profile: np.ndarray, n_seqs: int, queries: List[np.ndarray],
+                           gap_penalty: int = -8,
+                           max_cells: int = DEFAULT_MAX_CELLS) -> List[np.ndarray]:
+    """
+    Globally align a batch of sequences against one count profile at once.
+    
+    Falls back to one align_profiles call per query for a single query or
+    when the batched traceback would exceed max_cells.
+    
+    Args:
+        profile: Count profile
+        n_seqs: Number of sequences in the profile
+        queries: Query sequences as uint8 ASCII arrays
+        gap_penalty: Gap penalty for inserting a gap column
+        max_cells: Largest traceback (in cells) filled for the whole batch
+        
+    Returns:
+        One move array per query, as returned by align_profiles
+    """
+    code_arrays = [encode_protein(query) for query in queries]
+    longest = max(map(len, code_arrays), default=0)
+    
+    if len(queries) == 1 or len(profile) * len(queries) * (longest + 1) > max_cells:
+        return [align_profiles(profile, n_seqs, sequence_profile(query), 1,
+                               gap_penalty, max_cells)
+                for query in queries]
+    
+    row_weights = profile_frequencies(profile, n_seqs) @ BLOSUM62_ARRAY
+    traceback, _ = _nw_fill_batch(row_weights, _pad_codes(code_arrays), gap_penalty)
+    return [_trace_path(traceback[:, lane, :len(codes) + 1])
+            for lane, codes in enumerate(code_arrays)]
+
+def _align_batch_to_profile_parallel(executor: ProcessPoolExecutor, n_workers: int,
+                                     profile: np.ndarray, n_seqs: int,
+                                     queries: List[np.ndarray], gap_penalty: int,
+                                     max_cells: int) -> List[np.ndarray]:
+    """
+    Split a batch of queries across worker processes and align each part
+    against the same profile.
+    
+    A query's path does not depend on the other queries of its batch, so
+    the result equals align_batch_to_profile on the whole batch.
+    
+    Args:
+        executor: Process pool
+        n_workers: Number of parts to split the batch into
+        profile: Count profile
+        n_seqs: Number of sequences in the profile
+        queries: Query sequences as uint8 ASCII arrays
+        gap_penalty: Gap penalty for inserting a gap column
+        max_cells: Largest traceback (in cells) filled for one part
+        
+    Returns:
+        One move array per query, as returned by align_profiles
+    """
+    parts = balance_batches([len(query) + 1 for query in queries], n_workers)
+    futures = [executor.submit(align_batch_to_profile, profile, n_seqs,
+                               [queries[i] for i in part], gap_penalty, max_cells)
+               for part in parts]
+    paths = [None] * len(queries)
+    for part, future in zip(parts, futures):
+        for index, path in zip(part, future.result()):
+            paths[index] = path
+    return paths
+
+def merge_batch(profile: np.ndarray, n_seqs: int, queries: List[np.ndarray],
+                paths: List[np.ndarray]) -> Tuple[np.ndarray, np.ndarray, List[np.ndarray]]:
+    """
+    Merge a batch of sequences aligned to the same profile into it.
+    
+    Residues a query inserts between two profile columns go into new columns
+    in that slot; queries share those columns, so each slot only grows by the
+    longest insertion made there.
+    
+    Args:
+        profile: Count profile
+        n_seqs: Number of sequences in the profile
+        queries: Query sequences as uint8 ASCII arrays
+        paths: Moves of each query from align_batch_to_profile
+        
+    Returns:
+        Tuple of (merged profile, new column index of each profile column,
+        new column index of each residue of every query)
+    """
+    length = len(profile)
+    consumed = [np.cumsum(path != 2) - (path != 2) for path in paths]
+    slot_width = np.zeros(length + 1, dtype=np.int64)
+    for path, before in zip(paths, consumed):
+        np.maximum(slot_width, np.bincount(before[path == 2], minlength=length + 1),
+                   out=slot_width)
+    
+    inserted_before = np.cumsum(slot_width)
+    profile_columns = np.arange(length) + inserted_before[:length]
+    slot_start = np.arange(length + 1) + inserted_before - slot_width
+    
+    merged = np.zeros((length + int(slot_width.sum()), PROFILE_WIDTH))
+    merged[profile_columns] += profile
+    query_columns = []
+    
+    for query, path, before in zip(queries, paths, consumed):
+        columns = np.empty(len(path), dtype=np.int64)
+        matched = path == 0
+        columns[matched] = profile_columns[before[matched]]
+        
+        # k-th residue inserted in a slot goes to the slot's k-th column
+        inserted = np.flatnonzero(path == 2)
+        slots = before[inserted]
+        rank = np.arange(len(inserted)) - np.searchsorted(slots, slots)
+        columns[inserted] = slot_start[slots] + rank
+        
+        residue_columns = columns[path != 1]
+        merged[residue_columns, encode_protein(query)] += 1
+        query_columns.append(residue_columns)
+    
+    total = n_seqs + len(queries)
+    merged[:, GAP_CODE] = total - merged[:, :GAP_CODE].sum(axis=1)
+    return merged, profile_columns, query_columns
+
+def profile_progressive_alignment(sequences: Dict[str, dict], sorted_ids: List[str],
+                                  gap_penalty: int = -8,
+                                  max_cells: int = DEFAULT_MAX_CELLS,
+                                  backend: str = 'numpy',
+                                  threads: int = 1,
+                                  batch_size: int = 1) -> AlignmentMatrix:
+    """
+    Perform progressive alignment of each sequence against the growing profile.
+    
+    Sequences join one profile in sorted_ids order (the guide tree's leaf
+    order), rather than being merged as sibling sub-profiles bottom-up
+    along the tree; every step is still a profile alignment scored by
+    align_profiles, with the new sequence as a profile of one.
+    
+    Aligned rows are never rebuilt during the run: each merge only records
+    where the old profile columns moved, and the column maps are composed
+    once at the end to place every residue. Each merge depends on the
+    previous one, so worker processes only share out the queries of a batch.
+    
+    Args:
+        sequences: Dictionary of processed sequences
+        sorted_ids: Sequence IDs sorted by similarity
+        gap_penalty: Gap penalty for alignment
+        max_cells: Largest DP matrix aligned with a full traceback
+        backend: Ignored; profile columns are always aligned by the BLOSUM62
+            profile DP (Hirschberg above max_cells), as pairwise backends
+            only align two plain sequences
+        threads: Worker processes aligning the queries of each batch
+            (only used with batch_size > 1)
+        batch_size: Consecutive sequences aligned to the same profile at once
+        
+    Returns:
+        AlignmentMatrix of the aligned sequences
+    """
+    if not sorted_ids:
+        return AlignmentMatrix.from_dict({})
+    
+    first_seq = amino_acid_bytes(sequences, sorted_ids[0])
+    profile = sequence_profile(first_seq)
+    n_seqs = 1
+    
+    # Residue columns of each sequence in the profile it joined, the number
+    # of merges done by then, and the column map of the profile at each merge
+    placements = [np.arange(len(first_seq))]
+    joined = [0]
+    column_maps = []
+    
+    if backend != 'numpy':
+        logging.warning(f"The profile engine does not use the {backend} alignment "
+                        f"backend; only the pairwise engine does")
+    
+    executor = None
+    if threads > 1 and batch_size > 1:
+        executor = ProcessPoolExecutor(max_workers=threads)
+    elif threads > 1:
+        logging.warning(f"The profile engine only uses {threads} worker processes "
+                        f"with a batch size above 1; aligning serially")
+    
+    try:
+        for start in range(1, len(sorted_ids), max(1, batch_size)):
+            group = sorted_ids[start:start + max(1, batch_size)]
+            queries = [amino_acid_bytes(sequences, seq_id) for seq_id in group]
+            if executor is not None and len(queries) > 1:
+                paths = _align_batch_to_profile_parallel(executor, threads, profile, n_seqs,
+                                                         queries, gap_penalty, max_cells)
+            else:
+                paths = align_batch_to_profile(profile, n_seqs, queries, gap_penalty, max_cells)
+            profile, profile_columns, query_columns = merge_batch(
+                profile, n_seqs, queries, paths
+            )
+            n_seqs += len(group)
+            column_maps.append(profile_columns)
+            placements.extend(query_columns)
+            joined.extend([len(column_maps)] * len(group))
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    
+    # Compose column maps from the last merge backwards
+    aligned = np.full((len(sorted_ids), len(profile)), ord('-'), dtype=np.uint8)
+    final_columns = np.arange(len(profile))
+    state = len(column_maps)
+    for index in range(len(sorted_ids) - 1, -1, -1):
+        while joined[index] < state:
+            final_columns = final_columns[column_maps[state - 1]]
+            state -= 1
+        residues = amino_acid_bytes(sequences, sorted_ids[index])
+        aligned[index, final_columns[placements[index]]] = residues
+    
+    return AlignmentMatrix(sorted_ids, aligned)
+
+# Progressive alignment strategies selectable by name
+PROGRESSIVE_ENGINES = {
+    'profile': profile_progressive_alignment,
+    'pairwise': pairwise_progressive_alignment,
+}
+
+def progressive_alignment(sequences: Dict[str, dict], sorted_ids: List[str], 
+                         gap_penalty: int = -8,
+                         max_cells: int = DEFAULT_MAX_CELLS,
+                         backend: str = 'numpy',
+                         engine: str = 'profile',
+                         threads: int = 1,
+                         batch_size: int = 1) -> AlignmentMatrix:
+    """
+    Perform progressive multiple sequence alignment.
+    
+    Args:
+        sequences: Dictionary of processed sequences
+        sorted_ids: Sequence IDs sorted by similarity
+        gap_penalty: Gap penalty for alignment
+        max_cells: Largest DP matrix aligned with a full traceback;
+            bigger pairs use linear-memory Hirschberg alignment
+        backend: Pairwise alignment backend used by the 'pairwise' engine
+            (the 'profile' engine ignores it)
+        engine: Progressive strategy (see PROGRESSIVE_ENGINES)
+        threads: Worker processes for the pairwise alignments ('pairwise'
+            engine) or the queries of each batch ('profile' engine)
+        batch_size: Sequences aligned to the same profile at once ('profile'
+            engine) or pairs per worker task ('pairwise' engine)
+        
+    Returns:
+        AlignmentMatrix of the aligned sequences
+    """
+    if engine not in PROGRESSIVE_ENGINES:
+        raise ValueError(f"Unknown progressive alignment engine: {engine}")
+    return PROGRESSIVE_ENGINES[engine](
+        sequences, sorted_ids, gap_penalty, max_cells, backend, threads, batch_size
+    )
 
 def add_gaps_to_match(seq: str, target: str) -> str:
     """
@@ -194,23 +1515,37 @@ def add_gaps_to_match(seq: str, target: str) -> str:
     return ''.join(result)
 
 def perform_progressive_alignment(sequences: Dict[str, dict], 
-                                gap_penalty: int = -8) -> Dict[str, str]:
+                                gap_penalty: int = -8,
+                                max_cells: int = DEFAULT_MAX_CELLS,
+                                backend: str = 'numpy',
+                                engine: str = 'profile',
+                                threads: int = 1,
+                                batch_size: int = 1) -> AlignmentMatrix:
     """
     Main function to perform progressive multiple sequence alignment.
     
     Args:
         sequences: Dictionary of processed sequences
         gap_penalty: Gap penalty for alignment
+        max_cells: Cell budget above which pairs use Hirschberg alignment
+        backend: Pairwise alignment backend (see ALIGNMENT_BACKENDS)
+        engine: Progressive strategy (see PROGRESSIVE_ENGINES)
+        threads: Worker processes for independent pairwise alignments
+        batch_size: Sequences aligned to the same profile at once, or pairs
+            per worker task (see PROGRESSIVE_ENGINES)
         
     Returns:
-        Dictionary of aligned amino acid sequences
+        AlignmentMatrix of aligned amino acid sequences
     """
     sorted_ids = list(sequences.keys())  # Already sorted from previous step
     
     if len(sorted_ids) == 1:
-        return {sorted_ids[0]: sequences[sorted_ids[0]]['amino_acid']}
+        return AlignmentMatrix.from_dict({sorted_ids[0]: sequences[sorted_ids[0]]['amino_acid']})
     
-    aligned_sequences = progressive_alignment(sequences, sorted_ids, gap_penalty)
+    aligned_sequences = progressive_alignment(
+        sequences, sorted_ids, gap_penalty, max_cells, backend, engine, threads,
+        batch_size
+    )
     
     logging.info(f"Completed progressive alignment of {len(aligned_sequences)} sequences")
     return aligned_sequences
\ No newline at end of file
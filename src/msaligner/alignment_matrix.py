@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Contiguous byte matrix of aligned sequences passed between pipeline stages.
+"""
+
+import logging
+from collections.abc import Mapping
+from typing import Dict, List, Optional
+import numpy as np
+
+from msaligner.fasta_reader import iter_fasta
+
+# Gap character of every alignment row
+GAP = ord('-')
+
+class AlignmentMatrix(Mapping):
+    """
+    Aligned sequences held as one N x L uint8 array of ASCII codes.
+    
+    Behaves like the Dict[str, str] the stages used to exchange (IDs map to
+    aligned strings, decoded only when read), while columnar code can work
+    on the matrix, zero-copy row, column and codon views, and a gap mask
+    computed once on first use. Rows shorter than the widest one are padded
+    with gaps in the matrix but keep their own length as strings.
+    """
+    __slots__ = ('_ids', '_rows', '_matrix', '_lengths', '_gaps')
+    
+    def __init__(self, ids: List[str], matrix: np.ndarray, lengths: Optional[np.ndarray] = None):
+        """
+        Wrap an alignment matrix.
+        
+        Args:
+            ids: Sequence ID of each row
+            matrix: N x L uint8 array of ASCII codes
+            lengths: Length of each row as a string (defaults to L)
+        """
+        self._ids = list(ids)
+        self._rows = {seq_id: row for row, seq_id in enumerate(self._ids)}
+        self._matrix = matrix
+        self._lengths = lengths if lengths is not None else \
+            np.full(len(self._ids), self._matrix.shape[1], dtype=np.int64)
+        self._gaps = None
+    
+    @classmethod
+    def from_rows(cls, ids: List[str], rows: List[bytes]) -> 'AlignmentMatrix':
+        """
+        Pack aligned byte strings into a matrix.
+        
+        Args:
+            ids: Sequence IDs
+            rows: Aligned sequence of each ID as ASCII bytes
+            
+        Returns:
+            AlignmentMatrix
+        """
+        lengths = np.array([len(row) for row in rows], dtype=np.int64)
+        width = int(lengths.max()) if len(rows) else 0
+        if len(rows) and np.all(lengths == width):
+            matrix = np.frombuffer(b''.join(rows), dtype=np.uint8).reshape(len(rows), width).copy()
+        else:
+            matrix = np.full((len(rows), width), GAP, dtype=np.uint8)
+            for index, row in enumerate(rows):
+                matrix[index, :len(row)] = np.frombuffer(row, dtype=np.uint8)
+        return cls(ids, matrix, lengths)
+    
+    @classmethod
+    def from_dict(cls, alignment: Dict[str, str]) -> 'AlignmentMatrix':
+        """
+        Pack a dictionary of aligned sequences.
+        
+        Args:
+            alignment: Dictionary mapping sequence IDs to aligned sequences
+            
+        Returns:
+            AlignmentMatrix (the same object if alignment already is one)
+        """
+        if isinstance(alignment, AlignmentMatrix):
+            return alignment
+        return cls.from_rows(list(alignment),
+                             [row.encode('ascii', 'replace') for row in alignment.values()])
+    
+    @classmethod
+    def read_fasta(cls, file_path: str) -> 'AlignmentMatrix':
+        """
+        Read an aligned FASTA file (sequences are upper-cased).
+        
+        Args:
+            file_path: Path to the FASTA file
+            
+        Returns:
+            AlignmentMatrix
+        """
+        ids, rows = [], []
+        for seq_id, row in iter_fasta(file_path):
+            ids.append(seq_id)
+            rows.append(row)
+        return cls.from_rows(ids, rows)
+    
+    def write_fasta(self, file_path: str):
+        """
+        Write the alignment as FASTA, one line per sequence.
+        
+        Args:
+            file_path: Output file path
+        """
+        with open(file_path, 'wb') as handle:
+            for index, seq_id in enumerate(self._ids):
+                handle.write(b'>' + seq_id.encode('utf-8') + b'\n')
+                handle.write(self._matrix[index, :self._lengths[index]].tobytes())
+                handle.write(b'\n')
+        logging.debug(f"Wrote {len(self)} aligned sequences to {file_path}")
+    
+    def to_dict(self) -> Dict[str, str]:
+        """Copy the alignment into a dictionary of strings."""
+        return dict(self.items())
+    
+    def __getitem__(self, seq_id: str) -> str:
+        return self.row(seq_id).tobytes().decode('ascii')
+    
+    def __iter__(self):
+        return iter(self._ids)
+    
+    def __len__(self) -> int:
+        return len(self._ids)
+    
+    def __contains__(self, seq_id) -> bool:
+        return seq_id in self._rows
+    
+    def __repr__(self) -> str:
+        return f"AlignmentMatrix({len(self)} sequences x {self.width} columns)"
+    
+    @property
+    def ids(self) -> List[str]:
+        """Sequence IDs in row order."""
+        return list(self._ids)
+    
+    @property
+    def matrix(self) -> np.ndarray:
+        """The N x L uint8 matrix (not a copy)."""
+        return self._matrix
+    
+    @property
+    def lengths(self) -> np.ndarray:
+        """Length of each row as a string."""
+        return self._lengths
+    
+    @property
+    def width(self) -> int:
+        """Number of alignment columns."""
+        return self._matrix.shape[1]
+    
+    @property
+    def gap_mask(self) -> np.ndarray:
+        """Boolean N x L matrix of gap cells, computed on first use."""
+        if self._gaps is None:
+            self._gaps = self._matrix == GAP
+        return self._gaps
+    
+    def row(self, seq_id: str) -> np.ndarray:
+        """
+        Get an aligned sequence as a zero-copy uint8 view.
+        
+        Args:
+            seq_id: Sequence ID
+            
+        Returns:
+            uint8 array of ASCII codes
+        """
+        index = self._rows[seq_id]
+        return self._matrix[index, :self._lengths[index]]
+    
+    def column(self, index: int) -> np.ndarray:
+        """
+        Get one alignment column as a zero-copy uint8 view.
+        
+        Args:
+            index: Column index
+            
+        Returns:
+            uint8 array with one entry per sequence
+        """
+        return self._matrix[:, index]
+    
+    def codons(self) -> np.ndarray:
+        """
+        View a nucleotide alignment as codons without copying.
+        
+        Returns:
+            N x (L // 3) x 3 uint8 view; a trailing partial codon is left out
+        """
+        n_rows, n_codons = self._matrix.shape[0], self.width // 3
+        stride_row, stride_column = self._matrix.strides
+        return np.lib.stride_tricks.as_strided(
+            self._matrix, shape=(n_rows, n_codons, 3),
+            strides=(stride_row, 3 * stride_column, stride_column), writeable=False
+        )
+    
+    def codon_slice(self, start: int, stop: Optional[int] = None) -> 'AlignmentMatrix':
+        """
+        Select a range of codon positions of a nucleotide alignment.
+        
+        Args:
+            start: First codon position (0-based)
+            stop: One past the last codon position (defaults to the end)
+            
+        Returns:
+            AlignmentMatrix sharing this matrix's buffer
+        """
+        first = 3 * start
+        last = self.width if stop is None else min(3 * stop, self.width)
+        lengths = np.clip(self._lengths - first, 0, max(last - first, 0))
+        return AlignmentMatrix(self._ids, self._matrix[:, first:last], lengths)
+    
+    def select(self, seq_ids: List[str]) -> 'AlignmentMatrix':
+        """
+        Select and reorder rows.
+        
+        Args:
+            seq_ids: Sequence IDs to keep, in the new row order
+            
+        Returns:
+            AlignmentMatrix with copied rows
+        """
+        rows = np.array([self._rows[seq_id] for seq_id in seq_ids], dtype=np.int64)
+        return AlignmentMatrix(seq_ids, self._matrix[rows], self._lengths[rows])
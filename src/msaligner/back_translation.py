@@ -5,39 +5,79 @@ Back-translation module for converting amino acid alignments to codon alignments
 
 import logging
 from typing import Dict, List
+import numpy as np
+
+from msaligner.alignment_matrix import AlignmentMatrix
+from msaligner.sequence_store import orf_bytes
+
+# Alignment cells back-translated at a time by back_translate_alignment
+BACK_TRANSLATION_BLOCK_CELLS = 1 << 22
 
 def create_codon_alignment(aa_alignment: Dict[str, str], 
-                          sequences_data: Dict[str, dict]) -> Dict[str, str]:
+                          sequences_data: Dict[str, dict]) -> AlignmentMatrix:
     """
     Convert amino acid alignment back to codon-aware nucleotide alignment.
     
     Args:
-        aa_alignment: Aligned amino acid sequences
+        aa_alignment: AlignmentMatrix or dictionary of aligned amino acid sequences
         sequences_data: Original sequence data with ORF information
         
     Returns:
-        Dictionary of aligned nucleotide sequences
+        AlignmentMatrix of aligned nucleotide sequences
     """
-    codon_alignment = {}
-    
-    for seq_id, aligned_aa in aa_alignment.items():
+    aa_matrix = AlignmentMatrix.from_dict(aa_alignment)
+    seq_ids = []
+    for seq_id in aa_matrix:
         if seq_id not in sequences_data:
             logging.warning(f"Sequence {seq_id} not found in original data")
             continue
+        seq_ids.append(seq_id)
+    if len(seq_ids) < len(aa_matrix):
+        aa_matrix = aa_matrix.select(seq_ids)
+    
+    return back_translate_alignment(aa_matrix, [orf_bytes(sequences_data, seq_id) for seq_id in seq_ids])
+
+def back_translate_alignment(aa_alignment: AlignmentMatrix, orfs: List[np.ndarray]) -> AlignmentMatrix:
+    """
+    Back-translate a whole amino acid alignment at once.
+    
+    A running count of residues in each row of the N x L alignment matrix
+    gives every residue's codon offset in its ORF, and the N x 3L nucleotide
+    matrix is gathered from the packed ORFs in one indexing step per block
+    of rows. Each row is identical to back_translate_single_sequence.
+    
+    Args:
+        aa_alignment: Aligned amino acid sequences
+        orfs: ORF of each row as uint8 ASCII codes
         
-        seq_data = sequences_data[seq_id]
-        nt_seq = seq_data['nucleotide']
-        orf_start = seq_data['orf_start']
-        orf_end = seq_data['orf_end']
-        
-        # Extract ORF region
-        orf_nt = nt_seq[orf_start:orf_end]
+    Returns:
+        AlignmentMatrix of aligned nucleotide sequences
+    """
+    matrix = aa_alignment.matrix
+    n_rows, width = matrix.shape
+    orf_lengths = np.array([len(orf) for orf in orfs], dtype=np.int64)
+    orf_starts = np.cumsum(orf_lengths) - orf_lengths
+    # Gaps and NNN codons read the padding bytes before being overwritten
+    orf_buffer = np.concatenate([np.asarray(orf, dtype=np.uint8) for orf in orfs] +
+                                [np.zeros(3, dtype=np.uint8)])
+    
+    nucleotides = np.empty((n_rows, width * 3), dtype=np.uint8)
+    block_rows = max(1, BACK_TRANSLATION_BLOCK_CELLS // max(width, 1))
+    for start in range(0, n_rows, block_rows):
+        rows = slice(start, start + block_rows)
+        block = matrix[rows]
+        residue = block != ord('-')
+        # Start of each residue's codon within its ORF
+        codon_starts = (np.cumsum(residue, axis=1) - 1) * 3
+        copied = residue & (block != ord('X')) & (codon_starts + 3 <= orf_lengths[rows, None])
         
-        # Create codon alignment
-        aligned_nt = back_translate_single_sequence(aligned_aa, orf_nt)
-        codon_alignment[seq_id] = aligned_nt
+        positions = np.where(copied, codon_starts + orf_starts[rows, None], len(orf_buffer) - 3)
+        codons = orf_buffer[positions[:, :, None] + np.arange(3)]
+        codons[~residue] = ord('-')
+        codons[residue & ~copied] = ord('N')
+        nucleotides[rows] = codons.reshape(len(block), width * 3)
     
-    return codon_alignment
+    return AlignmentMatrix(aa_alignment.ids, nucleotides, aa_alignment.lengths * 3)
 
 def back_translate_single_sequence(aligned_aa: str, original_orf_nt: str) -> str:
     """
@@ -9,9 +9,12 @@ import os
 from pathlib import Path
 import logging
 
-from msaligner.orf_detection import process_sequences
-from msaligner.kmer_similarity import sort_sequences_by_similarity
-from msaligner.alignment import perform_progressive_alignment
+from msaligner.orf_detection import process_sequences, ORF_CHUNK_SIZE
+from msaligner.kmer_similarity import sort_sequences_by_similarity, KMER_ALPHABETS
+from msaligner.alignment import (
+    perform_progressive_alignment, ALIGNMENT_BACKENDS, PROGRESSIVE_ENGINES,
+    DEFAULT_MAX_CELLS
+)
 from msaligner.back_translation import create_codon_alignment
 from msaligner.statistics import generate_statistics
 from msaligner.visualization import create_visualizations
@@ -51,6 +54,36 @@ Examples:
         help='Output directory for results'
     )
     
+    parser.add_argument(
+        '--six-frame',
+        action='store_true',
+        help='Also search the reverse strand for ORFs; minus-strand ORFs are '
+             'translated and back-translated from their reverse complement'
+    )
+    
+    parser.add_argument(
+        '--faidx',
+        action='store_true',
+        help='Read nucleotide sequences on demand through a faidx index saved '
+             'next to the input (<input>.fai) instead of keeping them in memory'
+    )
+    
+    parser.add_argument(
+        '--orf-cache',
+        type=str,
+        default=None,
+        help='SQLite cache of ORFs and translations keyed by sequence content, '
+             'reused and extended across runs'
+    )
+    
+    parser.add_argument(
+        '--orf-chunk-size',
+        type=int,
+        default=ORF_CHUNK_SIZE,
+        help='FASTA records per worker task when detecting ORFs with '
+             f'--threads above 1 (default: {ORF_CHUNK_SIZE})'
+    )
+    
     parser.add_argument(
         '--kmer-size', '-k',
         type=int,
@@ -58,6 +91,54 @@ Examples:
         help='k-mer size for similarity calculation (default: 6)'
     )
     
+    parser.add_argument(
+        '--similarity',
+        choices=['kmer', 'alignment', 'sketch'],
+        default='kmer',
+        help='Similarity used to order sequences: k-mer cosine, exact '
+             'alignment scores, or a MinHash nearest-neighbour graph for '
+             'large inputs (default: kmer)'
+    )
+    
+    parser.add_argument(
+        '--alphabet',
+        choices=sorted(KMER_ALPHABETS),
+        default='full',
+        help='Amino acid grouping applied before k-mer counting; reduced '
+             'alphabets allow dense counting (default: full)'
+    )
+    
+    parser.add_argument(
+        '--guide-tree',
+        choices=['upgma', 'nj', 'greedy', 'knn'],
+        default='upgma',
+        help='How to order sequences for progressive alignment; knn follows '
+             'nearest neighbours in a k-mer index (default: upgma)'
+    )
+    
+    parser.add_argument(
+        '--tree-file',
+        type=str,
+        default=None,
+        help='Newick guide tree to reuse if it exists, otherwise written there'
+    )
+    
+    parser.add_argument(
+        '--matrix-file',
+        type=str,
+        default=None,
+        help='Keep the k-mer similarity matrix in this memory-mapped float32 '
+             'file and reuse it on later runs with the same input and k'
+    )
+    
+    parser.add_argument(
+        '--index-file',
+        type=str,
+        default=None,
+        help='k-mer index used by --guide-tree knn; new sequences are added '
+             'to an existing index and it is saved back'
+    )
+    
     parser.add_argument(
         '--gap-penalty', '-g',
         type=int,
@@ -65,6 +146,50 @@ Examples:
         help='Gap penalty for alignment (default: -8)'
     )
     
+    parser.add_argument(
+        '--engine',
+        choices=sorted(PROGRESSIVE_ENGINES),
+        default='profile',
+        help='Progressive alignment strategy: align to the growing profile '
+             'or pairwise to the first sequence (default: profile)'
+    )
+    
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=1,
+        help='Sequences aligned to the growing profile at once by the '
+             'profile engine, split across --threads; pairs per worker task '
+             'for the pairwise engine (default: 1)'
+    )
+    
+    parser.add_argument(
+        '--aligner',
+        choices=sorted(ALIGNMENT_BACKENDS),
+        default='numpy',
+        help='Pairwise alignment backend of the pairwise engine; auto uses '
+             'wavefront alignment for near-identical pairs. The profile engine '
+             'ignores it and always runs its own BLOSUM62 profile alignment '
+             '(default: numpy)'
+    )
+    
+    parser.add_argument(
+        '--max-dp-cells',
+        type=int,
+        default=DEFAULT_MAX_CELLS,
+        help='Largest pairwise DP matrix before switching to linear-memory '
+             f'Hirschberg alignment (default: {DEFAULT_MAX_CELLS})'
+    )
+    
+    parser.add_argument(
+        '--threads', '-t',
+        type=int,
+        default=1,
+        help='Worker processes for ORF detection, alignment similarity, '
+             'pairwise alignment and, with --batch-size above 1, the '
+             'profile engine (default: 1)'
+    )
+    
     parser.add_argument(
         '--verbose', '-v',
         action='store_true',
@@ -89,21 +214,26 @@ def main():
     outdir = Path(args.outdir)
     outdir.mkdir(parents=True, exist_ok=True)
     
+    sequences_data = None
     try:
         # Step 1: ORF detection and translation
         logging.info("Step 1: Detecting ORFs and translating sequences")
-        sequences_data = process_sequences(args.input)
+        sequences_data = process_sequences(args.input, args.six_frame, args.threads,
+                                           args.orf_chunk_size, args.faidx, args.orf_cache)
         
         # Step 2: k-mer similarity and sorting
         logging.info("Step 2: Calculating k-mer similarity and sorting sequences")
         sorted_sequences = sort_sequences_by_similarity(
-            sequences_data, args.kmer_size
+            sequences_data, args.kmer_size, args.similarity, args.gap_penalty,
+            args.guide_tree, args.tree_file, args.threads, args.matrix_file,
+            args.index_file, args.alphabet
         )
         
         # Step 3: Progressive alignment
         logging.info("Step 3: Performing progressive alignment")
         aa_alignment = perform_progressive_alignment(
-            sorted_sequences, args.gap_penalty
+            sorted_sequences, args.gap_penalty, args.max_dp_cells,
+            args.aligner, args.engine, args.threads, args.batch_size
         )
         
         # Step 4: Back-translation
@@ -123,15 +253,11 @@ def main():
         
         # Save amino acid alignment
         aa_output = outdir / "aligned_amino_acids.fasta"
-        with open(aa_output, 'w') as f:
-            for seq_id, alignment in aa_alignment.items():
-                f.write(f">{seq_id}\n{alignment}\n")
+        aa_alignment.write_fasta(aa_output)
         
         # Save nucleotide alignment
         nt_output = outdir / "aligned_nucleotides.fasta"
-        with open(nt_output, 'w') as f:
-            for seq_id, alignment in nt_alignment.items():
-                f.write(f">{seq_id}\n{alignment}\n")
+        nt_alignment.write_fasta(nt_output)
         
         # Save statistics
         stats_output = outdir / "codon_statistics.csv"
@@ -142,10 +268,13 @@ def main():
         logging.info(f"  - Amino acid alignment: {aa_output}")
         logging.info(f"  - Nucleotide alignment: {nt_output}")
         logging.info(f"  - Statistics: {stats_output}")
-        
+    
     except Exception as e:
         logging.error(f"Pipeline failed: {str(e)}")
         sys.exit(1)
+    finally:
+        if sequences_data is not None:
+            sequences_data.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
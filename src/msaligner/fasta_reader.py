@@ -0,0 +1,424 @@
+#!/usr/bin/env python3
+"""
+Streaming FASTA reader for plain, gzip and bgzip files, and faidx-indexed
+random access to plain files.
+"""
+
+import gzip
+import logging
+import mmap
+import os
+from typing import Dict, Iterator, NamedTuple, Optional, Tuple
+import numpy as np
+
+# Bytes read from a compressed or non-mapped file at a time
+FASTA_BLOCK_SIZE = 1 << 20
+
+# Leading bytes of a gzip (and therefore bgzip) member
+GZIP_MAGIC = b'\x1f\x8b'
+
+# Whitespace dropped from sequence lines
+_SEQUENCE_WHITESPACE = b' \t\r\n\v\f'
+
+# Byte table mapping lower-case ASCII letters to upper case
+_UPPER = bytes(range(256)).upper()
+
+def is_gzipped(file_path: str) -> bool:
+    """
+    Check whether a file is gzip or bgzip compressed.
+    
+    Args:
+        file_path: File path
+        
+    Returns:
+        True if the file starts with the gzip magic bytes
+    """
+    with open(file_path, 'rb') as handle:
+        return handle.read(len(GZIP_MAGIC)) == GZIP_MAGIC
+
+def _record(data, start: int, end: int) -> Tuple[str, bytes]:
+    """
+    Parse one record occupying data[start:end], starting at its '>'.
+    
+    Args:
+        data: bytes, bytearray or mmap holding the record
+        start: Offset of the record's '>'
+        end: Offset just past the record's last sequence byte
+        
+    Returns:
+        Tuple of (sequence ID, upper-case sequence bytes without whitespace)
+    """
+    header_end = data.find(b'\n', start, end)
+    if header_end == -1:
+        header_end = end
+    title = bytes(data[start + 1:header_end]).decode('utf-8', 'replace').split(None, 1)
+    sequence = bytes(data[header_end + 1:end]).translate(_UPPER, _SEQUENCE_WHITESPACE)
+    return (title[0] if title else ''), sequence
+
+def _first_record(data) -> int:
+    """Offset of the first '>' starting a line, or -1."""
+    if data[:1] == b'>':
+        return 0
+    position = data.find(b'\n>')
+    return position + 1 if position != -1 else -1
+
+def _iter_mapped(handle) -> Iterator[Tuple[str, bytes]]:
+    """
+    Yield the records of a plain file through a read-only memory map.
+    
+    Args:
+        handle: Binary file object of a non-empty file
+        
+    Yields:
+        (sequence ID, sequence bytes) tuples
+    """
+    with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        start = _first_record(data)
+        while start != -1:
+            boundary = data.find(b'\n>', start)
+            end = boundary if boundary != -1 else len(data)
+            yield _record(data, start, end)
+            start = boundary + 1 if boundary != -1 else -1
+
+def _iter_blocks(handle, block_size: int) -> Iterator[Tuple[str, bytes]]:
+    """
+    Yield the records of a binary stream read in blocks.
+    
+    Only bytes of the record being assembled are kept between blocks.
+    
+    Args:
+        handle: Binary file object
+        block_size: Bytes read at a time
+        
+    Yields:
+        (sequence ID, sequence bytes) tuples
+    """
+    pending = bytearray()
+    start = -1
+    while True:
+        block = handle.read(block_size)
+        # A boundary may straddle the previous block, so rescan its last byte
+        scan_from = max(len(pending) - 1, 0)
+        pending += block
+        if start == -1:
+            start = _first_record(pending)
+            if start == -1:
+                # Only a trailing newline can begin the next record's line
+                del pending[:len(pending) if pending[-1:] != b'\n' else len(pending) - 1]
+                if not block:
+                    return
+                continue
+            scan_from = start
+        
+        while True:
+            boundary = pending.find(b'\n>', max(scan_from, start))
+            if boundary == -1:
+                break
+            yield _record(pending, start, boundary)
+            start = scan_from = boundary + 1
+        
+        if not block:
+            yield _record(pending, start, len(pending))
+            return
+        del pending[:start]
+        start = 0
+
+def iter_fasta(file_path: str, block_size: int = FASTA_BLOCK_SIZE,
+               use_mmap: bool = True) -> Iterator[Tuple[str, bytes]]:
+    """
+    Stream the records of a FASTA file.
+    
+    gzip and bgzip files are decompressed on the fly and read in blocks;
+    plain files are memory-mapped unless use_mmap is False. Sequence IDs
+    are the first word of each header, as in Bio.SeqIO; text before the
+    first header is skipped.
+    
+    Args:
+        file_path: Path to the FASTA file
+        block_size: Bytes read at a time from non-mapped files
+        use_mmap: Memory-map plain files
+        
+    Yields:
+        (sequence ID, upper-case sequence bytes) tuples in file order
+    """
+    if is_gzipped(file_path):
+        with gzip.open(file_path, 'rb') as handle:
+            yield from _iter_blocks(handle, block_size)
+        return
+    
+    with open(file_path, 'rb') as handle:
+        if use_mmap and os.fstat(handle.fileno()).st_size > 0:
+            yield from _iter_mapped(handle)
+        else:
+            yield from _iter_blocks(handle, block_size)
+
+# Extension of the samtools-compatible index written next to a FASTA file
+FAIDX_SUFFIX = '.fai'
+
+class FastaIndexEntry(NamedTuple):
+    """One line of a faidx index."""
+    length: int
+    offset: int
+    line_bases: int
+    line_width: int
+
+class _RecordLines:
+    """
+    Running faidx counters of the record being indexed, fed its lines a
+    block at a time.
+    """
+    __slots__ = ('seq_id', 'offset', 'length', 'line_bases', 'line_width',
+                 'last_full', 'blank_seen')
+    
+    def __init__(self, seq_id: str, offset: int):
+        self.seq_id = seq_id
+        self.offset = offset
+        self.length = 0
+        self.line_bases = self.line_width = 0
+        # Whether the last non-blank line so far is full (None before any)
+        self.last_full = None
+        self.blank_seen = False
+    
+    def add(self, bases: np.ndarray, widths: np.ndarray) -> bool:
+        """
+        Account for consecutive sequence lines of the record.
+        
+        Trailing blank lines are allowed; every other line but the last
+        must be full.
+        
+        Args:
+            bases: Bases of each line, without the \\n or \\r\\n terminator
+            widths: Bytes of each line, terminator included
+            
+        Returns:
+            False if the lines break the faidx layout
+        """
+        self.length += int(bases.sum())
+        filled = np.flatnonzero(bases)
+        if not len(filled):
+            self.blank_seen |= len(bases) > 0
+            return True
+        n_lines = int(filled[-1]) + 1
+        if self.blank_seen or len(filled) != n_lines:
+            return False
+        if self.last_full is None:
+            self.line_bases, self.line_width = int(bases[0]), int(widths[0])
+        elif not self.last_full:
+            return False
+        inner_bases, inner_widths = bases[:n_lines - 1], widths[:n_lines - 1]
+        if (np.any(inner_bases != self.line_bases) or np.any(inner_widths != self.line_width)
+                or bases[n_lines - 1] > self.line_bases):
+            return False
+        self.last_full = bool(bases[n_lines - 1] == self.line_bases and
+                              widths[n_lines - 1] == self.line_width)
+        self.blank_seen = n_lines < len(bases)
+        return True
+    
+    def entry(self) -> FastaIndexEntry:
+        """Index entry of the lines seen so far."""
+        return FastaIndexEntry(self.length, self.offset, self.line_bases, self.line_width)
+
+def _iter_lines(text: np.ndarray, block_size: int) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Yield the line boundaries of a byte array one block at a time.
+    
+    Args:
+        text: uint8 array, usually a view of a memory map
+        block_size: Bytes scanned at a time
+        
+    Yields:
+        (line starts, line ends) arrays of the lines ending in each block;
+        line ends are exclusive and include the terminator
+    """
+    line_start = 0
+    for block_start in range(0, len(text), block_size):
+        block = text[block_start:block_start + block_size]
+        line_ends = np.flatnonzero(block == ord('\n')) + (block_start + 1)
+        if len(line_ends):
+            yield np.append(line_start, line_ends[:-1]), line_ends
+            line_start = int(line_ends[-1])
+    if line_start < len(text):
+        yield np.array([line_start]), np.array([len(text)])
+
+def build_fasta_index(file_path: str, block_size: int = FASTA_BLOCK_SIZE) -> Dict[str, FastaIndexEntry]:
+    """
+    Compute the faidx offset/length table of a plain FASTA file.
+    
+    The file is memory-mapped and scanned in blocks, so only the line
+    boundaries of one block and the counters of one record are held at a
+    time.
+    
+    Args:
+        file_path: Path to an uncompressed FASTA file
+        block_size: Bytes scanned at a time
+        
+    Returns:
+        Dictionary mapping sequence IDs to index entries, in file order; a
+        repeated ID keeps its first position and its last entry
+        
+    Raises:
+        ValueError: If the file is compressed or a record's lines do not
+            all have the same length
+    """
+    if is_gzipped(file_path):
+        raise ValueError(f"Cannot index compressed FASTA file {file_path}")
+    index = {}
+    with open(file_path, 'rb') as handle:
+        if os.fstat(handle.fileno()).st_size == 0:
+            return index
+        with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            text = np.frombuffer(data, dtype=np.uint8)
+            try:
+                record = None
+                for line_starts, line_ends in _iter_lines(text, block_size):
+                    widths = line_ends - line_starts
+                    terminated = text[line_ends - 1] == ord('\n')
+                    carriage = (widths > 1) & (text[np.maximum(line_ends - 2, line_starts)] == ord('\r'))
+                    bases = widths - terminated - (terminated & carriage)
+                    headers = np.flatnonzero(text[line_starts] == ord('>'))
+                    
+                    bounds = np.append(headers, len(line_starts))
+                    if record is not None and not record.add(bases[:bounds[0]], widths[:bounds[0]]):
+                        raise ValueError(f"Different line lengths in sequence {record.seq_id} of {file_path}")
+                    for header, next_header in zip(bounds[:-1], bounds[1:]):
+                        if record is not None:
+                            index[record.seq_id] = record.entry()
+                        words = data[line_starts[header] + 1:line_ends[header]].decode('utf-8', 'replace').split(None, 1)
+                        record = _RecordLines(words[0] if words else '', int(line_ends[header]))
+                        lines = slice(header + 1, next_header)
+                        if not record.add(bases[lines], widths[lines]):
+                            raise ValueError(f"Different line lengths in sequence {record.seq_id} of {file_path}")
+            finally:
+                # The map cannot close while a view of it is alive
+                del text
+            if record is not None:
+                index[record.seq_id] = record.entry()
+    return index
+
+def write_fasta_index(index: Dict[str, FastaIndexEntry], index_path: str):
+    """
+    Write a faidx index file.
+    
+    Args:
+        index: Index entries by sequence ID
+        index_path: Output path, usually the FASTA path plus FAIDX_SUFFIX
+    """
+    with open(index_path, 'w') as handle:
+        for seq_id, entry in index.items():
+            handle.write(f"{seq_id}\t{entry.length}\t{entry.offset}\t"
+                         f"{entry.line_bases}\t{entry.line_width}\n")
+
+def read_fasta_index(index_path: str) -> Dict[str, FastaIndexEntry]:
+    """
+    Read a faidx index file.
+    
+    Args:
+        index_path: Index file path
+        
+    Returns:
+        Dictionary mapping sequence IDs to index entries
+    """
+    index = {}
+    with open(index_path) as handle:
+        for line in handle:
+            fields = line.rstrip('\n').split('\t')
+            index[fields[0]] = FastaIndexEntry(*(int(field) for field in fields[1:5]))
+    return index
+
+def load_fasta_index(file_path: str) -> Dict[str, FastaIndexEntry]:
+    """
+    Read the faidx index of a FASTA file, building and saving it if needed.
+    
+    An index older than the FASTA file is rebuilt. Failing to save the
+    index only logs a warning.
+    
+    Args:
+        file_path: Path to an uncompressed FASTA file
+        
+    Returns:
+        Dictionary mapping sequence IDs to index entries
+    """
+    index_path = file_path + FAIDX_SUFFIX
+    if os.path.exists(index_path) and os.path.getmtime(index_path) >= os.path.getmtime(file_path):
+        logging.info(f"Reusing FASTA index {index_path}")
+        return read_fasta_index(index_path)
+    
+    index = build_fasta_index(file_path)
+    try:
+        write_fasta_index(index, index_path)
+        logging.info(f"Saved FASTA index of {len(index)} sequences to {index_path}")
+    except OSError as e:
+        logging.warning(f"Could not save FASTA index {index_path}: {str(e)}")
+    return index
+
+class IndexedFasta:
+    """
+    Random access to the sequences of a plain FASTA file through its index.
+    
+    The file is memory-mapped on first use, and only the requested bases
+    are read and upper-cased.
+    """
+    __slots__ = ('file_path', '_index', '_handle', '_data')
+    
+    def __init__(self, file_path: str, index: Optional[Dict[str, FastaIndexEntry]] = None):
+        """
+        Open an indexed FASTA file.
+        
+        Args:
+            file_path: Path to an uncompressed FASTA file
+            index: faidx entries (defaults to load_fasta_index)
+        """
+        self.file_path = file_path
+        self._index = index if index is not None else load_fasta_index(file_path)
+        self._handle = None
+        self._data = None
+    
+    def __len__(self) -> int:
+        return len(self._index)
+    
+    def __contains__(self, seq_id) -> bool:
+        return seq_id in self._index
+    
+    def length(self, seq_id: str) -> int:
+        """Number of bases of a sequence."""
+        return self._index[seq_id].length
+    
+    def fetch(self, seq_id: str, start: int = 0, end: Optional[int] = None) -> bytes:
+        """
+        Read part of a sequence.
+        
+        Args:
+            seq_id: Sequence ID
+            start: First base (0-based)
+            end: One past the last base (defaults to the sequence length)
+            
+        Returns:
+            Upper-case sequence bytes of sequence[start:end]
+        """
+        entry = self._index[seq_id]
+        end = entry.length if end is None else min(end, entry.length)
+        if start >= end:
+            return b''
+        if self._data is None:
+            self._handle = open(self.file_path, 'rb')
+            self._data = mmap.mmap(self._handle.fileno(), 0, access=mmap.ACCESS_READ)
+        
+        def position(base: int) -> int:
+            line, column = divmod(base, entry.line_bases)
+            return entry.offset + line * entry.line_width + column
+        
+        raw = self._data[position(start):position(end - 1) + 1]
+        return raw.translate(_UPPER, _SEQUENCE_WHITESPACE)
+    
+    def close(self):
+        """Unmap and close the file (a later fetch maps it again)."""
+        if self._data is not None:
+            self._data.close()
+            self._handle.close()
+            self._data = self._handle = None
+    
+    def __enter__(self) -> 'IndexedFasta':
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
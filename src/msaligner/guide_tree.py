@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+"""
+Guide tree construction (UPGMA and neighbor-joining) and Newick I/O.
+"""
+
+import logging
+import os
+import tempfile
+from typing import List, NamedTuple, Tuple
+import numpy as np
+
+# Rows of the neighbor-joining Q-matrix evaluated at a time
+NJ_BLOCK_ROWS = 64
+
+class GuideTree(NamedTuple):
+    """
+    Rooted binary guide tree.
+    
+    Leaves are numbered 0..n-1 in the order of labels; the k-th merge creates
+    node n + k, and the last merge is the root.
+    
+    Attributes:
+        children: (n - 1) x 2 array of child node numbers per merge
+        lengths: (n - 1) x 2 array of branch lengths to those children
+        labels: Leaf labels (sequence IDs)
+    """
+    children: np.ndarray
+    lengths: np.ndarray
+    labels: List[str]
+
+def _distance_matrix(similarity_matrix: np.ndarray) -> np.ndarray:
+    """
+    Convert a similarity matrix into a working distance matrix.
+    
+    float32 matrices (such as a memory-mapped similarity matrix) are kept
+    in float32 to halve the working memory. A memory-mapped similarity
+    matrix gets a memory-mapped working matrix in an unlinked scratch file
+    next to it, so the tree builders never hold an N x N copy in RAM.
+    
+    Args:
+        similarity_matrix: Pairwise similarity matrix (1.0 = identical)
+        
+    Returns:
+        Distance matrix with an infinite diagonal
+    """
+    dtype = np.result_type(similarity_matrix.dtype, np.float32)
+    if isinstance(similarity_matrix, np.memmap) and similarity_matrix.filename:
+        directory = os.path.dirname(similarity_matrix.filename)
+        # The mapping keeps the file alive after the handle closes
+        with tempfile.TemporaryFile(dir=directory) as scratch:
+            distances = np.memmap(scratch, dtype=dtype, mode='w+', shape=similarity_matrix.shape)
+        logging.debug(f"Keeping guide tree distances in a scratch file in {directory}")
+    else:
+        distances = np.empty(similarity_matrix.shape, dtype=dtype)
+    np.subtract(1.0, similarity_matrix, out=distances)
+    np.fill_diagonal(distances, np.inf)
+    return distances
+
+def upgma(similarity_matrix: np.ndarray, labels: List[str]) -> GuideTree:
+    """
+    Build a UPGMA tree with the nearest-neighbor chain algorithm.
+    
+    Average linkage is reducible, so merging reciprocal nearest neighbours
+    as they are found gives the same tree as classic UPGMA in O(N^2) time.
+    The distance matrix is updated in place, so memory stays O(N^2).
+    
+    Args:
+        similarity_matrix: Pairwise similarity matrix
+        labels: Sequence IDs in matrix order
+        
+    Returns:
+        GuideTree
+    """
+    n = len(labels)
+    distances = _distance_matrix(similarity_matrix)
+    sizes = np.ones(n)
+    heights = np.zeros(2 * n - 1)
+    node_of_slot = np.arange(n)
+    children = np.zeros((max(n - 1, 0), 2), dtype=np.int64)
+    lengths = np.zeros((max(n - 1, 0), 2))
+    active = list(range(n))
+    chain = []
+    
+    for merge in range(n - 1):
+        if not chain:
+            chain.append(active[0])
+        
+        while True:
+            a = chain[-1]
+            b = int(np.argmin(distances[a]))
+            # Reciprocal nearest neighbours; ties go to the previous chain
+            # element so the chain always terminates
+            if len(chain) > 1 and distances[a, chain[-2]] <= distances[a, b]:
+                b = chain[-2]
+                break
+            chain.append(b)
+        
+        chain.pop()
+        chain.pop()
+        height = distances[a, b] / 2
+        
+        # Average-linkage row for the merged cluster, stored in slot a
+        merged_row = (sizes[a] * distances[a] + sizes[b] * distances[b]) / (sizes[a] + sizes[b])
+        merged_row[[a, b]] = np.inf
+        distances[a, :] = merged_row
+        distances[:, a] = merged_row
+        distances[b, :] = np.inf
+        distances[:, b] = np.inf
+        
+        node = n + merge
+        children[merge] = node_of_slot[a], node_of_slot[b]
+        lengths[merge] = height - heights[node_of_slot[a]], height - heights[node_of_slot[b]]
+        heights[node] = height
+        sizes[a] += sizes[b]
+        node_of_slot[a] = node
+        active.remove(b)
+    
+    logging.info(f"Built UPGMA guide tree for {n} sequences")
+    return GuideTree(children, lengths, list(labels))
+
+def _nj_closest_pair(distances: np.ndarray, row_sums: np.ndarray,
+                     buffer: np.ndarray) -> Tuple[int, int]:
+    """
+    Find the pair minimizing the neighbor-joining Q criterion.
+    
+    Q is evaluated in cache-sized row blocks so it is never materialized.
+    
+    Args:
+        distances: Square matrix of active distances
+        row_sums: Row sums of distances
+        buffer: Scratch array with at least NJ_BLOCK_ROWS x len(distances) cells
+        
+    Returns:
+        Tuple (a, b) with a < b
+    """
+    remaining = len(distances)
+    best, best_pair = np.inf, (0, 1)
+    
+    for start in range(0, remaining, NJ_BLOCK_ROWS):
+        stop = min(start + NJ_BLOCK_ROWS, remaining)
+        block = np.multiply(distances[start:stop], remaining - 2,
+                            out=buffer[:stop - start, :remaining])
+        block -= row_sums[start:stop, None]
+        block -= row_sums[None, :]
+        block[np.arange(stop - start), np.arange(start, stop)] = np.inf
+        index = int(np.argmin(block))
+        if block.flat[index] < best:
+            best = block.flat[index]
+            best_pair = (start + index // remaining, index % remaining)
+    
+    return tuple(sorted(best_pair))
+
+def neighbor_joining(similarity_matrix: np.ndarray, labels: List[str]) -> GuideTree:
+    """
+    Build a neighbor-joining tree, rooted at the final join.
+    
+    The distance matrix is updated in place and kept compact (the last
+    active row moves into the freed slot), row sums are updated
+    incrementally, and each join scans the Q-matrix block by block.
+    
+    Args:
+        similarity_matrix: Pairwise similarity matrix
+        labels: Sequence IDs in matrix order
+        
+    Returns:
+        GuideTree
+    """
+    n = len(labels)
+    distances = _distance_matrix(similarity_matrix)
+    np.fill_diagonal(distances, 0.0)
+    row_sums = distances.sum(axis=1)
+    node_of_slot = np.arange(n)
+    children = np.zeros((max(n - 1, 0), 2), dtype=np.int64)
+    lengths = np.zeros((max(n - 1, 0), 2))
+    buffer = np.empty((NJ_BLOCK_ROWS, n))
+    
+    for merge in range(n - 1):
+        remaining = n - merge
+        active = distances[:remaining, :remaining]
+        sums = row_sums[:remaining]
+        
+        if remaining > 2:
+            a, b = _nj_closest_pair(active, sums, buffer)
+            length_a = 0.5 * active[a, b] + (sums[a] - sums[b]) / (2 * (remaining - 2))
+        else:
+            a, b = 0, 1
+            length_a = 0.5 * active[a, b]
+        length_b = active[a, b] - length_a
+        
+        children[merge] = node_of_slot[a], node_of_slot[b]
+        lengths[merge] = max(length_a, 0.0), max(length_b, 0.0)
+        
+        # Distances from the new node to every other active node, stored in slot a
+        merged_row = 0.5 * (active[a] + active[b] - active[a, b])
+        merged_row[[a, b]] = 0.0
+        sums += merged_row - active[:, a] - active[:, b]
+        sums[a] = merged_row.sum()
+        active[a, :] = merged_row
+        active[:, a] = merged_row
+        node_of_slot[a] = n + merge
+        
+        # Move the last active slot into b
+        last = remaining - 1
+        if b != last:
+            active[b, :] = active[last, :]
+            active[:, b] = active[:, last]
+            active[b, b] = 0.0
+            sums[b] = sums[last]
+            node_of_slot[b] = node_of_slot[last]
+    
+    logging.info(f"Built neighbor-joining guide tree for {n} sequences")
+    return GuideTree(children, lengths, list(labels))
+
+def leaf_order(tree: GuideTree) -> List[str]:
+    """
+    List leaf labels in depth-first order (first child first).
+    
+    Args:
+        tree: Guide tree
+        
+    Returns:
+        Sequence IDs in tree order
+    """
+    n = len(tree.labels)
+    if n <= 1:
+        return list(tree.labels)
+    
+    order = []
+    stack = [2 * n - 2]
+    while stack:
+        node = stack.pop()
+        if node < n:
+            order.append(tree.labels[node])
+        else:
+            left, right = tree.children[node - n]
+            stack.append(right)
+            stack.append(left)
+    
+    return order
+
+def _quote_label(label: str) -> str:
+    """
+    Quote a Newick label if it contains reserved characters.
+    
+    Args:
+        label: Leaf label
+        
+    Returns:
+        Label safe to embed in a Newick string
+    """
+    if any(char in label for char in "()[]':;, \t"):
+        return "'" + label.replace("'", "''") + "'"
+    return label
+
+def to_newick(tree: GuideTree) -> str:
+    """
+    Serialize a guide tree in Newick format.
+    
+    Args:
+        tree: Guide tree
+        
+    Returns:
+        Newick string terminated by ';'
+    """
+    n = len(tree.labels)
+    if n == 0:
+        return ";"
+    if n == 1:
+        return _quote_label(tree.labels[0]) + ";"
+    
+    rendered = {leaf: _quote_label(label) for leaf, label in enumerate(tree.labels)}
+    for merge, (left, right) in enumerate(tree.children):
+        length_left, length_right = tree.lengths[merge]
+        rendered[n + merge] = (
+            f"({rendered.pop(left)}:{length_left:.6f},"
+            f"{rendered.pop(right)}:{length_right:.6f})"
+        )
+    
+    return rendered[2 * n - 2] + ";"
+
+def _tokenize_newick(text: str) -> List[str]:
+    """
+    Split a Newick string into punctuation and label tokens.
+    
+    Args:
+        text: Newick string
+        
+    Returns:
+        List of tokens with quoted labels unquoted
+    """
+    tokens = []
+    i = 0
+    while i < len(text):
+        char = text[i]
+        if char in "(),:;":
+            tokens.append(char)
+            i += 1
+        elif char.isspace():
+            i += 1
+        elif char == "'":
+            label = []
+            i += 1
+            while i < len(text):
+                if text[i] == "'":
+                    if text[i + 1:i + 2] == "'":
+                        label.append("'")
+                        i += 2
+                        continue
+                    break
+                label.append(text[i])
+                i += 1
+            tokens.append("".join(label))
+            i += 1
+        else:
+            start = i
+            while i < len(text) and text[i] not in "(),:;" and not text[i].isspace():
+                i += 1
+            tokens.append(text[start:i])
+    return tokens
+
+def from_newick(text: str) -> GuideTree:
+    """
+    Parse a Newick tree, resolving polytomies into zero-length binary merges.
+    
+    Args:
+        text: Newick string
+        
+    Returns:
+        GuideTree with leaves numbered in order of appearance
+    """
+    labels = []
+    merges = []
+    # Each open group collects (node reference, branch length) pairs
+    stack = [[]]
+    last = None
+    expect_length = False
+    
+    for token in _tokenize_newick(text):
+        if token == "(":
+            stack.append([])
+            last = None
+        elif token in ",)":
+            if last is not None:
+                stack[-1].append(last)
+            last = None
+            if token == ")":
+                group = stack.pop()
+                if not group:
+                    raise ValueError("Empty group in Newick tree")
+                node, length = group[0]
+                for other, other_length in group[1:]:
+                    merges.append((node, other, length, other_length))
+                    node = ("merge", len(merges) - 1)
+                    length = 0.0
+                last = [node, 0.0]
+        elif token == ":":
+            expect_length = True
+        elif token == ";":
+            break
+        elif expect_length:
+            last[1] = float(token)
+            expect_length = False
+        elif last is None:
+            labels.append(token)
+            last = [("leaf", len(labels) - 1), 0.0]
+        # Labels on internal nodes are ignored
+    
+    if last is not None:
+        stack[-1].append(last)
+    if not labels:
+        raise ValueError("Newick tree has no leaves")
+    
+    n = len(labels)
+    
+    def number(ref) -> int:
+        kind, index = ref
+        return index if kind == "leaf" else n + index
+    
+    children = np.array([[number(a), number(b)] for a, b, _, _ in merges],
+                        dtype=np.int64).reshape(-1, 2)
+    lengths = np.array([[la, lb] for _, _, la, lb in merges]).reshape(-1, 2)
+    if len(merges) != n - 1:
+        raise ValueError("Newick tree is not a single connected tree")
+    return GuideTree(children, lengths, labels)
+
+def write_newick(tree: GuideTree, file_path: str):
+    """
+    Write a guide tree to a Newick file.
+    
+    Args:
+        tree: Guide tree
+        file_path: Output path
+    """
+    with open(file_path, 'w') as f:
+        f.write(to_newick(tree) + "\n")
+    logging.info(f"Wrote guide tree to {file_path}")
+
+def read_newick(file_path: str) -> GuideTree:
+    """
+    Read a guide tree from a Newick file.
+    
+    Args:
+        file_path: Path to the Newick file
+        
+    Returns:
+        GuideTree
+    """
+    with open(file_path) as f:
+        return from_newick(f.read())
+
+# Tree builders selectable by name
+TREE_METHODS = {
+    'upgma': upgma,
+    'nj': neighbor_joining,
+}
+
+def build_guide_tree(similarity_matrix: np.ndarray, labels: List[str],
+                     method: str = 'upgma') -> Tuple[GuideTree, List[str]]:
+    """
+    Build a guide tree and its leaf order from a similarity matrix.
+    
+    Args:
+        similarity_matrix: Pairwise similarity matrix
+        labels: Sequence IDs in matrix order
+        method: Tree method (see TREE_METHODS)
+        
+    Returns:
+        Tuple of (guide tree, sequence IDs in leaf order)
+    """
+    if method not in TREE_METHODS:
+        raise ValueError(f"Unknown guide tree method: {method}")
+    tree = TREE_METHODS[method](similarity_matrix, labels)
+    return tree, leaf_order(tree)
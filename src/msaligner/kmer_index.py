@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+Inverted k-mer index for nearest-neighbour queries by k-mer cosine similarity.
+"""
+
+import hashlib
+import logging
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+from msaligner.kmer_similarity import encode_kmers
+from msaligner.sequence_store import amino_acid_bytes
+
+# Neighbours returned by a query unless asked otherwise
+DEFAULT_TOP_K = 10
+
+def residues_fingerprint(residues: np.ndarray) -> str:
+    """
+    Hash one amino acid sequence, so a changed protein can be told apart
+    from the indexed one.
+    
+    Args:
+        residues: Amino acid sequence as uint8 ASCII codes
+        
+    Returns:
+        Hex SHA-256 digest
+    """
+    return hashlib.sha256(residues.tobytes()).hexdigest()
+
+def _postings(rows: np.ndarray, codes: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Group k-mer occurrences into postings lists.
+    
+    Args:
+        rows: Sequence row of each k-mer occurrence
+        codes: Integer k-mer code of each occurrence
+        
+    Returns:
+        Tuple of (sorted distinct codes, offsets of each code's postings,
+        sequence rows of the postings, k-mer count of each posting)
+    """
+    order = np.lexsort((rows, codes))
+    rows, codes = rows[order], codes[order]
+    
+    new_pair = np.ones(len(codes), dtype=bool)
+    new_pair[1:] = (codes[1:] != codes[:-1]) | (rows[1:] != rows[:-1])
+    starts = np.flatnonzero(new_pair)
+    counts = np.diff(np.append(starts, len(codes)))
+    pair_codes, pair_rows = codes[starts], rows[starts]
+    
+    distinct, first = np.unique(pair_codes, return_index=True)
+    offsets = np.append(first, len(pair_codes)).astype(np.int64)
+    return distinct, offsets, pair_rows.astype(np.int64), counts.astype(np.int64)
+
+class KmerIndex:
+    """
+    k-mer -> sequence postings index with top-k cosine scoring.
+    
+    A query only visits the postings of its own k-mers, so it costs time in
+    the number of sequences sharing k-mers with it rather than in the size
+    of the collection. Scores equal cosine_similarity of the k-mer counts
+    (of residues grouped by the index's alphabet).
+    """
+    __slots__ = ('k', 'alphabet', '_ids', '_rows', '_fingerprints', '_codes', '_offsets',
+                 '_posting_rows', '_posting_counts', '_norms')
+    
+    def __init__(self, k: int, ids: List[str], codes: np.ndarray, offsets: np.ndarray,
+                 posting_rows: np.ndarray, posting_counts: np.ndarray, norms: np.ndarray,
+                 alphabet: str = 'full', fingerprints: Optional[List[str]] = None):
+        """
+        Wrap postings arrays.
+        
+        Args:
+            k: k-mer size
+            ids: Sequence ID of each row
+            codes: Sorted distinct k-mer codes
+            offsets: Start of each code's postings, plus the total length
+            posting_rows: Sequence row of each posting
+            posting_counts: k-mer count of each posting
+            norms: Euclidean norm of each sequence's k-mer counts
+            alphabet: Residue grouping applied before encoding (see KMER_ALPHABETS)
+            fingerprints: residues_fingerprint of each row (unknown rows are
+                re-indexed by the next add)
+        """
+        self.k = k
+        self.alphabet = alphabet
+        self._ids = list(ids)
+        self._rows = {seq_id: row for row, seq_id in enumerate(self._ids)}
+        self._fingerprints = list(fingerprints) if fingerprints is not None else [''] * len(self._ids)
+        self._codes = codes
+        self._offsets = offsets
+        self._posting_rows = posting_rows
+        self._posting_counts = posting_counts
+        self._norms = norms
+    
+    @classmethod
+    def build(cls, sequences: Dict[str, dict], k: int = 6, alphabet: str = 'full') -> 'KmerIndex':
+        """
+        Index the k-mers of a collection of sequences.
+        
+        Args:
+            sequences: Dictionary of processed sequences
+            k: k-mer size
+            alphabet: Residue grouping (see KMER_ALPHABETS)
+            
+        Returns:
+            KmerIndex
+        """
+        index = cls(k, [], np.zeros(0, dtype=np.int64), np.zeros(1, dtype=np.int64),
+                    np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0),
+                    alphabet)
+        index.add(sequences)
+        return index
+    
+    def __len__(self) -> int:
+        return len(self._ids)
+    
+    def __contains__(self, seq_id) -> bool:
+        return seq_id in self._rows
+    
+    @property
+    def ids(self) -> List[str]:
+        """Sequence IDs in row order."""
+        return list(self._ids)
+    
+    def add(self, sequences: Dict[str, dict]):
+        """
+        Add new sequences and re-index those whose protein changed.
+        
+        Rows of unchanged sequences keep their postings; a changed sequence
+        keeps its row but its old postings are replaced.
+        
+        Args:
+            sequences: Dictionary of processed sequences
+        """
+        residues = {seq_id: amino_acid_bytes(sequences, seq_id) for seq_id in sequences}
+        fingerprints = {seq_id: residues_fingerprint(seq) for seq_id, seq in residues.items()}
+        changed = [seq_id for seq_id in sequences
+                   if seq_id in self._rows and self._fingerprints[self._rows[seq_id]] != fingerprints[seq_id]]
+        new_ids = [seq_id for seq_id in sequences if seq_id not in self._rows]
+        if not changed and not new_ids:
+            return
+        
+        targets = np.array([self._rows[seq_id] for seq_id in changed] +
+                           list(range(len(self._ids), len(self._ids) + len(new_ids))), dtype=np.int64)
+        if changed:
+            self._remove_rows(targets[:len(changed)])
+        rows, codes = encode_kmers([residues[seq_id] for seq_id in changed + new_ids], self.k, self.alphabet)
+        new_codes, new_offsets, new_rows, new_counts = _postings(targets[rows], codes)
+        self._merge_postings(new_codes, new_offsets, new_rows, new_counts)
+        
+        # Counts are integers, so per-row sums of squares are exact
+        squares = np.bincount(new_rows, weights=new_counts.astype(np.float64) ** 2,
+                              minlength=len(self._ids) + len(new_ids))
+        self._norms = np.concatenate([self._norms, np.zeros(len(new_ids))])
+        self._norms[targets] = np.sqrt(squares[targets])
+        for seq_id in new_ids:
+            self._rows[seq_id] = len(self._ids)
+            self._ids.append(seq_id)
+            self._fingerprints.append('')
+        for seq_id in changed + new_ids:
+            self._fingerprints[self._rows[seq_id]] = fingerprints[seq_id]
+        
+        if changed:
+            logging.info(f"Re-indexed {len(changed)} sequences whose protein changed")
+        logging.debug(f"Indexed {len(new_ids)} sequences, {len(self._codes)} distinct {self.k}-mers")
+    
+    def _remove_rows(self, rows: np.ndarray):
+        """
+        Drop every posting of some rows, and codes left without postings.
+        
+        Args:
+            rows: Sequence rows to clear
+        """
+        keep = ~np.isin(self._posting_rows, rows)
+        kept_before = np.concatenate([[0], np.cumsum(keep)])[self._offsets]
+        nonempty = np.diff(kept_before) > 0
+        self._codes = self._codes[nonempty]
+        self._offsets = np.append(kept_before[:-1][nonempty], kept_before[-1])
+        self._posting_rows = self._posting_rows[keep]
+        self._posting_counts = self._posting_counts[keep]
+    
+    def _merge_postings(self, codes: np.ndarray, offsets: np.ndarray,
+                        posting_rows: np.ndarray, posting_counts: np.ndarray):
+        """
+        Merge postings of rows not yet indexed into the postings arrays.
+        
+        Only the new postings are sorted; each is inserted after the
+        existing postings of its code, so the existing arrays are shifted
+        but never regrouped.
+        
+        Args:
+            codes: Sorted distinct k-mer codes of the new postings
+            offsets: Start of each code's new postings, plus their total
+            posting_rows: Sequence row of each new posting
+            posting_counts: k-mer count of each new posting
+        """
+        posting_codes = np.repeat(codes, np.diff(offsets))
+        insert_at = self._offsets[np.searchsorted(self._codes, posting_codes, side='right')]
+        merged_rows = np.insert(self._posting_rows, insert_at, posting_rows)
+        merged_counts = np.insert(self._posting_counts, insert_at, posting_counts)
+        
+        slots = np.searchsorted(self._codes, codes)
+        known = slots < len(self._codes)
+        known[known] = self._codes[slots[known]] == codes[known]
+        merged_codes = np.insert(self._codes, slots[~known], codes[~known])
+        
+        # A code's postings start after all old and new postings of smaller codes
+        old_before = self._offsets[np.searchsorted(self._codes, merged_codes)]
+        new_before = offsets[np.searchsorted(codes, merged_codes)]
+        self._offsets = np.append(old_before + new_before, len(merged_rows)).astype(np.int64)
+        self._codes = merged_codes
+        self._posting_rows = merged_rows
+        self._posting_counts = merged_counts
+    
+    def _scores(self, residues: np.ndarray, allowed: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Score every indexed sequence sharing a k-mer with a query.
+        
+        Args:
+            residues: Query sequence as uint8 ASCII codes
+            allowed: Boolean mask of rows that may be returned
+            
+        Returns:
+            Tuple of (rows, cosine similarities)
+        """
+        _, codes = encode_kmers([residues], self.k, self.alphabet)
+        query_codes, query_counts = np.unique(codes, return_counts=True)
+        query_norm = np.sqrt(np.sum(query_counts.astype(np.float64) ** 2))
+        
+        positions = np.searchsorted(self._codes, query_codes)
+        found = positions < len(self._codes)
+        found[found] = self._codes[positions[found]] == query_codes[found]
+        starts = self._offsets[positions[found]]
+        lengths = self._offsets[positions[found] + 1] - starts
+        
+        # Gather the postings of every shared k-mer
+        first = np.cumsum(lengths) - lengths
+        postings = np.repeat(starts - first, lengths) + np.arange(int(lengths.sum()))
+        weights = np.repeat(query_counts[found], lengths) * self._posting_counts[postings]
+        posting_rows = self._posting_rows[postings]
+        if len(posting_rows) * 8 >= len(self._ids):
+            # Dense accumulation is cheaper than sorting many postings
+            dots = np.bincount(posting_rows, weights=weights.astype(np.float64),
+                               minlength=len(self._ids))
+            rows = np.flatnonzero(dots)
+            dots = dots[rows]
+        else:
+            rows, inverse = np.unique(posting_rows, return_inverse=True)
+            dots = np.bincount(inverse.ravel(), weights=weights.astype(np.float64),
+                               minlength=len(rows))
+        
+        if allowed is not None:
+            keep = allowed[rows]
+            rows, dots = rows[keep], dots[keep]
+        denominators = query_norm * self._norms[rows]
+        scores = np.divide(dots, denominators, out=np.zeros(len(rows)), where=denominators > 0)
+        return rows, scores
+    
+    def query(self, sequence, top_k: int = DEFAULT_TOP_K,
+              exclude: Optional[List[str]] = None) -> List[Tuple[str, float]]:
+        """
+        Find the indexed sequences most similar to a query sequence.
+        
+        Args:
+            sequence: Amino acid sequence (str or uint8 ASCII array)
+            top_k: Number of neighbours to return
+            exclude: Sequence IDs never returned
+            
+        Returns:
+            (seq_id, cosine similarity) tuples, most similar first (ties by
+            index order); sequences sharing no k-mer are not returned
+        """
+        residues = sequence if isinstance(sequence, np.ndarray) else \
+            np.frombuffer(sequence.encode('ascii', 'replace'), dtype=np.uint8)
+        allowed = None
+        if exclude:
+            allowed = np.ones(len(self._ids), dtype=bool)
+            allowed[[self._rows[seq_id] for seq_id in exclude if seq_id in self._rows]] = False
+        
+        rows, scores = self._scores(residues, allowed)
+        best = np.lexsort((rows, -scores))[:top_k]
+        return [(self._ids[rows[i]], float(scores[i])) for i in best]
+    
+    def neighbors(self, sequences: Dict[str, dict], seq_id: str,
+                  top_k: int = DEFAULT_TOP_K) -> List[Tuple[str, float]]:
+        """
+        Find the sequences most similar to an indexed sequence.
+        
+        Args:
+            sequences: Dictionary of processed sequences holding seq_id
+            seq_id: Sequence ID
+            top_k: Number of neighbours to return
+            
+        Returns:
+            (seq_id, cosine similarity) tuples, excluding seq_id itself
+        """
+        return self.query(amino_acid_bytes(sequences, seq_id), top_k, exclude=[seq_id])
+    
+    def save(self, file_path: str):
+        """
+        Write the index to an .npz file.
+        
+        Args:
+            file_path: Output file path
+        """
+        with open(file_path, 'wb') as handle:
+            np.savez(handle, k=np.array(self.k), alphabet=np.array(self.alphabet),
+                     ids=np.array(self._ids, dtype=str),
+                     fingerprints=np.array(self._fingerprints, dtype=str),
+                     codes=self._codes, offsets=self._offsets,
+                     posting_rows=self._posting_rows, posting_counts=self._posting_counts,
+                     norms=self._norms)
+        logging.info(f"Saved k-mer index of {len(self)} sequences to {file_path}")
+    
+    @classmethod
+    def load(cls, file_path: str) -> 'KmerIndex':
+        """
+        Read an index written by save.
+        
+        Indexes saved without an alphabet used the full one; rows saved
+        without fingerprints are re-indexed by the next add.
+        
+        Args:
+            file_path: Index file path
+            
+        Returns:
+            KmerIndex
+        """
+        with np.load(file_path) as data:
+            alphabet = str(data['alphabet']) if 'alphabet' in data else 'full'
+            fingerprints = [str(digest) for digest in data['fingerprints']] if 'fingerprints' in data else None
+            return cls(int(data['k']), [str(seq_id) for seq_id in data['ids']], data['codes'],
+                       data['offsets'], data['posting_rows'], data['posting_counts'], data['norms'],
+                       alphabet, fingerprints)
+
+def index_order(index: KmerIndex, sequences: Dict[str, dict]) -> List[str]:
+    """
+    Order sequences as a nearest-neighbour chain through a k-mer index.
+    
+    Starting from the first sequence, each step moves to the most similar
+    sequence not yet placed; when no remaining sequence shares a k-mer with
+    the current one, the chain restarts at the first remaining sequence in
+    input order.
+    
+    Args:
+        index: KmerIndex containing every sequence
+        sequences: Dictionary of processed sequences to order
+        
+    Returns:
+        Sequence IDs in chain order
+    """
+    seq_ids = list(sequences)
+    rows = np.array([index._rows[seq_id] for seq_id in seq_ids], dtype=np.int64)
+    remaining = np.zeros(len(index), dtype=bool)
+    remaining[rows] = True
+    
+    order = []
+    next_unplaced = 0
+    current = rows[0] if len(rows) else None
+    while current is not None:
+        remaining[current] = False
+        order.append(index._ids[current])
+        
+        candidates, scores = index._scores(amino_acid_bytes(sequences, index._ids[current]), remaining)
+        if len(candidates):
+            current = candidates[np.lexsort((candidates, -scores))[0]]
+            continue
+        
+        while next_unplaced < len(rows) and not remaining[rows[next_unplaced]]:
+            next_unplaced += 1
+        current = rows[next_unplaced] if next_unplaced < len(rows) else None
+    
+    return order
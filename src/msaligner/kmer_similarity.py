@@ -3,10 +3,46 @@
 k-mer similarity calculation and sequence sorting module.
 """
 
+import hashlib
+import json
 import logging
-from typing import Dict, List, Tuple
+import os
+from typing import Dict, List, Tuple, Optional
 import numpy as np
 from collections import defaultdict
+from scipy import sparse
+
+from msaligner.guide_tree import build_guide_tree, leaf_order, read_newick, write_newick
+from msaligner.sketch import mix64, minhash_sketches, knn_graph, knn_order, SKETCH_SIZE, KNN_NEIGHBORS
+from msaligner.sequence_store import amino_acid_bytes, select_sequences
+
+# Residue groups of each k-mer alphabet: 'full' keeps the 20 amino acids and
+# X apart, 'murphy10' and 'dayhoff6' merge exchangeable residues (Murphy et
+# al. 2000 10-letter alphabet, Dayhoff classes). Every other character
+# (stop codons, and X in reduced alphabets) shares one extra code.
+KMER_ALPHABETS = {
+    'full': list('ACDEFGHIKLMNPQRSTVWYX'),
+    'murphy10': ['LVIM', 'C', 'A', 'G', 'ST', 'P', 'FYW', 'EDNQ', 'KR', 'H'],
+    'dayhoff6': ['AGPST', 'C', 'DENQ', 'FWY', 'HKR', 'ILMV'],
+}
+_ALPHABET_CODES = {}
+for _name, _groups in KMER_ALPHABETS.items():
+    _table = np.full(256, len(_groups), dtype=np.int64)
+    for _code, _group in enumerate(_groups):
+        _table[[ord(_aa) for _aa in _group]] = _code
+    _ALPHABET_CODES[_name] = (_table, len(_groups) + 1)
+
+# k-mer spaces up to DENSE_KMER_MAX_WIDTH possible k-mers (and count
+# matrices up to DENSE_KMER_MAX_CELLS) are counted densely with np.bincount
+# and compared with a BLAS matrix product; wider spaces stay sparse
+DENSE_KMER_MAX_WIDTH = 1 << 12
+DENSE_KMER_MAX_CELLS = 1 << 25
+
+# Rows of the similarity matrix computed per sparse product
+SIMILARITY_BLOCK_ROWS = 1024
+
+# Sequences whose k-mers are hashed together when sketching
+SKETCH_BATCH_SEQUENCES = 4096
 
 def generate_kmers(sequence: str, k: int) -> List[str]:
     """
@@ -67,82 +103,536 @@ def cosine_similarity(vec1: Dict[str, int], vec2: Dict[str, int]) -> float:
     
     return dot_product / (np.sqrt(norm1) * np.sqrt(norm2))
 
-def compute_kmer_similarity(sequences: Dict[str, dict], k: int = 6) -> np.ndarray:
+def alphabet_size(alphabet: str = 'full') -> int:
+    """
+    Get the number of residue codes of a k-mer alphabet.
+    
+    Args:
+        alphabet: Alphabet name (see KMER_ALPHABETS)
+        
+    Returns:
+        Number of codes, including the code for unlisted characters
+    """
+    if alphabet not in _ALPHABET_CODES:
+        raise ValueError(f"Unknown k-mer alphabet: {alphabet}")
+    return _ALPHABET_CODES[alphabet][1]
+
+def use_dense_counts(n_seqs: int, k: int, alphabet: str = 'full') -> bool:
+    """
+    Decide whether k-mers are counted into dense vectors.
+    
+    Args:
+        n_seqs: Number of sequences
+        k: k-mer size
+        alphabet: Residue grouping (see KMER_ALPHABETS)
+        
+    Returns:
+        True if the k-mer space is small enough for dense counting
+    """
+    width = alphabet_size(alphabet) ** k
+    return width <= DENSE_KMER_MAX_WIDTH and n_seqs * width <= DENSE_KMER_MAX_CELLS
+
+def encode_kmers(residues: List[np.ndarray], k: int,
+                 alphabet: str = 'full') -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Encode the k-mers of many sequences as integers in base alphabet_size.
+    
+    Codes are computed for all windows of all sequences at once over one
+    concatenated residue buffer; windows crossing a sequence boundary are
+    dropped. When alphabet_size ** k does not fit in int64, residues are
+    folded in with a 64-bit mixing hash instead, so distinct k-mers collide
+    only with negligible probability.
+    
+    Args:
+        residues: Amino acid sequences as uint8 ASCII arrays
+        k: k-mer size
+        alphabet: Residue grouping applied before encoding (see KMER_ALPHABETS)
+        
+    Returns:
+        Tuple of (sequence index of each k-mer, int64 k-mer codes), in
+        sequence order
+    """
+    base = alphabet_size(alphabet)
+    if k < 1:
+        raise ValueError(f"k-mer size must be positive, got {k}")
+    
+    lengths = np.array([len(seq) for seq in residues], dtype=np.int64)
+    starts = np.concatenate([[0], np.cumsum(lengths)[:-1]]).astype(np.int64)
+    windows = np.maximum(lengths - k + 1, 0)
+    
+    table = _ALPHABET_CODES[alphabet][0]
+    codes = table[np.concatenate(residues)] if residues else np.zeros(0, dtype=np.int64)
+    n_windows = max(len(codes) - k + 1, 0)
+    if base ** k < 2 ** 63:
+        kmer_codes = np.zeros(n_windows, dtype=np.int64)
+        for offset in range(k):
+            kmer_codes = kmer_codes * base + codes[offset:offset + n_windows]
+    else:
+        hashes = np.zeros(n_windows, dtype=np.uint64)
+        for offset in range(k):
+            hashes = mix64(hashes ^ codes[offset:offset + n_windows].astype(np.uint64))
+        kmer_codes = hashes.view(np.int64)
+    
+    # Window start positions of each sequence, in sequence order
+    rows = np.repeat(np.arange(len(residues)), windows)
+    first_window = np.cumsum(windows) - windows
+    positions = np.repeat(starts - first_window, windows) + np.arange(int(windows.sum()))
+    return rows, kmer_codes[positions]
+
+def _count_matrix(residues: List[np.ndarray], k: int, alphabet: str) -> sparse.csr_matrix:
+    """
+    Count the k-mers of uint8 ASCII sequences into one sparse matrix.
+    
+    Args:
+        residues: Amino acid sequences as uint8 ASCII arrays
+        k: k-mer size
+        alphabet: Residue grouping (see KMER_ALPHABETS)
+        
+    Returns:
+        CSR matrix with one row of k-mer counts per sequence
+    """
+    rows, kmer_codes = encode_kmers(residues, k, alphabet)
+    columns, column_index = np.unique(kmer_codes, return_inverse=True)
+    
+    counts = sparse.csr_matrix(
+        (np.ones(len(kmer_codes), dtype=np.int64), (rows, column_index.ravel())),
+        shape=(len(residues), len(columns))
+    )
+    counts.sum_duplicates()
+    return counts
+
+def kmer_count_matrix(sequences: Dict[str, dict], k: int = 6,
+                      alphabet: str = 'full') -> sparse.csr_matrix:
+    """
+    Count the k-mers of every sequence into one sparse matrix.
+    
+    Columns are the distinct integer k-mer codes in sorted order.
+    
+    Args:
+        sequences: Dictionary of processed sequences
+        k: k-mer size
+        alphabet: Residue grouping (see KMER_ALPHABETS)
+        
+    Returns:
+        CSR matrix with one row of k-mer counts per sequence
+    """
+    residues = [amino_acid_bytes(sequences, seq_id) for seq_id in sequences]
+    return _count_matrix(residues, k, alphabet)
+
+def dense_kmer_counts(sequences: Dict[str, dict], k: int = 6,
+                      alphabet: str = 'full') -> np.ndarray:
+    """
+    Count the k-mers of every sequence into dense vectors over all possible k-mers.
+    
+    Only sensible for small alphabets, where alphabet_size ** k is small.
+    
+    Args:
+        sequences: Dictionary of processed sequences
+        k: k-mer size
+        alphabet: Residue grouping (see KMER_ALPHABETS)
+        
+    Returns:
+        N x alphabet_size ** k float64 array of counts
+    """
+    residues = [amino_acid_bytes(sequences, seq_id) for seq_id in sequences]
+    rows, kmer_codes = encode_kmers(residues, k, alphabet)
+    width = alphabet_size(alphabet) ** k
+    counts = np.bincount(rows * width + kmer_codes, minlength=len(residues) * width)
+    return counts.reshape(len(residues), width).astype(np.float64)
+
+def dense_cosine_similarity(counts: np.ndarray) -> np.ndarray:
+    """
+    Compute all pairwise cosine similarities of dense count vectors.
+    
+    Uses one BLAS matrix product; counts are integers, so dot products are
+    exact and match sparse_cosine_similarity.
+    
+    Args:
+        counts: N x M array of counts
+        
+    Returns:
+        Similarity matrix with ones on the diagonal
+    """
+    dots = counts @ counts.T
+    norms = np.sqrt(np.einsum('ij,ij->i', counts, counts))
+    denominators = np.outer(norms, norms)
+    similarity_matrix = np.divide(dots, denominators, out=np.zeros(dots.shape),
+                                  where=denominators > 0)
+    np.fill_diagonal(similarity_matrix, 1.0)
+    return similarity_matrix
+
+def sparse_cosine_similarity(counts: sparse.csr_matrix,
+                             block_rows: int = SIMILARITY_BLOCK_ROWS,
+                             out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Compute all pairwise cosine similarities of sparse count vectors.
+    
+    The upper triangle is computed as integer sparse products
+    X[rows] @ X[columns].T one block_rows x block_rows tile at a time, and
+    each tile is written into the matrix and mirrored, so working memory
+    does not grow with N. Dot products are exact, so the values equal those
+    of cosine_similarity on the same counts.
+    
+    Args:
+        counts: CSR matrix with one count vector per row
+        block_rows: Rows and columns per tile
+        out: Square array (e.g. a float32 np.memmap) to write the tiles into
+            instead of a new float64 matrix
+            
+    Returns:
+        Dense similarity matrix with ones on the diagonal
+    """
+    n_rows = counts.shape[0]
+    norms = np.sqrt(np.asarray(counts.multiply(counts).sum(axis=1), dtype=np.float64).ravel())
+    similarity_matrix = np.zeros((n_rows, n_rows)) if out is None else out
+    
+    for start in range(0, n_rows, block_rows):
+        stop = min(start + block_rows, n_rows)
+        rows = counts[start:stop]
+        for column_start in range(start, n_rows, block_rows):
+            column_stop = min(column_start + block_rows, n_rows)
+            dots = (rows @ counts[column_start:column_stop].T).toarray()
+            denominators = np.outer(norms[start:stop], norms[column_start:column_stop])
+            tile = np.divide(dots, denominators, out=np.zeros(dots.shape),
+                             where=denominators > 0).astype(similarity_matrix.dtype, copy=False)
+            similarity_matrix[start:stop, column_start:column_stop] = tile
+            similarity_matrix[column_start:column_stop, start:stop] = tile.T
+    
+    np.fill_diagonal(similarity_matrix, 1.0)
+    return similarity_matrix
+
+def paired_cosine_similarity(pairs: List[Tuple[np.ndarray, np.ndarray]], k: int = 6,
+                             alphabet: str = 'full') -> np.ndarray:
+    """
+    Compute the k-mer cosine similarity of many sequence pairs at once.
+    
+    Both sequences of every pair are counted into one sparse matrix, as by
+    kmer_count_matrix, so each value equals the pair's entry of the
+    compute_kmer_similarity matrix without computing the whole matrix.
+    
+    Args:
+        pairs: (residues1, residues2) tuples of uint8 ASCII arrays
+        k: k-mer size
+        alphabet: Residue grouping (see KMER_ALPHABETS)
+        
+    Returns:
+        Array of similarities, one per pair
+    """
+    counts = _count_matrix([seq for pair in pairs for seq in pair], k, alphabet)
+    first, second = counts[0::2], counts[1::2]
+    dots = np.asarray(first.multiply(second).sum(axis=1), dtype=np.float64).ravel()
+    norms1 = np.sqrt(np.asarray(first.multiply(first).sum(axis=1), dtype=np.float64).ravel())
+    norms2 = np.sqrt(np.asarray(second.multiply(second).sum(axis=1), dtype=np.float64).ravel())
+    denominators = norms1 * norms2
+    return np.divide(dots, denominators, out=np.zeros(len(pairs)), where=denominators > 0)
+
+def sequences_fingerprint(sequences: Dict[str, dict], k: int) -> str:
+    """
+    Hash sequence IDs, amino acid sequences and k into one digest.
+    
+    Args:
+        sequences: Dictionary of processed sequences
+        k: k-mer size
+        
+    Returns:
+        Hex SHA-256 digest
+    """
+    digest = hashlib.sha256(f"k={k}\n".encode())
+    for seq_id in sequences:
+        digest.update(seq_id.encode('utf-8', 'replace') + b'\0')
+        digest.update(amino_acid_bytes(sequences, seq_id).tobytes() + b'\0')
+    return digest.hexdigest()
+
+def open_similarity_matrix(sequences: Dict[str, dict], k: int,
+                           matrix_file: str, alphabet: str = 'full') -> np.memmap:
+    """
+    Open the k-mer similarity matrix stored in a float32 memory-mapped file.
+    
+    The file is reused when its sidecar metadata (matrix_file + '.json')
+    matches the sequences and k. Otherwise the matrix is computed tile by
+    tile (upper triangle only, each tile mirrored) straight into the file,
+    and the metadata is written once it is complete.
+    
+    Args:
+        sequences: Dictionary of processed sequences
+        k: k-mer size
+        matrix_file: Path of the matrix file
+        alphabet: Residue grouping (see KMER_ALPHABETS)
+        
+    Returns:
+        Read-only N x N float32 memmap in sequence order
+    """
+    n_seqs = len(sequences)
+    metadata_file = matrix_file + '.json'
+    metadata = {'n_seqs': n_seqs, 'k': k, 'alphabet': alphabet, 'dtype': 'float32',
+                'fingerprint': sequences_fingerprint(sequences, k)}
+    
+    if os.path.isfile(matrix_file) and os.path.isfile(metadata_file):
+        with open(metadata_file) as handle:
+            if json.load(handle) == metadata:
+                logging.info(f"Reusing similarity matrix {matrix_file}")
+                return np.memmap(matrix_file, dtype=np.float32, mode='r',
+                                 shape=(n_seqs, n_seqs))
+        logging.warning(f"Similarity matrix {matrix_file} does not match the input, recomputing")
+    
+    if os.path.isfile(metadata_file):
+        os.remove(metadata_file)
+    matrix = np.memmap(matrix_file, dtype=np.float32, mode='w+', shape=(n_seqs, n_seqs))
+    sparse_cosine_similarity(kmer_count_matrix(sequences, k, alphabet), out=matrix)
+    matrix.flush()
+    del matrix
+    with open(metadata_file, 'w') as handle:
+        json.dump(metadata, handle)
+    
+    logging.info(f"Saved {n_seqs} x {n_seqs} similarity matrix to {matrix_file}")
+    return np.memmap(matrix_file, dtype=np.float32, mode='r', shape=(n_seqs, n_seqs))
+
+def compute_kmer_similarity(sequences: Dict[str, dict], k: int = 6,
+                            method: str = 'kmer',
+                            gap_penalty: int = -8,
+                            threads: int = 1,
+                            matrix_file: Optional[str] = None,
+                            alphabet: str = 'full') -> np.ndarray:
     """
     Compute pairwise k-mer similarity matrix.
     
     Args:
         sequences: Dictionary of processed sequences
         k: k-mer size
+        method: 'kmer' for k-mer cosine similarity (sparse count matrix) or
+            'alignment' for normalized Needleman-Wunsch scores
+        gap_penalty: Gap penalty used by the 'alignment' method
+        threads: Worker processes used by the 'alignment' method
+        matrix_file: Keep the 'kmer' matrix in this float32 memory-mapped
+            file, reusing it if it matches (see open_similarity_matrix)
+        alphabet: Residue grouping applied before counting 'kmer' k-mers
+            (see KMER_ALPHABETS); small alphabet_size ** k are counted densely
+            
+    Returns:
+        Similarity matrix
+    """
+    if method == 'alignment':
+        return compute_alignment_similarity(sequences, gap_penalty, threads)
+    if method != 'kmer':
+        raise ValueError(f"Unknown similarity method: {method}")
+    
+    seq_ids = list(sequences.keys())
+    if matrix_file:
+        return open_similarity_matrix(sequences, k, matrix_file, alphabet), seq_ids
+    
+    if use_dense_counts(len(seq_ids), k, alphabet):
+        return dense_cosine_similarity(dense_kmer_counts(sequences, k, alphabet)), seq_ids
+    
+    counts = kmer_count_matrix(sequences, k, alphabet)
+    logging.debug(f"Counted {counts.shape[1]} distinct {k}-mers in {len(seq_ids)} sequences")
+    return sparse_cosine_similarity(counts), seq_ids
+
+def compute_alignment_similarity(sequences: Dict[str, dict],
+                                 gap_penalty: int = -8,
+                                 threads: int = 1) -> np.ndarray:
+    """
+    Compute pairwise similarity matrix from exact global alignment scores.
+    
+    Each score is normalized by the geometric mean of the two self-alignment
+    scores and clipped to [0, 1].
+    
+    Args:
+        sequences: Dictionary of processed sequences
+        gap_penalty: Gap penalty for alignment
+        threads: Worker processes for the pairwise alignments
         
     Returns:
         Similarity matrix
     """
+    # Imported here because the alignment module depends on this one
+    from msaligner.alignment import parallel_pairwise_alignments
+    
     seq_ids = list(sequences.keys())
     n_seqs = len(seq_ids)
-    similarity_matrix = np.zeros((n_seqs, n_seqs))
-    
-    # Precompute k-mer frequencies
-    kmer_freqs = {}
-    for seq_id in seq_ids:
-        aa_seq = sequences[seq_id]['amino_acid']
-        kmer_freqs[seq_id] = kmer_frequency(aa_seq, k)
-    
-    # Compute pairwise similarities
-    for i in range(n_seqs):
-        for j in range(i, n_seqs):
-            if i == j:
-                similarity_matrix[i, j] = 1.0
-            else:
-                seq1_id = seq_ids[i]
-                seq2_id = seq_ids[j]
-                sim = cosine_similarity(
-                    kmer_freqs[seq1_id], 
-                    kmer_freqs[seq2_id]
-                )
-                similarity_matrix[i, j] = sim
-                similarity_matrix[j, i] = sim
+    aa_seqs = [sequences[seq_id]['amino_acid'] for seq_id in seq_ids]
+    similarity_matrix = np.eye(n_seqs)
+    
+    self_scores = parallel_pairwise_alignments(
+        [(seq, seq) for seq in aa_seqs], gap_penalty, threads=threads, score_only=True
+    )
+    
+    # Only pairs whose self scores allow normalization are aligned
+    index_pairs = [(i, j) for i in range(n_seqs) for j in range(i + 1, n_seqs)
+                   if self_scores[i] > 0 and self_scores[j] > 0]
+    scores = parallel_pairwise_alignments(
+        [(aa_seqs[i], aa_seqs[j]) for i, j in index_pairs], gap_penalty,
+        threads=threads, score_only=True
+    )
+    
+    for (i, j), score in zip(index_pairs, scores):
+        norm = np.sqrt(self_scores[i] * self_scores[j])
+        sim = min(max(score / norm, 0.0), 1.0)
+        similarity_matrix[i, j] = sim
+        similarity_matrix[j, i] = sim
     
     return similarity_matrix, seq_ids
 
-def sort_sequences_by_similarity(sequences: Dict[str, dict], k: int=6) -> Dict[str, dict]:
+def compute_sketch_graph(sequences: Dict[str, dict], k: int = 6,
+                         sketch_size: int = SKETCH_SIZE,
+                         n_neighbors: int = KNN_NEIGHBORS):
     """
-    Sort sequences for progressive alignment based on k-mer similarity.
+    Compute a sparse k-nearest-neighbour graph from MinHash sketches.
+    
+    Sequences are sketched in batches, so memory is O(N * sketch_size) plus
+    the graph, instead of the O(N^2) of compute_kmer_similarity. Edge weights
+    estimate the Jaccard similarity of the k-mer sets.
     
     Args:
         sequences: Dictionary of processed sequences
         k: k-mer size
+        sketch_size: Hash values kept per sequence
+        n_neighbors: Neighbours kept per sequence
         
     Returns:
-        List of sequence IDs in optimal order for progressive alignment
+        Tuple of (symmetric sparse similarity graph, sequence IDs in graph order)
     """
-    if len(sequences) <= 1:
-        return sequences
+    seq_ids = list(sequences.keys())
+    sketches = np.empty((len(seq_ids), sketch_size), dtype=np.uint64)
+    
+    for start in range(0, len(seq_ids), SKETCH_BATCH_SEQUENCES):
+        batch = seq_ids[start:start + SKETCH_BATCH_SEQUENCES]
+        rows, kmer_codes = encode_kmers([amino_acid_bytes(sequences, seq_id) for seq_id in batch], k)
+        sketches[start:start + len(batch)] = minhash_sketches(rows, kmer_codes, len(batch), sketch_size)
+    
+    return knn_graph(sketches, n_neighbors), seq_ids
+
+def order_by_index(sequences: Dict[str, dict], k: int = 6,
+                   index_file: Optional[str] = None, alphabet: str = 'full') -> List[str]:
+    """
+    Order sequences as a nearest-neighbour chain through a k-mer index.
+    
+    Args:
+        sequences: Dictionary of processed sequences
+        k: k-mer size
+        index_file: Index to extend and reuse if it exists with the same k
+            and alphabet (sequences whose protein changed are re-indexed);
+            the index is saved there afterwards
+        alphabet: Residue grouping (see KMER_ALPHABETS)
+            
+    Returns:
+        Sequence IDs in chain order
+    """
+    # Imported here because the index module depends on this one
+    from msaligner.kmer_index import KmerIndex, index_order
     
-    similarity_matrix, seq_ids = compute_kmer_similarity(sequences, k)
+    index = None
+    if index_file and os.path.isfile(index_file):
+        index = KmerIndex.load(index_file)
+        if index.k != k or index.alphabet != alphabet:
+            logging.warning(f"k-mer index {index_file} uses k={index.k} and the "
+                            f"{index.alphabet} alphabet, rebuilding")
+            index = None
     
-    # Use hierarchical clustering-like approach
-    sorted_ids = [seq_ids[0]]  # Start with first sequence
-    remaining_ids = seq_ids[1:]
+    if index is None:
+        index = KmerIndex.build(sequences, k, alphabet)
+    else:
+        index.add(sequences)
     
-    while remaining_ids:
+    if index_file:
+        index.save(index_file)
+    return index_order(index, sequences)
+
+def greedy_order(similarity_matrix: np.ndarray, seq_ids: List[str]) -> List[str]:
+    """
+    Order sequences greedily by average similarity to those already placed.
+    
+    Args:
+        similarity_matrix: Pairwise similarity matrix
+        seq_ids: Sequence IDs in matrix order
+        
+    Returns:
+        Sequence IDs in greedy order
+    """
+    sorted_idx = [0]  # Start with first sequence
+    remaining_idx = list(range(1, len(seq_ids)))
+    
+    while remaining_idx:
         # Find sequence most similar to current set
         best_similarity = -1
-        best_seq = None
-        
-        for candidate in remaining_ids:
-            candidate_idx = seq_ids.index(candidate)
-            avg_similarity = np.mean([
-                similarity_matrix[candidate_idx, seq_ids.index(sorted_id)]
-                for sorted_id in sorted_ids
-            ])
+        best_idx = None
+        
+        for candidate_idx in remaining_idx:
+            avg_similarity = np.mean(similarity_matrix[candidate_idx, sorted_idx])
             
             if avg_similarity > best_similarity:
                 best_similarity = avg_similarity
-                best_seq = candidate
+                best_idx = candidate_idx
+        
+        sorted_idx.append(best_idx)
+        remaining_idx.remove(best_idx)
+    
+    return [seq_ids[idx] for idx in sorted_idx]
+
+def sort_sequences_by_similarity(sequences: Dict[str, dict], k: int=6,
+                                 method: str = 'kmer',
+                                 gap_penalty: int = -8,
+                                 guide_tree: str = 'upgma',
+                                 tree_file: Optional[str] = None,
+                                 threads: int = 1,
+                                 matrix_file: Optional[str] = None,
+                                 index_file: Optional[str] = None,
+                                 alphabet: str = 'full') -> Dict[str, dict]:
+    """
+    Sort sequences for progressive alignment based on k-mer similarity.
+    
+    Args:
+        sequences: Dictionary of processed sequences
+        k: k-mer size
+        method: Similarity measure, 'kmer', 'alignment' or 'sketch' (MinHash
+            kNN graph, ordered along its maximum spanning forest)
+        gap_penalty: Gap penalty used by the 'alignment' method
+        guide_tree: Ordering method: 'upgma', 'nj', 'greedy' or 'knn' (nearest-
+            neighbour chain through a KmerIndex, using k-mer cosine similarity);
+            ignored by the 'sketch' method
+        tree_file: Newick file to reuse the guide tree from if it exists,
+            otherwise the newly built tree is saved there
+        threads: Worker processes used by the 'alignment' method
+        matrix_file: Memory-mapped file holding the 'kmer' similarity matrix
+        index_file: KmerIndex file used by 'knn'; sequences missing from it
+            are added and the updated index is saved back
+        alphabet: Residue grouping for the 'kmer' similarity and the 'knn'
+            index (see KMER_ALPHABETS)
         
-        sorted_ids.append(best_seq)
-        remaining_ids.remove(best_seq)
+    Returns:
+        List of sequence IDs in optimal order for progressive alignment
+    """
+    if len(sequences) <= 1:
+        return sequences
+    
+    if tree_file and os.path.isfile(tree_file):
+        tree = read_newick(tree_file)
+        if set(tree.labels) == set(sequences):
+            sorted_ids = leaf_order(tree)
+            logging.info(f"Sorted {len(sorted_ids)} sequences by guide tree {tree_file}")
+            return select_sequences(sequences, sorted_ids)
+        logging.warning(f"Guide tree {tree_file} does not match the input sequences, rebuilding")
+    
+    if method == 'sketch':
+        graph, seq_ids = compute_sketch_graph(sequences, k)
+        sorted_ids = knn_order(graph, seq_ids)
+        logging.info(f"Sorted {len(sorted_ids)} sequences along the sketch kNN graph")
+        return select_sequences(sequences, sorted_ids)
+    
+    if guide_tree == 'knn':
+        sorted_ids = order_by_index(sequences, k, index_file, alphabet)
+        logging.info(f"Sorted {len(sorted_ids)} sequences by k-mer index neighbours")
+        return select_sequences(sequences, sorted_ids)
+    
+    similarity_matrix, seq_ids = compute_kmer_similarity(
+        sequences, k, method, gap_penalty, threads, matrix_file, alphabet
+    )
+    
+    if guide_tree == 'greedy':
+        sorted_ids = greedy_order(similarity_matrix, seq_ids)
+    else:
+        tree, sorted_ids = build_guide_tree(similarity_matrix, seq_ids, guide_tree)
+        if tree_file:
+            write_newick(tree, tree_file)
     
-    logging.info(f"Sorted {len(sorted_ids)} sequences by k-mer similarity")
-    return {seq_id: sequences[seq_id] for seq_id in sorted_ids}
\ No newline at end of file
+    logging.info(f"Sorted {len(sorted_ids)} sequences by {method} similarity")
+    return select_sequences(sequences, sorted_ids)
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+On-disk cache of ORF detection and translation results.
+"""
+
+import hashlib
+import logging
+import sqlite3
+from typing import Dict, Iterable, List, Tuple
+
+# Keys looked up per SQL statement (below SQLite's bound parameter limit)
+CACHE_QUERY_BATCH = 500
+
+# Bytes of the BLAKE2b digest used as a cache key
+CACHE_KEY_SIZE = 16
+
+def cache_key(parameters: bytes, sequence: bytes) -> bytes:
+    """
+    Content address of a sequence processed with given parameters.
+    
+    Args:
+        parameters: Serialized ORF parameters (see orf_parameters)
+        sequence: Upper-case nucleotide sequence bytes
+        
+    Returns:
+        CACHE_KEY_SIZE-byte digest
+    """
+    digest = hashlib.blake2b(parameters, digest_size=CACHE_KEY_SIZE)
+    digest.update(b'\0')
+    digest.update(sequence)
+    return digest.digest()
+
+class OrfCache:
+    """
+    SQLite table of (has_ambiguous, orf_start, orf_end, strand, protein,
+    ambiguous codons) rows keyed by cache_key.
+    
+    Entries are never invalidated: a key already covers everything the
+    result depends on.
+    """
+    __slots__ = ('path', '_connection')
+    
+    def __init__(self, path: str):
+        """
+        Open or create a cache file.
+        
+        Args:
+            path: SQLite database path
+        """
+        self.path = path
+        self._connection = sqlite3.connect(path)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS orfs ("
+            "key BLOB PRIMARY KEY, has_ambiguous INTEGER, orf_start INTEGER, "
+            "orf_end INTEGER, strand INTEGER, protein BLOB, n_ambiguous INTEGER"
+            ") WITHOUT ROWID"
+        )
+        self._connection.commit()
+    
+    def __len__(self) -> int:
+        return self._connection.execute("SELECT COUNT(*) FROM orfs").fetchone()[0]
+    
+    def get_many(self, keys: List[bytes]) -> Dict[bytes, tuple]:
+        """
+        Look up many keys at once.
+        
+        Args:
+            keys: Cache keys
+            
+        Returns:
+            Dictionary of the cached rows of the keys that were found
+        """
+        found = {}
+        for start in range(0, len(keys), CACHE_QUERY_BATCH):
+            batch = keys[start:start + CACHE_QUERY_BATCH]
+            placeholders = ','.join('?' * len(batch))
+            for key, *row in self._connection.execute(
+                f"SELECT key, has_ambiguous, orf_start, orf_end, strand, protein, n_ambiguous "
+                f"FROM orfs WHERE key IN ({placeholders})", batch
+            ):
+                found[key] = (bool(row[0]), row[1], row[2], row[3], bytes(row[4]), row[5])
+        return found
+    
+    def put_many(self, items: Iterable[Tuple[bytes, tuple]]):
+        """
+        Store results in one transaction.
+        
+        Args:
+            items: (key, row) pairs with rows as returned by get_many
+        """
+        with self._connection:
+            self._connection.executemany(
+                "INSERT OR IGNORE INTO orfs VALUES (?, ?, ?, ?, ?, ?, ?)",
+                ((key, int(row[0]), *row[1:]) for key, row in items)
+            )
+    
+    def close(self):
+        """Close the database."""
+        logging.debug(f"Closing ORF cache {self.path}")
+        self._connection.close()
@@ -4,11 +4,18 @@ ORF detection and sequence translation module.
 """
 
 import logging
-from typing import Dict, List, Tuple, Optional
-from Bio import SeqIO
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice, product
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Tuple, Optional
+import numpy as np
 from Bio.Seq import Seq
 from Bio.SeqRecord import SeqRecord
 
+from msaligner.fasta_reader import IndexedFasta, is_gzipped, iter_fasta
+from msaligner.orf_cache import OrfCache, cache_key
+from msaligner.sequence_store import SequenceStore, reverse_complement
+
 # Standard genetic code
 GENETIC_CODE = {
     'ATA':'I', 'ATC':'I', 'ATT':'I', 'ATG':'M',
@@ -38,6 +45,65 @@ AMBIGUOUS_BASES = {
     'N': ['A', 'C', 'G', 'T']
 }
 
+# FASTA records sent to a worker at a time by process_sequences
+ORF_CHUNK_SIZE = 1024
+
+# Chunks queued per worker before reading pauses for results
+ORF_CHUNKS_PER_WORKER = 4
+
+# Base codes used to index codons; anything other than A, C, G, T is OTHER_BASE
+BASE_CODES = {'A': 0, 'C': 1, 'G': 2, 'T': 3}
+OTHER_BASE = len(BASE_CODES)
+BASE_RADIX = OTHER_BASE + 1
+
+_BASE_LOOKUP = np.full(256, OTHER_BASE, dtype=np.int16)
+for _base, _code in BASE_CODES.items():
+    _BASE_LOOKUP[ord(_base)] = _code
+
+# IUPAC nucleotide codes indexing the translation table; anything else maps
+# to the last code, which always translates to 'X'
+IUPAC_CODES = 'ACGT' + ''.join(AMBIGUOUS_BASES)
+N_IUPAC = len(IUPAC_CODES) + 1
+
+_IUPAC_LOOKUP = np.full(256, len(IUPAC_CODES), dtype=np.intp)
+for _code, _base in enumerate(IUPAC_CODES):
+    _IUPAC_LOOKUP[ord(_base)] = _code
+
+# Flags the ambiguous IUPAC codes among uint8 ASCII bases
+_AMBIGUOUS_LOOKUP = np.zeros(256, dtype=bool)
+_AMBIGUOUS_LOOKUP[[ord(base) for base in AMBIGUOUS_BASES]] = True
+
+# Byte table replacing non-ASCII bytes with '?'
+_ASCII_REPLACE = bytes(range(128)) + b'?' * 128
+
+def _build_translation_table() -> np.ndarray:
+    """
+    Build the IUPAC codon -> amino acid table.
+    
+    An ambiguous codon translates to the amino acid shared by all of its
+    expansions, or 'X' when they disagree.
+    
+    Returns:
+        N_IUPAC x N_IUPAC x N_IUPAC uint8 array of ASCII amino acids
+    """
+    expansions = [[base] for base in 'ACGT'] + list(AMBIGUOUS_BASES.values())
+    table = np.full((N_IUPAC,) * 3, ord('X'), dtype=np.uint8)
+    for codes in product(range(len(IUPAC_CODES)), repeat=3):
+        amino_acids = {GENETIC_CODE[''.join(codon)]
+                       for codon in product(*(expansions[code] for code in codes))}
+        if len(amino_acids) == 1:
+            table[codes] = ord(amino_acids.pop())
+    return table
+
+TRANSLATION_TABLE = _build_translation_table()
+
+def _codon_index(codon: str) -> int:
+    """Index of an unambiguous codon in the codon_indices encoding."""
+    return sum(BASE_CODES[base] * BASE_RADIX ** (2 - offset) for offset, base in enumerate(codon))
+
+START_CODON_INDEX = _codon_index('ATG')
+STOP_CODON_INDICES = np.array([_codon_index(codon) for codon in ('TAA', 'TAG', 'TGA')], dtype=np.int16)
+
 def read_fasta(file_path: str) -> Dict[str, str]:
     """
     Read sequences from a FASTA file.
@@ -50,8 +116,8 @@ def read_fasta(file_path: str) -> Dict[str, str]:
     """
     sequences = {}
     try:
-        for record in SeqIO.parse(file_path, "fasta"):
-            sequences[record.id] = str(record.seq).upper()
+        for seq_id, sequence in iter_fasta(file_path):
+            sequences[seq_id] = sequence.decode('ascii', 'replace')
         logging.info(f"Read {len(sequences)} sequences from {file_path}")
     except Exception as e:
         logging.error(f"Error reading FASTA file {file_path}: {str(e)}")
@@ -59,17 +125,21 @@ def read_fasta(file_path: str) -> Dict[str, str]:
     
     return sequences
 
-def has_ambiguous_bases(sequence: str) -> bool:
+def has_ambiguous_bases(sequence) -> bool:
     """
     Check if sequence contains ambiguous bases.
     
     Args:
-        sequence: Nucleotide sequence
+        sequence: Nucleotide sequence (str, bytes or uint8 ASCII array)
         
     Returns:
         True if sequence contains ambiguous bases
     """
-    return any(base in AMBIGUOUS_BASES for base in sequence)
+    if isinstance(sequence, str):
+        sequence = sequence.encode('ascii', 'replace')
+    if isinstance(sequence, bytes):
+        sequence = np.frombuffer(sequence, dtype=np.uint8)
+    return bool(_AMBIGUOUS_LOOKUP[sequence].any())
 
 def resolve_ambiguous_codon(codon: str) -> str:
     """
@@ -79,18 +149,18 @@ def resolve_ambiguous_codon(codon: str) -> str:
         codon: 3-nucleotide codon possibly containing ambiguous bases
         
     Returns:
-        Amino acid or 'X' if ambiguous
+        Amino acid shared by every expansion of the codon, or 'X' if the
+        expansions disagree
     """
-    if not has_ambiguous_bases(codon):
-        return GENETIC_CODE.get(codon, 'X')
-    
-    # For ambiguous codons, return 'X' (unknown amino acid)
-    logging.warning(f"Ambiguous codon detected: {codon}")
-    return 'X'
+    if len(codon) != 3:
+        return 'X'
+    return translate_orf(codon)[0]
 
-def detect_orf(sequence: str, min_length: int = 30) -> Optional[Tuple[int, int]]:
+def detect_orf_reference(sequence: str, min_length: int = 30) -> Optional[Tuple[int, int]]:
     """
-    Detect the longest open reading frame in a nucleotide sequence.
+    Detect the longest open reading frame by scanning forward from every ATG.
+    
+    Quadratic in the worst case; kept as the reference for detect_orf.
     
     Args:
         sequence: Nucleotide sequence
@@ -121,63 +191,381 @@ def detect_orf(sequence: str, min_length: int = 30) -> Optional[Tuple[int, int]]
     
     return best_orf
 
-def translate_sequence(sequence: str, orf_coords: Tuple[int, int]) -> str:
+def codon_indices(sequence) -> np.ndarray:
+    """
+    Encode the codon starting at every position of a nucleotide sequence.
+    
+    Each base is mapped to A=0, C=1, G=2, T=3 or OTHER_BASE and the three
+    bases of a codon are combined in radix BASE_RADIX, so ambiguous codons
+    never collide with unambiguous ones.
+    
+    Args:
+        sequence: Upper-case nucleotide sequence (str or uint8 ASCII array)
+        
+    Returns:
+        int16 array of length max(len(sequence) - 2, 0); entry i encodes
+        sequence[i:i+3]
+    """
+    if isinstance(sequence, str):
+        sequence = np.frombuffer(sequence.encode('ascii', 'replace'), dtype=np.uint8)
+    bases = _BASE_LOOKUP[sequence]
+    if len(bases) < 3:
+        return np.zeros(0, dtype=np.int16)
+    return (bases[:-2] * BASE_RADIX + bases[1:-1]) * BASE_RADIX + bases[2:]
+
+def _longest_orf(codons: np.ndarray, min_length: int) -> Tuple[int, int]:
+    """
+    Find the longest ATG-to-stop ORF over the three frames of a codon array.
+    
+    Args:
+        codons: Codon indices from codon_indices
+        min_length: Minimum ORF length in nucleotides
+        
+    Returns:
+        Tuple of (length, start) of the longest ORF, ties going to the
+        earlier frame and then the earlier start; (0, -1) if none qualifies
+    """
+    max_length, best_start = 0, -1
+    for frame in range(3):
+        frame_codons = codons[frame::3]
+        starts = np.flatnonzero(frame_codons == START_CODON_INDEX)
+        stops = np.flatnonzero(np.isin(frame_codons, STOP_CODON_INDICES))
+        if len(starts) == 0 or len(stops) == 0:
+            continue
+        
+        # First stop after each start, in codons of this frame
+        next_stop = np.searchsorted(stops, starts, side='right')
+        closed = next_stop < len(stops)
+        starts = starts[closed]
+        lengths = (stops[next_stop[closed]] - starts + 1) * 3
+        lengths[lengths < min_length] = 0
+        if len(lengths) == 0:
+            continue
+        
+        best = int(np.argmax(lengths))
+        if lengths[best] > max_length:
+            max_length = int(lengths[best])
+            best_start = frame + 3 * int(starts[best])
+    
+    return max_length, best_start
+
+def detect_orf(sequence: str, min_length: int = 30) -> Optional[Tuple[int, int]]:
+    """
+    Detect the longest open reading frame in a nucleotide sequence.
+    
+    Each ATG is paired with the next in-frame stop codon; the longest pair of
+    at least min_length nucleotides wins, ties going to the earlier frame and
+    then the earlier start. Linear in the sequence length and identical to
+    detect_orf_reference.
+    
+    Args:
+        sequence: Nucleotide sequence
+        min_length: Minimum ORF length in nucleotides
+        
+    Returns:
+        Tuple of (start_position, end_position) or None if no ORF found
+    """
+    length, start = _longest_orf(codon_indices(sequence.upper()), min_length)
+    return (start, start + length) if length else None
+
+def detect_orf_six_frame(sequence: str, min_length: int = 30) -> Optional[Tuple[int, int, int]]:
+    """
+    Detect the longest open reading frame on either strand.
+    
+    The reverse complement is built once and its three frames are scanned
+    like the forward ones. A minus-strand ORF is only chosen when it is
+    strictly longer than the best forward ORF, so forward results match
+    detect_orf.
+    
+    Args:
+        sequence: Nucleotide sequence
+        min_length: Minimum ORF length in nucleotides
+        
+    Returns:
+        Tuple of (start_position, end_position, strand) or None if no ORF
+        found; coordinates are on the plus strand and strand is 1 or -1
+    """
+    forward = np.frombuffer(sequence.upper().encode('ascii', 'replace'), dtype=np.uint8)
+    reverse = reverse_complement(forward)
+    length, start = _longest_orf(codon_indices(forward), min_length)
+    reverse_length, reverse_start = _longest_orf(codon_indices(reverse), min_length)
+    
+    if reverse_length > length:
+        # Map the reverse-complement interval back onto the plus strand
+        return len(forward) - reverse_start - reverse_length, len(forward) - reverse_start, -1
+    return (start, start + length, 1) if length else None
+
+def translate_orf(orf) -> Tuple[str, int]:
+    """
+    Translate an ORF with one lookup in TRANSLATION_TABLE.
+    
+    Args:
+        orf: Upper-case ORF bases in coding orientation (str or uint8 ASCII
+            array); a trailing partial codon is ignored
+            
+    Returns:
+        Tuple of (amino acid sequence, number of codons with ambiguous bases)
+    """
+    if isinstance(orf, str):
+        orf = np.frombuffer(orf.encode('ascii', 'replace'), dtype=np.uint8)
+    n_codons = len(orf) // 3
+    codes = _IUPAC_LOOKUP[orf[:n_codons * 3]].reshape(n_codons, 3)
+    amino_acids = TRANSLATION_TABLE[codes[:, 0], codes[:, 1], codes[:, 2]]
+    
+    # Codes 4 .. N_IUPAC - 2 are the ambiguous bases of AMBIGUOUS_BASES
+    ambiguous = (codes >= 4) & (codes < len(IUPAC_CODES))
+    n_ambiguous = int(np.count_nonzero(ambiguous.any(axis=1)))
+    return amino_acids.tobytes().decode('ascii'), n_ambiguous
+
+def translate_sequence(sequence: str, orf_coords: Tuple[int, int], strand: int = 1) -> str:
     """
     Translate nucleotide sequence to amino acid sequence.
     
     Args:
         sequence: Nucleotide sequence
-        orf_coords: ORF coordinates (start, end)
+        orf_coords: ORF coordinates (start, end) on the plus strand
+        strand: Strand of the ORF; -1 translates its reverse complement
         
     Returns:
         Amino acid sequence
     """
     start, end = orf_coords
-    orf_sequence = sequence[start:end]
-    
-    amino_acids = []
-    for i in range(0, len(orf_sequence) - 2, 3):
-        codon = orf_sequence[i:i+3]
-        aa = resolve_ambiguous_codon(codon)
-        amino_acids.append(aa)
-    
-    return ''.join(amino_acids)
+    orf = np.frombuffer(sequence[start:end].encode('ascii', 'replace'), dtype=np.uint8)
+    if strand < 0:
+        orf = reverse_complement(orf)
+    return translate_orf(orf)[0]
 
-def process_sequences(fasta_file: str) -> Dict[str, dict]:
+class OrfResult(NamedTuple):
+    """ORF detection and translation result of one nucleotide sequence."""
+    has_ambiguous: bool
+    orf_start: int
+    orf_end: int
+    strand: int
+    protein: bytes
+    n_ambiguous: int
+
+def orf_parameters(min_length: int, six_frame: bool) -> bytes:
     """
-    Process all sequences in a FASTA file: detect ORFs and translate.
+    Serialize everything an OrfResult depends on besides the sequence.
     
     Args:
-        fasta_file: Path to input FASTA file
+        min_length: Minimum ORF length in nucleotides
+        six_frame: Whether the reverse strand is searched
         
     Returns:
-        Dictionary mapping sequence IDs to sequence data
+        Bytes identifying the parameters and genetic code
+    """
+    code = ';'.join(f"{codon}={aa}" for codon, aa in sorted(GENETIC_CODE.items()))
+    ambiguity = ';'.join(f"{base}={''.join(bases)}" for base, bases in sorted(AMBIGUOUS_BASES.items()))
+    return f"min_length={min_length}|six_frame={int(six_frame)}|{code}|{ambiguity}".encode('ascii')
+
+def _orf_result(nt_bytes: bytes, six_frame: bool, min_length: int) -> OrfResult:
     """
-    nucleotide_sequences = read_fasta(fasta_file)
-    processed_sequences = {}
+    Detect the ORF of one nucleotide sequence and translate it.
     
-    for seq_id, nt_seq in nucleotide_sequences.items():
-        # Check for ambiguous bases
-        if has_ambiguous_bases(nt_seq):
-            logging.warning(f"Sequence {seq_id} contains ambiguous bases")
+    Args:
+        nt_bytes: Upper-case nucleotide sequence bytes
+        six_frame: Also search the reverse strand for ORFs
+        min_length: Minimum ORF length in nucleotides
         
-        # Detect ORF
-        orf_coords = detect_orf(nt_seq)
+    Returns:
+        OrfResult; orf_start is -1 if no ORF was found
+    """
+    nt_seq = nt_bytes.decode('ascii', 'replace')
+    has_ambiguous = has_ambiguous_bases(nt_bytes)
+    
+    if six_frame:
+        orf = detect_orf_six_frame(nt_seq, min_length)
+        orf_coords, strand = (orf[:2], orf[2]) if orf is not None else (None, 1)
+    else:
+        orf_coords, strand = detect_orf(nt_seq, min_length), 1
+    if orf_coords is None:
+        return OrfResult(has_ambiguous, -1, -1, 1, b'', 0)
+    
+    orf = np.frombuffer(nt_seq[orf_coords[0]:orf_coords[1]].encode('ascii', 'replace'),
+                        dtype=np.uint8)
+    aa_seq, n_ambiguous = translate_orf(reverse_complement(orf) if strand < 0 else orf)
+    return OrfResult(has_ambiguous, orf_coords[0], orf_coords[1], strand,
+                     aa_seq.encode('ascii', 'replace'), n_ambiguous)
+
+def _process_chunk(chunk: List[bytes], six_frame: bool, min_length: int) -> List[OrfResult]:
+    """
+    Process a chunk of nucleotide sequences (worker entry point).
+    
+    Args:
+        chunk: Upper-case nucleotide sequence bytes
+        six_frame: Also search the reverse strand for ORFs
+        min_length: Minimum ORF length in nucleotides
         
-        if orf_coords is None:
-            logging.warning(f"No ORF found in sequence {seq_id}")
-            continue
+    Returns:
+        OrfResult of each sequence in chunk order
+    """
+    return [_orf_result(nt_bytes, six_frame, min_length) for nt_bytes in chunk]
+
+def _chunks(records: Iterable, chunk_size: int) -> Iterator[list]:
+    """Split an iterable into lists of chunk_size items."""
+    records = iter(records)
+    while True:
+        chunk = list(islice(records, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+def _processed_records(fasta_file: str, six_frame: bool, min_length: int, threads: int,
+                       chunk_size: int, cache: Optional[OrfCache] = None
+                       ) -> Iterator[Tuple[str, bytes, OrfResult]]:
+    """
+    Process the records of a FASTA file, optionally over a process pool.
+    
+    Records are handled in chunks: cached results of a chunk are looked up
+    in one query, only the misses are computed, and their results are
+    stored back in one transaction. With several workers, at most
+    threads * ORF_CHUNKS_PER_WORKER chunks are in flight; reading waits for
+    the oldest chunk whenever the queue is full, so memory stays bounded
+    however large the input is.
+    
+    Args:
+        fasta_file: Path to input FASTA file
+        six_frame: Also search the reverse strand for ORFs
+        min_length: Minimum ORF length in nucleotides
+        threads: Number of worker processes (1 runs in this process)
+        chunk_size: FASTA records per worker task
+        cache: ORF cache to read and update
         
-        # Translate to amino acids
-        aa_seq = translate_sequence(nt_seq, orf_coords)
+    Yields:
+        (seq_id, nucleotide bytes, OrfResult) tuples in input order
+    """
+    parameters = orf_parameters(min_length, six_frame)
+    
+    def lookup(chunk):
+        # Returns (keys, cached rows by key, indices of records to compute)
+        if cache is None:
+            return None, {}, list(range(len(chunk)))
+        keys = [cache_key(parameters, nt_bytes) for _, nt_bytes in chunk]
+        cached = cache.get_many(keys)
+        return keys, cached, [i for i, key in enumerate(keys) if key not in cached]
+    
+    def merge(chunk, keys, cached, misses, computed):
+        results = [None] * len(chunk) if keys is None else [cached.get(key) for key in keys]
+        for i, result in zip(misses, computed):
+            results[i] = result
+        if keys is not None and misses:
+            cache.put_many((keys[i], result) for i, result in zip(misses, computed))
+        for (seq_id, nt_bytes), result in zip(chunk, results):
+            yield seq_id, nt_bytes, OrfResult(*result)
+    
+    n_cached = 0
+    chunks = _chunks(iter_fasta(fasta_file), chunk_size)
+    if threads <= 1:
+        for chunk in chunks:
+            keys, cached, misses = lookup(chunk)
+            n_cached += len(chunk) - len(misses)
+            computed = _process_chunk([chunk[i][1] for i in misses], six_frame, min_length)
+            yield from merge(chunk, keys, cached, misses, computed)
+    else:
+        max_pending = threads * ORF_CHUNKS_PER_WORKER
+        with ProcessPoolExecutor(max_workers=threads) as executor:
+            pending = deque()
+            for chunk in chunks:
+                if len(pending) >= max_pending:
+                    *state, future = pending.popleft()
+                    yield from merge(*state, future.result())
+                keys, cached, misses = lookup(chunk)
+                n_cached += len(chunk) - len(misses)
+                pending.append((chunk, keys, cached, misses, executor.submit(
+                    _process_chunk, [chunk[i][1] for i in misses], six_frame, min_length
+                )))
+            while pending:
+                *state, future = pending.popleft()
+                yield from merge(*state, future.result())
+    
+    if cache is not None:
+        logging.info(f"Reused {n_cached} cached ORFs from {cache.path}")
+
+def process_sequences(fasta_file: str, six_frame: bool = False, threads: int = 1,
+                      chunk_size: int = ORF_CHUNK_SIZE, use_faidx: bool = False,
+                      cache_file: Optional[str] = None, min_length: int = 30) -> SequenceStore:
+    """
+    Process all sequences in a FASTA file: detect ORFs and translate.
+    
+    Records are streamed from the file, so each one is processed as soon as
+    it is read, either here or in chunks over a process pool; the result does
+    not depend on threads. A repeated ID replaces the earlier record in
+    place, as in the dictionary returned by read_fasta.
+    
+    With use_faidx, nucleotide sequences are not kept: the store reads them
+    (or just their ORF bytes) from the FASTA file through its faidx index,
+    which is built once and saved next to the input. Compressed inputs are
+    always held in memory.
+    
+    With cache_file, results are looked up in an OrfCache keyed by the
+    sequence bytes, min_length, six_frame and the genetic code before
+    anything is computed, and new results are added to it.
+    
+    Args:
+        fasta_file: Path to input FASTA file
+        six_frame: Also search the reverse strand for ORFs
+        threads: Number of worker processes (1 runs in this process)
+        chunk_size: FASTA records per worker task
+        use_faidx: Read nucleotide sequences on demand through a faidx index
+        cache_file: SQLite ORF cache to reuse and update
+        min_length: Minimum ORF length in nucleotides
         
-        processed_sequences[seq_id] = {
-            'nucleotide': nt_seq,
-            'amino_acid': aa_seq,
-            'orf_start': orf_coords[0],
-            'orf_end': orf_coords[1],
-            'has_ambiguous': has_ambiguous_bases(nt_seq)
-        }
+    Returns:
+        SequenceStore mapping sequence IDs to sequence data; close it (or
+        use it as a context manager) to release the indexed FASTA file
+    """
+    fasta = None
+    if use_faidx:
+        if is_gzipped(fasta_file):
+            logging.warning(f"Keeping sequences of compressed file {fasta_file} in memory")
+        else:
+            fasta = IndexedFasta(fasta_file)
+    
+    cache = OrfCache(cache_file) if cache_file else None
+    records = []
+    positions = {}
+    n_read = 0
+    
+    try:
+        for seq_id, nt_bytes, result in _processed_records(fasta_file, six_frame, min_length,
+                                                           threads, chunk_size, cache):
+            n_read += 1
+            if result.has_ambiguous:
+                logging.warning(f"Sequence {seq_id} contains ambiguous bases")
+            if result.orf_start < 0:
+                logging.warning(f"No ORF found in sequence {seq_id}")
+                if seq_id in positions:
+                    records[positions[seq_id]] = None
+                continue
+            if result.n_ambiguous:
+                logging.warning(f"Sequence {seq_id} has {result.n_ambiguous} ambiguous codons")
+            
+            record = (
+                seq_id,
+                nt_bytes.translate(_ASCII_REPLACE) if fasta is None else b'',
+                result.protein,
+                result.orf_start,
+                result.orf_end,
+                result.has_ambiguous,
+                result.strand
+            )
+            if seq_id in positions:
+                records[positions[seq_id]] = record
+            else:
+                positions[seq_id] = len(records)
+                records.append(record)
+    except BaseException:
+        if fasta is not None:
+            fasta.close()
+        raise
+    finally:
+        # Results stored so far stay committed even if processing fails
+        if cache is not None:
+            cache.close()
     
+    logging.info(f"Read {n_read} sequences from {fasta_file}")
+    processed_sequences = SequenceStore.build((record for record in records if record is not None),
+                                              fasta)
     logging.info(f"Successfully processed {len(processed_sequences)} sequences")
-    return processed_sequences
\ No newline at end of file
+    return processed_sequences
@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""
+Contiguous storage of processed sequences shared by all pipeline stages.
+"""
+
+import logging
+from collections.abc import Mapping
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+
+from msaligner.fasta_reader import IndexedFasta
+
+# Fields exposed by every sequence record, as in the dictionaries built by
+# process_sequences
+RECORD_FIELDS = ('nucleotide', 'amino_acid', 'orf_start', 'orf_end', 'has_ambiguous', 'strand')
+
+# IUPAC complement of each base; other bytes are left unchanged
+_COMPLEMENT = np.arange(256, dtype=np.uint8)
+for _base, _complement in zip(b'ACGTRYKMBVDHacgtrykmbvdh', b'TGCAYRMKVBHDtgcayrmkvbhd'):
+    _COMPLEMENT[_base] = _complement
+
+def reverse_complement(bases: np.ndarray) -> np.ndarray:
+    """
+    Reverse-complement a nucleotide sequence held as uint8 ASCII codes.
+    
+    Args:
+        bases: uint8 array of ASCII bases
+        
+    Returns:
+        New uint8 array of the reverse complement
+    """
+    return _COMPLEMENT[bases[::-1]]
+
+def _pack(chunks: List[bytes]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Concatenate byte strings into one uint8 buffer with an offsets array.
+    
+    Args:
+        chunks: Byte strings to pack
+        
+    Returns:
+        Tuple of (uint8 buffer, int64 offsets of length len(chunks) + 1)
+    """
+    offsets = np.zeros(len(chunks) + 1, dtype=np.int64)
+    np.cumsum([len(chunk) for chunk in chunks], out=offsets[1:])
+    buffer = np.frombuffer(b''.join(chunks), dtype=np.uint8)
+    return buffer, offsets
+
+class SequenceRecord(Mapping):
+    """
+    Read-only view of one stored sequence with the fields of RECORD_FIELDS.
+    
+    Strings are decoded from the shared buffers only when a field is read.
+    """
+    __slots__ = ('_store', '_seq_id', '_row')
+    
+    def __init__(self, store: 'SequenceStore', seq_id: str, row: int):
+        self._store = store
+        self._seq_id = seq_id
+        self._row = row
+    
+    def __getitem__(self, key: str):
+        store, row = self._store, self._row
+        if key == 'nucleotide':
+            return store.nucleotide_view(self._seq_id).tobytes().decode('ascii')
+        if key == 'amino_acid':
+            return store._amino_acid_row(row).tobytes().decode('ascii')
+        if key == 'orf_start':
+            return int(store._orfs[row, 0])
+        if key == 'orf_end':
+            return int(store._orfs[row, 1])
+        if key == 'has_ambiguous':
+            return bool(store._ambiguous[row])
+        if key == 'strand':
+            return int(store._strands[row])
+        raise KeyError(key)
+    
+    def __iter__(self):
+        return iter(RECORD_FIELDS)
+    
+    def __len__(self) -> int:
+        return len(RECORD_FIELDS)
+
+class SequenceStore(Mapping):
+    """
+    Nucleotide and amino acid sequences held as contiguous uint8 buffers.
+    
+    Behaves like the Dict[str, dict] returned by process_sequences (IDs map
+    to records with the same fields), while stages that work on arrays can
+    take zero-copy views with nucleotide_view, amino_acid_view and orf_view.
+    Subsets and reorderings share the underlying buffers. When built with
+    an IndexedFasta, nucleotide sequences are not stored at all and are read
+    from the FASTA file on demand.
+    """
+    __slots__ = ('_ids', '_rows', '_nucleotides', '_nt_offsets',
+                 '_amino_acids', '_aa_offsets', '_orfs', '_ambiguous', '_strands', '_fasta')
+    
+    def __init__(self, ids: List[str], nucleotides: np.ndarray, nt_offsets: np.ndarray,
+                 amino_acids: np.ndarray, aa_offsets: np.ndarray, orfs: np.ndarray,
+                 ambiguous: np.ndarray, strands: np.ndarray,
+                 rows: Optional[Dict[str, int]] = None,
+                 fasta: Optional[IndexedFasta] = None):
+        """
+        Wrap packed sequence buffers.
+        
+        Args:
+            ids: Sequence IDs in iteration order
+            nucleotides: uint8 buffer of all nucleotide sequences
+            nt_offsets: Start of each nucleotide sequence, plus the total length
+            amino_acids: uint8 buffer of all amino acid sequences
+            aa_offsets: Start of each amino acid sequence, plus the total length
+            orfs: N x 2 array of (orf_start, orf_end)
+            ambiguous: Boolean array flagging sequences with ambiguous bases
+            strands: int8 array with the strand of each ORF (1 or -1)
+            rows: Buffer row of each ID (defaults to the position in ids)
+            fasta: Indexed FASTA file holding the nucleotide sequences, in
+                which case the nucleotide buffer is unused
+        """
+        self._ids = list(ids)
+        self._rows = rows if rows is not None else {seq_id: row for row, seq_id in enumerate(ids)}
+        self._nucleotides = nucleotides
+        self._nt_offsets = nt_offsets
+        self._amino_acids = amino_acids
+        self._aa_offsets = aa_offsets
+        self._orfs = orfs
+        self._ambiguous = ambiguous
+        self._strands = strands
+        self._fasta = fasta
+    
+    @classmethod
+    def build(cls, records: Iterable[Tuple[str, bytes, bytes, int, int, bool, int]],
+              fasta: Optional[IndexedFasta] = None) -> 'SequenceStore':
+        """
+        Pack processed sequences into a store.
+        
+        Args:
+            records: (seq_id, nucleotide bytes, amino acid bytes, orf_start,
+                orf_end, has_ambiguous, strand) tuples; minus-strand ORFs
+                keep plus-strand coordinates
+            fasta: Indexed FASTA file to read nucleotide sequences from; the
+                nucleotide bytes of the records are then ignored
+                
+        Returns:
+            SequenceStore
+        """
+        ids, nucleotides, amino_acids, orfs, ambiguous, strands = [], [], [], [], [], []
+        for seq_id, nt_seq, aa_seq, orf_start, orf_end, has_ambiguous, strand in records:
+            ids.append(seq_id)
+            nucleotides.append(nt_seq if fasta is None else b'')
+            amino_acids.append(aa_seq)
+            orfs.append((orf_start, orf_end))
+            ambiguous.append(has_ambiguous)
+            strands.append(strand)
+        
+        nt_buffer, nt_offsets = _pack(nucleotides)
+        aa_buffer, aa_offsets = _pack(amino_acids)
+        store = cls(ids, nt_buffer, nt_offsets, aa_buffer, aa_offsets,
+                    np.array(orfs, dtype=np.int64).reshape(-1, 2),
+                    np.array(ambiguous, dtype=bool), np.array(strands, dtype=np.int8),
+                    fasta=fasta)
+        logging.debug(f"Packed {len(ids)} sequences into {store.nbytes} bytes")
+        return store
+    
+    @classmethod
+    def from_dict(cls, sequences: Dict[str, dict]) -> 'SequenceStore':
+        """
+        Pack a dictionary of processed sequences into a store.
+        
+        Args:
+            sequences: Dictionary of processed sequences
+            
+        Returns:
+            SequenceStore
+        """
+        return cls.build(
+            (seq_id, data['nucleotide'].encode('ascii', 'replace'),
+             data['amino_acid'].encode('ascii', 'replace'),
+             data['orf_start'], data['orf_end'], data['has_ambiguous'],
+             data.get('strand', 1))
+            for seq_id, data in sequences.items()
+        )
+    
+    def _nucleotide_row(self, row: int) -> np.ndarray:
+        """Zero-copy view of the nucleotide sequence in buffer row `row`."""
+        return self._nucleotides[self._nt_offsets[row]:self._nt_offsets[row + 1]]
+    
+    def _amino_acid_row(self, row: int) -> np.ndarray:
+        """Zero-copy view of the amino acid sequence in buffer row `row`."""
+        return self._amino_acids[self._aa_offsets[row]:self._aa_offsets[row + 1]]
+    
+    def __getitem__(self, seq_id: str) -> SequenceRecord:
+        return SequenceRecord(self, seq_id, self._rows[seq_id])
+    
+    def __iter__(self):
+        return iter(self._ids)
+    
+    def __len__(self) -> int:
+        return len(self._ids)
+    
+    def __contains__(self, seq_id) -> bool:
+        return seq_id in self._rows
+    
+    @property
+    def nbytes(self) -> int:
+        """Total size of the packed buffers in bytes."""
+        return sum(array.nbytes for array in (
+            self._nucleotides, self._nt_offsets, self._amino_acids,
+            self._aa_offsets, self._orfs, self._ambiguous, self._strands
+        ))
+    
+    def nucleotide_view(self, seq_id: str) -> np.ndarray:
+        """
+        Get the nucleotide sequence as a zero-copy uint8 view.
+        
+        With an indexed FASTA file the sequence is read into a new array.
+        
+        Args:
+            seq_id: Sequence ID
+            
+        Returns:
+            uint8 array of ASCII bases
+        """
+        if self._fasta is not None:
+            return np.frombuffer(self._fasta.fetch(seq_id), dtype=np.uint8)
+        return self._nucleotide_row(self._rows[seq_id])
+    
+    def amino_acid_view(self, seq_id: str) -> np.ndarray:
+        """
+        Get the translated sequence as a zero-copy uint8 view.
+        
+        Args:
+            seq_id: Sequence ID
+            
+        Returns:
+            uint8 array of ASCII amino acids
+        """
+        return self._amino_acid_row(self._rows[seq_id])
+    
+    def orf_view(self, seq_id: str) -> np.ndarray:
+        """
+        Get the ORF region of the nucleotide sequence in coding orientation.
+        
+        Plus-strand ORFs are zero-copy views; minus-strand ORFs are
+        reverse-complemented into a new array. With an indexed FASTA file
+        only the ORF bytes are read from the file.
+        
+        Args:
+            seq_id: Sequence ID
+            
+        Returns:
+            uint8 array of ASCII bases from orf_start to orf_end, read 5' to 3'
+            on the ORF's strand
+        """
+        row = self._rows[seq_id]
+        orf_start, orf_end = self._orfs[row]
+        if self._fasta is not None:
+            orf = np.frombuffer(self._fasta.fetch(seq_id, orf_start, orf_end), dtype=np.uint8)
+        else:
+            orf = self._nucleotide_row(row)[orf_start:orf_end]
+        return reverse_complement(orf) if self._strands[row] < 0 else orf
+    
+    def close(self):
+        """
+        Close the indexed FASTA file the nucleotide sequences are read from.
+        
+        Subsets share the file, so closing any of them closes it for all;
+        a later read maps it again.
+        """
+        if self._fasta is not None:
+            self._fasta.close()
+    
+    def __enter__(self) -> 'SequenceStore':
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    def subset(self, seq_ids: List[str]) -> 'SequenceStore':
+        """
+        Select and reorder sequences without copying their buffers.
+        
+        Args:
+            seq_ids: Sequence IDs to keep, in the new iteration order
+            
+        Returns:
+            SequenceStore sharing this store's buffers
+        """
+        rows = {seq_id: self._rows[seq_id] for seq_id in seq_ids}
+        return SequenceStore(seq_ids, self._nucleotides, self._nt_offsets,
+                             self._amino_acids, self._aa_offsets, self._orfs,
+                             self._ambiguous, self._strands, rows, self._fasta)
+
+def select_sequences(sequences: Dict[str, dict], seq_ids: List[str]) -> Dict[str, dict]:
+    """
+    Select sequences in a new order, keeping a SequenceStore zero-copy.
+    
+    Args:
+        sequences: SequenceStore or dictionary of processed sequences
+        seq_ids: Sequence IDs in the new order
+        
+    Returns:
+        Sequences restricted to seq_ids, in that order
+    """
+    if isinstance(sequences, SequenceStore):
+        return sequences.subset(seq_ids)
+    return {seq_id: sequences[seq_id] for seq_id in seq_ids}
+
+def amino_acid_bytes(sequences: Dict[str, dict], seq_id: str) -> np.ndarray:
+    """
+    Get a translated sequence as uint8 ASCII codes.
+    
+    Zero-copy for a SequenceStore; plain dictionaries are encoded.
+    
+    Args:
+        sequences: SequenceStore or dictionary of processed sequences
+        seq_id: Sequence ID
+        
+    Returns:
+        uint8 array of ASCII amino acids
+    """
+    if isinstance(sequences, SequenceStore):
+        return sequences.amino_acid_view(seq_id)
+    return np.frombuffer(sequences[seq_id]['amino_acid'].encode('ascii', 'replace'),
+                         dtype=np.uint8)
+
+def orf_bytes(sequences: Dict[str, dict], seq_id: str) -> np.ndarray:
+    """
+    Get the ORF region of a nucleotide sequence as uint8 ASCII codes.
+    
+    Minus-strand ORFs are reverse-complemented. Plus-strand ORFs are
+    zero-copy for a SequenceStore; plain dictionaries are sliced and encoded.
+    
+    Args:
+        sequences: SequenceStore or dictionary of processed sequences
+        seq_id: Sequence ID
+        
+    Returns:
+        uint8 array of ASCII bases from orf_start to orf_end
+    """
+    if isinstance(sequences, SequenceStore):
+        return sequences.orf_view(seq_id)
+    seq_data = sequences[seq_id]
+    orf_nt = seq_data['nucleotide'][seq_data['orf_start']:seq_data['orf_end']]
+    orf = np.frombuffer(orf_nt.encode('ascii', 'replace'), dtype=np.uint8)
+    return reverse_complement(orf) if seq_data.get('strand', 1) < 0 else orf
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+MinHash sketches, LSH candidate search and k-nearest-neighbour graphs.
+"""
+
+import logging
+from typing import List
+import numpy as np
+from scipy import sparse
+from scipy.sparse.csgraph import minimum_spanning_tree
+
+# Hash values kept per sequence
+SKETCH_SIZE = 64
+
+# Sketch entries per LSH band; two sequences become candidates when all
+# entries of any band agree
+LSH_BAND_ROWS = 4
+
+# Largest group of sequences paired exhaustively inside one LSH bucket;
+# bigger buckets only pair sequences this close in bucket order
+LSH_MAX_BUCKET = 64
+
+# Neighbours kept per sequence in the k-nearest-neighbour graph
+KNN_NEIGHBORS = 10
+
+# Candidate pairs whose sketches are compared at a time
+KNN_PAIR_BLOCK = 65_536
+
+# Sketch value of a sequence without k-mers
+EMPTY_HASH = np.iinfo(np.uint64).max
+
+def mix64(values: np.ndarray) -> np.ndarray:
+    """
+    Scramble 64-bit integers with the splitmix64 finalizer.
+    
+    Args:
+        values: uint64 array
+        
+    Returns:
+        uint64 array of hashes
+    """
+    values = values.astype(np.uint64, copy=True)
+    values ^= values >> np.uint64(30)
+    values *= np.uint64(0xBF58476D1CE4E5B9)
+    values ^= values >> np.uint64(27)
+    values *= np.uint64(0x94D049BB133111EB)
+    values ^= values >> np.uint64(31)
+    return values
+
+def minhash_sketches(rows: np.ndarray, codes: np.ndarray, n_rows: int,
+                     sketch_size: int = SKETCH_SIZE, seed: int = 0) -> np.ndarray:
+    """
+    Compute MinHash sketches of integer k-mer sets.
+    
+    Entry s of a sketch is the smallest value of hash function s over the
+    k-mers of a sequence, so the fraction of equal entries of two sketches
+    estimates the Jaccard similarity of their k-mer sets.
+    
+    Args:
+        rows: Sequence row of each k-mer, in non-decreasing order
+        codes: Integer k-mer codes
+        n_rows: Number of sequences
+        sketch_size: Hash functions per sketch
+        seed: Seed of the hash functions
+        
+    Returns:
+        n_rows x sketch_size uint64 array (EMPTY_HASH for sequences without k-mers)
+    """
+    sketches = np.full((n_rows, sketch_size), EMPTY_HASH, dtype=np.uint64)
+    if len(codes) == 0:
+        return sketches
+    
+    present, starts = np.unique(rows, return_index=True)
+    salts = mix64(np.arange(sketch_size, dtype=np.uint64) + np.uint64(seed * sketch_size + 1))
+    keys = codes.astype(np.uint64)
+    for column, salt in enumerate(salts):
+        sketches[present, column] = np.minimum.reduceat(mix64(keys ^ salt), starts)
+    
+    return sketches
+
+def _band_keys(sketches: np.ndarray, band_rows: int) -> np.ndarray:
+    """
+    Hash each band of every sketch into one bucket key.
+    
+    Args:
+        sketches: MinHash sketches
+        band_rows: Sketch entries per band
+        
+    Returns:
+        n_rows x n_bands uint64 array of bucket keys
+    """
+    n_bands = sketches.shape[1] // band_rows
+    keys = np.zeros((len(sketches), n_bands), dtype=np.uint64)
+    for offset in range(band_rows):
+        keys = mix64(keys ^ sketches[:, offset:n_bands * band_rows:band_rows])
+    return keys
+
+def lsh_candidate_pairs(sketches: np.ndarray, band_rows: int = LSH_BAND_ROWS,
+                        max_bucket: int = LSH_MAX_BUCKET) -> np.ndarray:
+    """
+    Find sequence pairs that share an LSH bucket in at least one band.
+    
+    Pairs are deduplicated band by band, so memory is bounded by the
+    distinct pairs plus the pairs of one band rather than of every band.
+    
+    Args:
+        sketches: MinHash sketches
+        band_rows: Sketch entries per band
+        max_bucket: Largest bucket paired exhaustively
+        
+    Returns:
+        P x 2 int64 array of distinct (i, j) pairs with i < j
+    """
+    n_rows = len(sketches)
+    nonempty = np.flatnonzero(sketches[:, 0] != EMPTY_HASH)
+    keys = _band_keys(sketches[nonempty], band_rows)
+    codes = np.zeros(0, dtype=np.int64)
+    
+    for band in range(keys.shape[1]):
+        order = np.argsort(keys[:, band], kind='stable')
+        sorted_keys = keys[order, band]
+        members = nonempty[order]
+        band_codes = []
+        
+        # Pair members of the same bucket up to max_bucket - 1 positions apart
+        for distance in range(1, max_bucket):
+            same = np.flatnonzero(sorted_keys[distance:] == sorted_keys[:-distance])
+            if same.size == 0:
+                break
+            first, second = members[same], members[same + distance]
+            band_codes.append(np.minimum(first, second) * n_rows + np.maximum(first, second))
+        if band_codes:
+            codes = np.union1d(codes, np.concatenate(band_codes))
+    
+    return np.stack([codes // n_rows, codes % n_rows], axis=1)
+
+def knn_graph(sketches: np.ndarray, n_neighbors: int = KNN_NEIGHBORS,
+              band_rows: int = LSH_BAND_ROWS) -> sparse.csr_matrix:
+    """
+    Build a sparse k-nearest-neighbour similarity graph from sketches.
+    
+    Only LSH candidate pairs are compared. Each sequence keeps its
+    n_neighbors most similar candidates, and an edge is kept if either end
+    keeps it, so the graph is symmetric with O(N * n_neighbors) entries.
+    
+    Args:
+        sketches: MinHash sketches
+        n_neighbors: Neighbours kept per sequence
+        band_rows: Sketch entries per LSH band
+        
+    Returns:
+        Symmetric N x N CSR matrix of estimated Jaccard similarities
+    """
+    n_rows = len(sketches)
+    pairs = lsh_candidate_pairs(sketches, band_rows)
+    similarities = np.empty(len(pairs))
+    for start in range(0, len(pairs), KNN_PAIR_BLOCK):
+        block = pairs[start:start + KNN_PAIR_BLOCK]
+        similarities[start:start + len(block)] = np.mean(
+            sketches[block[:, 0]] == sketches[block[:, 1]], axis=1
+        )
+    
+    keep = similarities > 0
+    sources = np.concatenate([pairs[keep, 0], pairs[keep, 1]])
+    targets = np.concatenate([pairs[keep, 1], pairs[keep, 0]])
+    weights = np.concatenate([similarities[keep], similarities[keep]])
+    
+    # Rank each sequence's candidates by decreasing similarity
+    order = np.lexsort((targets, -weights, sources))
+    sources, targets, weights = sources[order], targets[order], weights[order]
+    first = np.searchsorted(sources, sources)
+    nearest = np.arange(len(sources)) - first < n_neighbors
+    
+    graph = sparse.csr_matrix((weights[nearest], (sources[nearest], targets[nearest])),
+                              shape=(n_rows, n_rows))
+    graph = graph.maximum(graph.T).tocsr()
+    logging.debug(f"Built kNN graph with {graph.nnz // 2} edges from {len(pairs)} LSH candidates")
+    return graph
+
+def knn_order(graph: sparse.csr_matrix, labels: List[str]) -> List[str]:
+    """
+    Order sequences along a maximum spanning forest of a similarity graph.
+    
+    The forest is walked depth first, visiting the most similar neighbour
+    first, so each sequence follows one it is close to. Components are
+    started from their lowest index in input order.
+    
+    Args:
+        graph: Symmetric sparse similarity graph
+        labels: Sequence IDs in graph order
+        
+    Returns:
+        Sequence IDs in traversal order
+    """
+    n_rows = len(labels)
+    # Distances in [1, 2): csgraph treats zero weights as missing edges
+    distances = graph.copy()
+    distances.data = 2.0 - distances.data
+    forest = minimum_spanning_tree(distances)
+    forest = forest.maximum(forest.T).tocsr()
+    
+    visited = np.zeros(n_rows, dtype=bool)
+    order = []
+    for root in range(n_rows):
+        if visited[root]:
+            continue
+        visited[root] = True
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            order.append(node)
+            start, stop = forest.indptr[node], forest.indptr[node + 1]
+            neighbors, weights = forest.indices[start:stop], forest.data[start:stop]
+            # Push the most similar (smallest distance) neighbour last
+            for neighbor in neighbors[np.lexsort((-neighbors, -weights))]:
+                if not visited[neighbor]:
+                    visited[neighbor] = True
+                    stack.append(neighbor)
+    
+    return [labels[index] for index in order]
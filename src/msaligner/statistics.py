@@ -9,12 +9,19 @@ import pandas as pd
 import numpy as np
 from collections import Counter
 
-def calculate_codon_statistics(nt_alignment: Dict[str, str]) -> pd.DataFrame:
+from msaligner.alignment_matrix import AlignmentMatrix
+
+# Alignment cells whose nucleotides are counted at a time
+STATISTICS_BLOCK_CELLS = 1 << 22
+
+def calculate_codon_statistics_reference(nt_alignment: Dict[str, str]) -> pd.DataFrame:
     """
-    Calculate codon position statistics from nucleotide alignment.
+    Calculate codon position statistics one codon and sequence at a time.
+    
+    Kept as the reference for calculate_codon_statistics.
     
     Args:
-        nt_alignment: Aligned nucleotide sequences
+        nt_alignment: AlignmentMatrix or dictionary of aligned nucleotide sequences
         
     Returns:
         DataFrame with codon position statistics
@@ -88,12 +95,72 @@ def calculate_codon_statistics(nt_alignment: Dict[str, str]) -> pd.DataFrame:
     logging.info(f"Calculated statistics for {len(positions)} codon positions")
     return stats_df
 
+def calculate_codon_statistics(nt_alignment: Dict[str, str]) -> pd.DataFrame:
+    """
+    Calculate codon position statistics from nucleotide alignment.
+    
+    The alignment is viewed as an (N, codons, 3) array. Gap fractions come
+    from one reduction over the sequences, and the symbol counts of each
+    codon position from one bincount per block of positions. The number of
+    codon positions follows the first sequence, and a sequence too short to
+    hold a codon is left out of that position. The result is identical to
+    calculate_codon_statistics_reference.
+    
+    Args:
+        nt_alignment: AlignmentMatrix or dictionary of aligned nucleotide sequences
+        
+    Returns:
+        DataFrame with codon position statistics
+    """
+    if not nt_alignment:
+        return pd.DataFrame()
+    
+    alignment = AlignmentMatrix.from_dict(nt_alignment)
+    num_codons = int(alignment.lengths[0]) // 3
+    codons = alignment.codons()[:, :num_codons]
+    
+    # Codons each sequence is long enough to hold, and those with a gap
+    present = 3 * (np.arange(num_codons) + 1) <= alignment.lengths[:, None]
+    gapped = present & np.any(codons == ord('-'), axis=2)
+    total_sequences = present.sum(axis=0)
+    gap_counts = gapped.sum(axis=0)
+    
+    # Symbol counts per codon position over the ungapped codons
+    most_common_counts = np.zeros(num_codons, dtype=np.int64)
+    block = max(1, STATISTICS_BLOCK_CELLS // max(len(alignment), 1))
+    for start in range(0, num_codons, block):
+        stop = min(start + block, num_codons)
+        rows, columns = np.nonzero(present[:, start:stop] & ~gapped[:, start:stop])
+        symbols = codons[rows, columns + start].astype(np.int64) + 256 * columns[:, None]
+        counts = np.bincount(symbols.ravel(), minlength=256 * (stop - start))
+        most_common_counts[start:stop] = counts.reshape(stop - start, 256).max(axis=1)
+    
+    n_nucleotides = 3 * (total_sequences - gap_counts)
+    covered = total_sequences > 0
+    gap_fractions = gap_counts[covered] / total_sequences[covered]
+    variability_scores = np.zeros(num_codons)
+    counted = n_nucleotides > 0
+    variability_scores[counted] = 1 - most_common_counts[counted] / n_nucleotides[counted]
+    variability_scores = variability_scores[covered]
+    conserved = (variability_scores < 0.1) & (gap_fractions < 0.5)
+    
+    # Built from lists so dtypes match the per-codon implementation
+    stats_df = pd.DataFrame({
+        'codon_position': (np.flatnonzero(covered) + 1).tolist(),
+        'variability_score': variability_scores.tolist(),
+        'gap_fraction': gap_fractions.tolist(),
+        'is_conserved': conserved.tolist()
+    })
+    
+    logging.info(f"Calculated statistics for {len(stats_df)} codon positions")
+    return stats_df
+
 def generate_statistics(nt_alignment: Dict[str, str]) -> pd.DataFrame:
     """
     Main function to generate codon position statistics.
     
     Args:
-        nt_alignment: Nucleotide alignment dictionary
+        nt_alignment: AlignmentMatrix or dictionary of aligned nucleotide sequences
         
     Returns:
         DataFrame with comprehensive statistics
@@ -4,9 +4,17 @@ Unit tests for alignment module.
 """
 
 import pytest
+import random
+import numpy as np
 from msaligner.alignment import (
-    needleman_wunsch, progressive_alignment, get_blosum_score
+    needleman_wunsch, needleman_wunsch_reference, needleman_wunsch_score,
+    needleman_wunsch_batch, progressive_alignment, sequence_profile,
+    align_profiles, align_batch_to_profile, merge_batch,
+    balance_batches, parallel_pairwise_alignments, wavefront_align,
+    alignment_score, select_backend, pair_backend, pair_backends,
+    get_blosum_score, encode_protein, find_band, BLOSUM62_ARRAY, PROGRESSIVE_ENGINES
 )
+from msaligner.alignment_matrix import AlignmentMatrix
 
 def test_get_blosum_score():
     """Test BLOSUM score retrieval."""
@@ -31,9 +39,304 @@ def test_needleman_wunsch_gaps():
     assert len(aligned1) == len(aligned2)
     assert "-" in aligned1 or "-" in aligned2
 
+def test_blosum62_array_matches_scores():
+    """Test dense BLOSUM62 array against the dictionary lookup."""
+    residues = "ARNDCQEGHILKMFPSTWYVX*"
+    codes = encode_protein(residues)
+    for aa1, code1 in zip(residues, codes):
+        for aa2, code2 in zip(residues, codes):
+            assert BLOSUM62_ARRAY[code1, code2] == get_blosum_score(aa1, aa2)
+
+def test_needleman_wunsch_backends_agree():
+    """Test NumPy backend reproduces the reference backend exactly."""
+    rng = random.Random(0)
+    for _ in range(50):
+        seq1 = "".join(rng.choice("MAGSTX*") for _ in range(rng.randint(0, 25)))
+        seq2 = "".join(rng.choice("MAGSTX*") for _ in range(rng.randint(0, 25)))
+        assert needleman_wunsch(seq1, seq2) == needleman_wunsch_reference(seq1, seq2)
+        assert (needleman_wunsch(seq1, seq2, backend="reference") ==
+                needleman_wunsch_reference(seq1, seq2))
+
+def test_needleman_wunsch_hirschberg_optimal():
+    """Test linear-memory alignment reaches the optimal score."""
+    rng = random.Random(1)
+    for _ in range(20):
+        seq1 = "".join(rng.choice("MAGSTWX") for _ in range(rng.randint(0, 300)))
+        seq2 = "".join(rng.choice("MAGSTWX") for _ in range(rng.randint(0, 300)))
+        aligned1, aligned2, score = needleman_wunsch(seq1, seq2, backend="hirschberg")
+        assert aligned1.replace("-", "") == seq1
+        assert aligned2.replace("-", "") == seq2
+        assert score == needleman_wunsch(seq1, seq2)[2]
+        assert score == sum(
+            -8 if "-" in (a, b) else get_blosum_score(a, b)
+            for a, b in zip(aligned1, aligned2)
+        )
+
+def test_find_band_covers_corners():
+    """Test seeded band contains the start and end diagonals."""
+    low, high = find_band("MAGWKLTSPEVR", "MAGKLTSPEVRRQ")
+    assert low <= 0 <= high
+    assert low <= 13 - 12 <= high
+
+def test_needleman_wunsch_banded_homologs():
+    """Test banded alignment of close homologs matches the full DP score."""
+    rng = random.Random(2)
+    for _ in range(20):
+        seq1 = "".join(rng.choice("ARNDCQEGHILKMFPSTWYV") for _ in range(200))
+        seq2 = "".join(
+            residue for residue in seq1 if rng.random() > 0.05
+        ).replace("K", "R")
+        aligned1, aligned2, score = needleman_wunsch(seq1, seq2, backend="banded")
+        assert aligned1.replace("-", "") == seq1
+        assert aligned2.replace("-", "") == seq2
+        assert score == needleman_wunsch(seq1, seq2)[2]
+
+def test_progressive_alignment_cell_budget():
+    """Test progressive alignment over the cell budget still aligns."""
+    sequences = {"seq1": {"amino_acid": "MAGWKLT"}, "seq2": {"amino_acid": "MAGKLT"}}
+    for engine in ("profile", "pairwise"):
+        aligned = progressive_alignment(sequences, ["seq1", "seq2"], max_cells=1,
+                                        engine=engine)
+        assert aligned == progressive_alignment(sequences, ["seq1", "seq2"],
+                                                engine=engine)
+
+def test_needleman_wunsch_score_matches_alignment():
+    """Test score-only alignment returns the full alignment score."""
+    rng = random.Random(3)
+    for _ in range(20):
+        seq1 = "".join(rng.choice("MAGSTWX") for _ in range(rng.randint(0, 40)))
+        seq2 = "".join(rng.choice("MAGSTWX") for _ in range(rng.randint(0, 40)))
+        assert needleman_wunsch_score(seq1, seq2) == needleman_wunsch(seq1, seq2)[2]
+
+def test_needleman_wunsch_unknown_backend():
+    """Test unknown backend names are rejected."""
+    with pytest.raises(ValueError):
+        needleman_wunsch("MAG", "MAG", backend="missing")
+
+def _gotoh_penalty(seq1, seq2, mismatch, gap_open, gap_extend):
+    """Minimum gap-affine penalty by full dynamic programming."""
+    inf = float("inf")
+    m, n = len(seq1), len(seq2)
+    match = [[inf] * (n + 1) for _ in range(m + 1)]
+    insert = [[inf] * (n + 1) for _ in range(m + 1)]
+    delete = [[inf] * (n + 1) for _ in range(m + 1)]
+    match[0][0] = 0
+    for i in range(m + 1):
+        for j in range(n + 1):
+            if j > 0:
+                insert[i][j] = min(match[i][j - 1] + gap_open + gap_extend,
+                                   insert[i][j - 1] + gap_extend)
+            if i > 0:
+                delete[i][j] = min(match[i - 1][j] + gap_open + gap_extend,
+                                   delete[i - 1][j] + gap_extend)
+            if i > 0 or j > 0:
+                best = min(insert[i][j], delete[i][j])
+                if i > 0 and j > 0:
+                    cost = 0 if seq1[i - 1] == seq2[j - 1] else mismatch
+                    best = min(best, match[i - 1][j - 1] + cost)
+                match[i][j] = best
+    return match[m][n]
+
+def test_wavefront_align_optimal():
+    """Test WFA finds the minimum penalty for gap-linear and gap-affine costs."""
+    rng = random.Random(3)
+    for _ in range(50):
+        seq1 = "".join(rng.choice("ACDE") for _ in range(rng.randint(0, 20)))
+        seq2 = "".join(rng.choice("ACDE") for _ in range(rng.randint(0, 20)))
+        for gap_open in (0, 6):
+            aligned1, aligned2, penalty = wavefront_align(seq1, seq2, 4, gap_open, 2)
+            assert aligned1.replace("-", "") == seq1
+            assert aligned2.replace("-", "") == seq2
+            assert penalty == _gotoh_penalty(seq1, seq2, 4, gap_open, 2)
+
+def test_wfa_backend_scores_alignment():
+    """Test the WFA backend reports the BLOSUM62 score of its alignment."""
+    seq1, seq2 = "MAGWKLTSPEVRQ", "MAGWKLSPEVRQ"
+    aligned1, aligned2, score = needleman_wunsch(seq1, seq2, backend="wfa")
+    assert score == alignment_score(aligned1, aligned2)
+    assert score == needleman_wunsch(seq1, seq2)[2]
+
+def test_select_backend():
+    """Test the auto backend only uses WFA for near-identical pairs."""
+    seq = "MAGWKLTSPEVRQNDCHIKLMFPSTWYV"
+    assert select_backend(seq, seq) == "wfa"
+    assert select_backend(seq, seq[::-1]) == "numpy"
+    
+    # The cutoff follows the divergence, not a fixed 6-mer cosine
+    rng = random.Random(8)
+    base = "".join(rng.choice("ACDEFGHIKLMNPQRSTVWY") for _ in range(200))
+    def mutate(fraction):
+        residues = list(base)
+        for position in rng.sample(range(len(base)), int(fraction * len(base))):
+            residues[position] = "W" if residues[position] != "W" else "A"
+        return "".join(residues)
+    assert select_backend(base, mutate(0.02)) == "wfa"
+    assert select_backend(base, mutate(0.2)) == "numpy"
+
 def test_progressive_alignment_single():
     """Test progressive alignment with single sequence."""
     sequences = {"seq1": {"amino_acid": "MAG"}}
     sorted_ids = ["seq1"]
     aligned = progressive_alignment(sequences, sorted_ids)
-    assert aligned["seq1"] == "MAG"
\ No newline at end of file
+    assert aligned["seq1"] == "MAG"
+
+def test_progressive_alignment_returns_matrix():
+    """Test both engines hand back an AlignmentMatrix of equal-width rows."""
+    sequences = {"seq1": {"amino_acid": "MAGWKL"}, "seq2": {"amino_acid": "MAWKL"},
+                 "seq3": {"amino_acid": "MAGWL"}}
+    for engine in PROGRESSIVE_ENGINES:
+        aligned = progressive_alignment(sequences, list(sequences), engine=engine)
+        assert isinstance(aligned, AlignmentMatrix)
+        assert aligned.matrix.shape == (3, len(aligned["seq1"]))
+        for seq_id in sequences:
+            assert aligned[seq_id].replace("-", "") == sequences[seq_id]["amino_acid"]
+
+def test_profile_merge_counts():
+    """Test merged profiles keep residue and gap counts per column."""
+    profile1, query = sequence_profile("MAG"), np.frombuffer(b"MG", dtype=np.uint8)
+    path = align_profiles(profile1, 1, sequence_profile(query), 1)
+    merged, columns1, (columns2,) = merge_batch(profile1, 1, [query], [path])
+    assert merged.shape[0] == 3
+    assert (merged.sum(axis=1) == 2).all()
+    assert list(columns1) == [0, 1, 2]
+    assert list(columns2) == [0, 2]
+
+def test_needleman_wunsch_batch_matches_single():
+    """Test batched alignment gives the same result as one query at a time."""
+    rng = random.Random(5)
+    seq1 = "".join(rng.choice("ACDEFGHIKLMNPQRSTVWY") for _ in range(40))
+    queries = ["".join(rng.choice("ACDEFGHIKLMNPQRSTVWY") for _ in range(rng.randint(1, 50)))
+               for _ in range(6)]
+    results = needleman_wunsch_batch(seq1, queries)
+    assert results == [needleman_wunsch(seq1, query) for query in queries]
+
+def test_merge_batch_single_query_follows_path():
+    """Test merging a single query places both sequences along its path."""
+    profile = sequence_profile("MAGWKLTSPE")
+    query = np.frombuffer(b"MAGKLTWWSPE", dtype=np.uint8)
+    paths = align_batch_to_profile(profile, 1, [query])
+    merged, columns, query_columns = merge_batch(profile, 1, [query], paths)
+    expected = np.zeros((len(paths[0]), profile.shape[1]))
+    expected[np.flatnonzero(paths[0] != 2)] += profile
+    expected[np.flatnonzero(paths[0] != 1)] += sequence_profile(query)
+    expected[paths[0] == 2, -1] += 1
+    expected[paths[0] == 1, -1] += 1
+    assert np.array_equal(merged, expected)
+    assert np.array_equal(columns, np.flatnonzero(paths[0] != 2))
+    assert np.array_equal(query_columns[0], np.flatnonzero(paths[0] != 1))
+
+def test_progressive_alignment_profile():
+    """Test profile progressive alignment keeps rows consistent."""
+    sequences = {
+        "seq1": {"amino_acid": "MAGWKLTSPE"},
+        "seq2": {"amino_acid": "MAGKLTSPE"},
+        "seq3": {"amino_acid": "MAGWKLTSPEVR"},
+        "seq4": {"amino_acid": "MGWKLSPE"},
+    }
+    aligned = progressive_alignment(sequences, list(sequences))
+    assert len({len(row) for row in aligned.values()}) == 1
+    for seq_id, row in aligned.items():
+        assert row.replace("-", "") == sequences[seq_id]["amino_acid"]
+
+def test_progressive_alignment_profile_batched():
+    """Test batched profile alignment keeps every row consistent."""
+    rng = random.Random(11)
+    base = "".join(rng.choice("ACDEFGHIKLMNPQRSTVWY") for _ in range(30))
+    sequences = {}
+    for index in range(7):
+        seq = list(base)
+        for _ in range(4):
+            position = rng.randrange(len(seq))
+            if rng.random() < 0.5:
+                del seq[position]
+            else:
+                seq.insert(position, rng.choice("ACDEFGHIKLMNPQRSTVWY"))
+        sequences[f"seq{index}"] = {"amino_acid": "".join(seq)}
+    aligned = progressive_alignment(sequences, list(sequences), batch_size=3)
+    assert len({len(row) for row in aligned.values()}) == 1
+    for seq_id, row in aligned.items():
+        assert row.replace("-", "") == sequences[seq_id]["amino_acid"]
+    # No column is gaps only
+    assert all(any(row[column] != "-" for row in aligned.values())
+               for column in range(len(aligned["seq0"])))
+
+def test_progressive_alignment_profile_threads(caplog):
+    """Test batches split across workers give the serial alignment."""
+    import logging
+    rng = random.Random(12)
+    sequences = {f"seq{index}": {"amino_acid": "".join(rng.choice("ACDEFGHIKLMNPQRSTVWY")
+                                                       for _ in range(rng.randint(5, 40)))}
+                 for index in range(11)}
+    serial = progressive_alignment(sequences, list(sequences), batch_size=4)
+    parallel = progressive_alignment(sequences, list(sequences), batch_size=4, threads=3)
+    assert parallel.to_dict() == serial.to_dict()
+    
+    with caplog.at_level(logging.WARNING):
+        unbatched = progressive_alignment(sequences, list(sequences), threads=3)
+    assert "aligning serially" in caplog.text
+    assert unbatched.to_dict() == progressive_alignment(sequences, list(sequences)).to_dict()
+
+def test_progressive_alignment_profile_pair_matches_pairwise():
+    """Test a two-sequence profile alignment equals the pairwise alignment."""
+    sequences = {"seq1": {"amino_acid": "MAGWKLTSPE"}, "seq2": {"amino_acid": "MAGKLTWSPE"}}
+    aligned = progressive_alignment(sequences, ["seq1", "seq2"])
+    assert (aligned["seq1"], aligned["seq2"]) == needleman_wunsch(
+        "MAGWKLTSPE", "MAGKLTWSPE"
+    )[:2]
+
+def test_balance_batches():
+    """Test cost-balanced batching covers every task once."""
+    batches = balance_batches([100, 1, 1, 50, 50, 1], 2)
+    assert sorted(i for batch in batches for i in batch) == list(range(6))
+    loads = sorted(sum([100, 1, 1, 50, 50, 1][i] for i in batch) for batch in batches)
+    assert loads == [101, 102]
+
+def test_parallel_pairwise_alignments_deterministic():
+    """Test process-pool alignment returns the serial results in order."""
+    rng = random.Random(4)
+    pairs = [
+        ("".join(rng.choice("MAGSTWKL") for _ in range(rng.randint(1, 60))),
+         "".join(rng.choice("MAGSTWKL") for _ in range(rng.randint(1, 60))))
+        for _ in range(12)
+    ]
+    serial = parallel_pairwise_alignments(pairs)
+    assert serial == [needleman_wunsch(seq1, seq2) for seq1, seq2 in pairs]
+    assert parallel_pairwise_alignments(pairs, threads=2) == serial
+    assert parallel_pairwise_alignments(pairs, threads=2, score_only=True) == [
+        result[2] for result in serial
+    ]
+    assert parallel_pairwise_alignments(pairs, threads=2, batch_size=5) == serial
+
+def test_pairwise_engine_batch_size(monkeypatch):
+    """Test the pairwise engine sizes its worker tasks by batch_size."""
+    from msaligner import alignment
+    sizes = []
+    
+    def recording_balance(costs, n_batches):
+        sizes.append((len(costs), n_batches))
+        return balance_batches(costs, n_batches)
+    
+    monkeypatch.setattr(alignment, "balance_batches", recording_balance)
+    rng = random.Random(6)
+    sequences = {f"seq{index}": {"amino_acid": "".join(rng.choice("MAGSTWKL") for _ in range(20))}
+                 for index in range(8)}
+    batched = progressive_alignment(sequences, list(sequences), engine="pairwise",
+                                    threads=2, batch_size=3)
+    assert sizes == [(7, 3)]
+    assert batched.to_dict() == progressive_alignment(sequences, list(sequences),
+                                                      engine="pairwise").to_dict()
+
+def test_parallel_pairwise_alignments_auto_backend():
+    """Test 'auto' pairs resolved up front match per-pair selection and serial results."""
+    rng = random.Random(5)
+    base = "".join(rng.choice("ACDEFGHIKLMNPQRSTVWY") for _ in range(80))
+    pairs = [(base, base[:40] + "W" + base[41:]), (base, base[::-1]), ("MAGW" * 10, base)]
+    assert [pair_backend(seq1, seq2, 'auto') for seq1, seq2 in pairs] == [
+        select_backend(seq1, seq2) for seq1, seq2 in pairs
+    ]
+    assert pair_backends(pairs, 'auto') == [select_backend(seq1, seq2) for seq1, seq2 in pairs]
+    assert pair_backend(base, base, 'numpy', max_cells=100) == 'hirschberg'
+    serial = parallel_pairwise_alignments(pairs, backend='auto')
+    assert serial == [needleman_wunsch(seq1, seq2, backend=pair_backend(seq1, seq2, 'auto'))
+                      for seq1, seq2 in pairs]
+    assert parallel_pairwise_alignments(pairs, backend='auto', threads=2) == serial
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Unit tests for alignment matrix module.
+"""
+
+import pytest
+import numpy as np
+from msaligner.alignment_matrix import AlignmentMatrix
+
+ALIGNMENT = {"seq1": "ATG---GCT", "seq2": "ATGAAAGCC", "seq3": "ATGAAA"}
+
+def test_matrix_behaves_like_dict():
+    """Test the matrix round-trips dictionaries, including ragged rows."""
+    matrix = AlignmentMatrix.from_dict(ALIGNMENT)
+    assert matrix == ALIGNMENT
+    assert matrix.to_dict() == ALIGNMENT
+    assert list(matrix) == ["seq1", "seq2", "seq3"]
+    assert matrix.matrix.shape == (3, 9)
+    assert matrix.gap_mask.sum() == 3 + 3
+    assert AlignmentMatrix.from_dict(matrix) is matrix
+
+def test_views_are_zero_copy():
+    """Test row, column and codon views share the matrix buffer."""
+    matrix = AlignmentMatrix.from_dict(ALIGNMENT)
+    assert matrix.row("seq3").tobytes() == b"ATGAAA"
+    assert matrix.column(6).tobytes() == b"GG-"
+    codons = matrix.codons()
+    assert codons.shape == (3, 3, 3)
+    assert codons[1, 2].tobytes() == b"GCC"
+    for view in (matrix.row("seq1"), matrix.column(0), codons):
+        assert np.shares_memory(view, matrix.matrix)
+
+def test_codon_slice():
+    """Test slicing by codon keeps rows aligned and trims ragged rows."""
+    sliced = AlignmentMatrix.from_dict(ALIGNMENT).codon_slice(1, 3)
+    assert sliced == {"seq1": "---GCT", "seq2": "AAAGCC", "seq3": "AAA"}
+
+def test_fasta_round_trip(tmp_path):
+    """Test writing and reading FASTA preserves the alignment."""
+    path = str(tmp_path / "aligned.fasta")
+    AlignmentMatrix.from_dict(ALIGNMENT).write_fasta(path)
+    with open(path) as handle:
+        assert handle.read() == "".join(f">{k}\n{v}\n" for k, v in ALIGNMENT.items())
+    assert AlignmentMatrix.read_fasta(path) == ALIGNMENT
@@ -4,8 +4,11 @@ Unit tests for back-translation module.
 """
 
 import pytest
+import numpy as np
+from msaligner.alignment_matrix import AlignmentMatrix
 from msaligner.back_translation import (
-    create_codon_alignment, back_translate_single_sequence, validate_codon_alignment
+    create_codon_alignment, back_translate_single_sequence, validate_codon_alignment,
+    back_translate_alignment
 )
 
 def test_back_translate_single_sequence():
@@ -37,4 +40,29 @@ def test_create_codon_alignment():
     codon_alignment = create_codon_alignment(aa_alignment, sequences_data)
     assert "seq1" in codon_alignment
     assert "seq2" in codon_alignment
-    assert len(codon_alignment["seq1"]) == len(codon_alignment["seq2"])
\ No newline at end of file
+    assert len(codon_alignment["seq1"]) == len(codon_alignment["seq2"])
+
+def test_create_codon_alignment_minus_strand():
+    """Test minus-strand ORFs are back-translated from the reverse complement."""
+    aa_alignment = {"rev": "M-G*"}
+    sequences_data = {
+        "rev": {
+            "nucleotide": "GGTTAGCCCATCC",
+            "orf_start": 2,
+            "orf_end": 11,
+            "has_ambiguous": False,
+            "strand": -1
+        }
+    }
+    codon_alignment = create_codon_alignment(aa_alignment, sequences_data)
+    assert codon_alignment["rev"] == "ATG---GGCTAA"
+
+def test_back_translate_alignment_matches_single():
+    """Test batched back-translation reproduces the per-sequence function, including NNN cases."""
+    aligned = ["MA-X*G", "-MAG--", "MAGGGG", "M-"]
+    orfs = ["ATGGCTNNNTAAGGT", "ATGGCTGGT", "ATGGCT", "ATGCC"]
+    expected = [back_translate_single_sequence(aa, orf) for aa, orf in zip(aligned, orfs)]
+    aa_matrix = AlignmentMatrix.from_dict(dict(zip("abcd", aligned)))
+    result = back_translate_alignment(aa_matrix, [np.frombuffer(orf.encode(), dtype=np.uint8) for orf in orfs])
+    assert list(result.values()) == expected
+    assert result["c"] == "ATGGCTNNNNNNNNNNNN"
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Unit tests for FASTA reader module.
+"""
+
+import pytest
+import gzip
+import os
+from Bio import SeqIO
+
+from msaligner.fasta_reader import (
+    iter_fasta, is_gzipped, build_fasta_index, load_fasta_index, IndexedFasta, FAIDX_SUFFIX
+)
+
+FASTA_TEXT = (
+    ">seq1 first sequence\nATGgcc\nTAA\n"
+    ">seq2\r\nAT GC\r\n\n"
+    ">seq3\n"
+    ">seq4\nNNNN"
+)
+
+def test_iter_fasta_matches_biopython(tmp_path):
+    """Test every reading strategy yields the records Bio.SeqIO parses."""
+    path = tmp_path / "input.fasta"
+    path.write_text(FASTA_TEXT)
+    expected = [(record.id, str(record.seq).upper()) for record in SeqIO.parse(str(path), "fasta")]
+    for block_size in (1, 4, 1 << 20):
+        for use_mmap in (True, False):
+            records = [(seq_id, sequence.decode()) for seq_id, sequence
+                       in iter_fasta(str(path), block_size, use_mmap)]
+            assert records == expected
+
+def test_iter_fasta_reads_gzip(tmp_path):
+    """Test compressed input is detected by its magic bytes, not its name."""
+    path = tmp_path / "input.fasta"
+    with gzip.open(path, "wt") as handle:
+        handle.write(FASTA_TEXT)
+    assert is_gzipped(str(path))
+    assert [seq_id for seq_id, _ in iter_fasta(str(path), 3)] == ["seq1", "seq2", "seq3", "seq4"]
+    assert next(iter_fasta(str(path)))[1] == b"ATGGCCTAA"
+
+def test_iter_fasta_empty_file_and_leading_text(tmp_path):
+    """Test an empty file yields no records and text before a header is skipped."""
+    path = tmp_path / "empty.fasta"
+    path.write_bytes(b"")
+    assert list(iter_fasta(str(path))) == []
+    path.write_bytes(b"notes\n>x\nAC\n")
+    assert list(iter_fasta(str(path), 2, False)) == [("x", b"AC")]
+
+INDEXED_TEXT = ">a first\nACGTA\nccgta\nAC\n>b\r\nTTTT\r\nGG\r\n\n>c\n"
+
+def test_indexed_fasta_fetch_matches_stream(tmp_path):
+    """Test faidx random access returns the same bases as the stream reader."""
+    path = tmp_path / "input.fasta"
+    path.write_bytes(INDEXED_TEXT.encode())
+    index = build_fasta_index(str(path))
+    assert tuple(index["a"]) == (12, 9, 5, 6)
+    assert tuple(index["b"]) == (6, 28, 4, 6)
+    fasta = IndexedFasta(str(path), index)
+    for seq_id, sequence in iter_fasta(str(path)):
+        assert fasta.fetch(seq_id) == sequence
+        for start in range(len(sequence)):
+            assert fasta.fetch(seq_id, start, start + 7) == sequence[start:start + 7]
+    fasta.close()
+
+def test_load_fasta_index_saves_and_reuses(tmp_path):
+    """Test the index is written next to the input in faidx format and read back."""
+    path = tmp_path / "input.fasta"
+    path.write_bytes(INDEXED_TEXT.encode())
+    index = load_fasta_index(str(path))
+    lines = (tmp_path / ("input.fasta" + FAIDX_SUFFIX)).read_text().splitlines()
+    assert lines[0] == "a\t12\t9\t5\t6"
+    assert load_fasta_index(str(path)) == index
+
+def test_build_fasta_index_rejects_ragged_lines(tmp_path):
+    """Test records with uneven line lengths cannot be indexed."""
+    path = tmp_path / "ragged.fasta"
+    path.write_text(">x\nACG\nACGT\nA\n")
+    with pytest.raises(ValueError):
+        build_fasta_index(str(path))
+
+def test_build_fasta_index_is_independent_of_block_size(tmp_path):
+    """Test lines and records straddling scan blocks are indexed the same."""
+    path = tmp_path / "input.fasta"
+    path.write_bytes(b"notes\n" + INDEXED_TEXT.encode() + b">d\nAC\nA")
+    expected = build_fasta_index(str(path))
+    assert tuple(expected["d"]) == (3, 51, 2, 3)
+    for block_size in range(1, 12):
+        assert build_fasta_index(str(path), block_size) == expected
+    path.write_text(">x\nACG\nACGT\nA\n")
+    for block_size in range(1, 12):
+        with pytest.raises(ValueError):
+            build_fasta_index(str(path), block_size)
+
+def test_build_fasta_index_memory_is_bounded(tmp_path):
+    """Test indexing holds one scan block, not per-line arrays of the file."""
+    import tracemalloc
+    path = tmp_path / "large.fasta"
+    line = b"ACGT" * 15 + b"\n"
+    with open(path, "wb") as handle:
+        for record in range(20):
+            handle.write(b">r%d\n" % record + line * 20000)
+    tracemalloc.start()
+    index = build_fasta_index(str(path), 1 << 16)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    assert tuple(index["r19"])[0] == 20000 * 60
+    assert peak < path.stat().st_size // 10
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Unit tests for guide tree module.
+"""
+
+import pytest
+import numpy as np
+from msaligner.guide_tree import (
+    upgma, neighbor_joining, leaf_order, to_newick, from_newick, build_guide_tree
+)
+
+SIMILARITY = np.array([
+    [1.0, 0.9, 0.2, 0.1],
+    [0.9, 1.0, 0.3, 0.2],
+    [0.2, 0.3, 1.0, 0.8],
+    [0.1, 0.2, 0.8, 1.0],
+])
+LABELS = ["a", "b", "c", "d"]
+
+def test_upgma_groups_closest_pairs():
+    """Test UPGMA merges the most similar sequences first."""
+    tree = upgma(SIMILARITY, LABELS)
+    assert sorted(tree.children[0]) == [0, 1]
+    assert tree.lengths[0] == pytest.approx([0.05, 0.05])
+    order = leaf_order(tree)
+    assert abs(order.index("a") - order.index("b")) == 1
+    assert abs(order.index("c") - order.index("d")) == 1
+
+def test_neighbor_joining_leaf_order():
+    """Test neighbor-joining keeps sister sequences adjacent."""
+    tree, order = build_guide_tree(SIMILARITY, LABELS, "nj")
+    assert sorted(order) == LABELS
+    assert abs(order.index("a") - order.index("b")) == 1
+    assert (tree.lengths >= 0).all()
+
+def test_newick_round_trip():
+    """Test Newick export and import preserve the tree."""
+    tree = upgma(SIMILARITY, ["a", "b c", "d'e", "f"])
+    newick = to_newick(tree)
+    assert newick.endswith(";")
+    parsed = from_newick(newick)
+    assert leaf_order(parsed) == leaf_order(tree)
+    assert to_newick(parsed) == newick
+
+def test_from_newick_polytomy():
+    """Test multifurcating nodes are resolved into binary merges."""
+    tree = from_newick("((a,b,c):1.5,d:2);")
+    assert tree.labels == ["a", "b", "c", "d"]
+    assert len(tree.children) == 3
+    assert leaf_order(tree) == ["a", "b", "c", "d"]
+
+def _similarity_memmap(path, n_seqs):
+    """Write a random symmetric float32 similarity matrix to a memmap."""
+    rng = np.random.default_rng(0)
+    similarity = rng.random((n_seqs, n_seqs), dtype=np.float32)
+    similarity = (similarity + similarity.T) / 2
+    np.fill_diagonal(similarity, 1.0)
+    matrix = np.memmap(str(path), dtype=np.float32, mode='w+', shape=similarity.shape)
+    matrix[:] = similarity
+    matrix.flush()
+    return np.memmap(str(path), dtype=np.float32, mode='r', shape=similarity.shape), similarity
+
+@pytest.mark.parametrize("method", ["upgma", "nj"])
+def test_memmap_input_keeps_distances_on_disk(tmp_path, method):
+    """Test a memory-mapped matrix is not copied into RAM by the tree builders."""
+    import tracemalloc
+    n_seqs = 600
+    matrix, similarity = _similarity_memmap(tmp_path / "similarity.f32", n_seqs)
+    labels = [f"s{i}" for i in range(n_seqs)]
+    
+    tracemalloc.start()
+    tree, order = build_guide_tree(matrix, labels, method)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    
+    # A copy would take the whole matrix; only row-sized work arrays remain
+    assert peak < similarity.nbytes // 2
+    assert to_newick(tree) == to_newick(build_guide_tree(similarity, labels, method)[0])
+    assert not np.array_equal(matrix, np.zeros_like(similarity))
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["similarity.f32"]
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Unit tests for k-mer index module.
+"""
+
+import os
+import random
+import tempfile
+from msaligner.kmer_index import KmerIndex, index_order
+from msaligner.kmer_similarity import kmer_frequency, cosine_similarity, sort_sequences_by_similarity
+
+def _random_sequences(n_seqs, seed=0):
+    """Build dictionaries of short random sequences over a small alphabet."""
+    rng = random.Random(seed)
+    return {f"seq{i}": {"amino_acid": "".join(rng.choice("ACDEX*") for _ in range(rng.randint(0, 20)))}
+            for i in range(n_seqs)}
+
+def test_query_scores_match_cosine():
+    """Test index scores equal pairwise k-mer cosine similarity."""
+    sequences = _random_sequences(40)
+    index = KmerIndex.build(sequences, 3)
+    query = "ACDDEXACE"
+    results = index.query(query, top_k=len(sequences))
+    assert results
+    assert [score for _, score in results] == sorted((score for _, score in results), reverse=True)
+    for seq_id, score in results:
+        expected = cosine_similarity(kmer_frequency(query, 3),
+                                     kmer_frequency(sequences[seq_id]["amino_acid"], 3))
+        assert score == expected
+
+def test_add_matches_build():
+    """Test adding sequences incrementally gives the same index as building it at once."""
+    sequences = _random_sequences(30, seed=1)
+    items = list(sequences.items())
+    incremental = KmerIndex.build(dict(items[:10]), 3)
+    incremental.add(dict(items[10:]))
+    full = KmerIndex.build(sequences, 3)
+    assert incremental.ids == full.ids
+    assert incremental.query("ACEXDA", top_k=30) == full.query("ACEXDA", top_k=30)
+
+def test_add_sorts_only_new_postings(monkeypatch):
+    """Test an incremental add groups only the new k-mers and keeps postings consistent."""
+    from msaligner import kmer_index
+    sequences = _random_sequences(30, seed=6)
+    items = list(sequences.items())
+    index = KmerIndex.build(dict(items[:25]), 3)
+    grouped = []
+    postings = kmer_index._postings
+    
+    def recording_postings(rows, codes):
+        grouped.append(len(codes))
+        return postings(rows, codes)
+    
+    monkeypatch.setattr(kmer_index, "_postings", recording_postings)
+    index.add(dict(items[25:]))
+    assert grouped == [sum(max(len(data["amino_acid"]) - 2, 0) for _, data in items[25:])]
+    full = KmerIndex.build(sequences, 3)
+    assert list(index._codes) == list(full._codes)
+    assert list(index._offsets) == list(full._offsets)
+    assert index.query("ACEXDA", top_k=30) == full.query("ACEXDA", top_k=30)
+
+def test_neighbors_exclude_self():
+    """Test neighbour queries skip the sequence itself."""
+    sequences = {
+        "seq1": {"amino_acid": "MAGWKLTSPE"},
+        "seq2": {"amino_acid": "MAGWKLTSPQ"},
+        "seq3": {"amino_acid": "GGGGGGGGGG"},
+    }
+    index = KmerIndex.build(sequences, 3)
+    neighbors = index.neighbors(sequences, "seq1")
+    assert [seq_id for seq_id, _ in neighbors] == ["seq2"]
+
+def test_save_and_load():
+    """Test an index round-trips through a file."""
+    sequences = _random_sequences(20, seed=2)
+    index = KmerIndex.build(sequences, 2)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "index.npz")
+        index.save(path)
+        loaded = KmerIndex.load(path)
+    assert loaded.k == 2
+    assert loaded.ids == index.ids
+    assert loaded.query("ACDX", top_k=20) == index.query("ACDX", top_k=20)
+
+def test_index_order_follows_neighbors():
+    """Test the nearest-neighbour chain visits each sequence once, closest first."""
+    sequences = {
+        "a1": {"amino_acid": "MAGWKLTSPE"},
+        "b1": {"amino_acid": "GGHHIIKKLL"},
+        "a2": {"amino_acid": "MAGWKLTSPQ"},
+        "b2": {"amino_acid": "GGHHIIKKLM"},
+    }
+    order = index_order(KmerIndex.build(sequences, 3), sequences)
+    assert order == ["a1", "a2", "b1", "b2"]
+
+def test_sort_sequences_index_file():
+    """Test knn ordering saves an index and extends it on the next run."""
+    sequences = _random_sequences(12, seed=3)
+    items = list(sequences.items())
+    with tempfile.TemporaryDirectory() as tmpdir:
+        index_file = os.path.join(tmpdir, "index.npz")
+        sort_sequences_by_similarity(dict(items[:6]), k=2, guide_tree="knn", index_file=index_file)
+        assert len(KmerIndex.load(index_file)) == 6
+        sorted_seqs = sort_sequences_by_similarity(sequences, k=2, guide_tree="knn", index_file=index_file)
+        assert sorted(sorted_seqs) == sorted(sequences)
+        assert len(KmerIndex.load(index_file)) == 12
+
+def test_add_reindexes_changed_sequences():
+    """Test a changed protein replaces its old postings instead of being skipped."""
+    sequences = _random_sequences(20, seed=4)
+    index = KmerIndex.build(sequences, 3)
+    edited = dict(sequences)
+    edited["seq3"] = {"amino_acid": "ACDEACDEXX"}
+    edited["seq7"] = {"amino_acid": ""}
+    index.add(edited)
+    fresh = KmerIndex.build(edited, 3)
+    assert index.ids == fresh.ids
+    for query in ("ACDEACD", "DXEA", "EEEE"):
+        assert index.query(query, top_k=20) == fresh.query(query, top_k=20)
+
+def test_alphabet_is_part_of_the_index():
+    """Test queries use the index alphabet and knn rebuilds an index of another alphabet."""
+    sequences = {"seq1": {"amino_acid": "LLLLLL"}, "seq2": {"amino_acid": "IIIIII"},
+                 "seq3": {"amino_acid": "GGGGGG"}}
+    assert KmerIndex.build(sequences, 3).query("IIII", exclude=["seq2"]) == []
+    assert KmerIndex.build(sequences, 3, "murphy10").query("IIII", exclude=["seq2"]) == [("seq1", 1.0)]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        index_file = os.path.join(tmpdir, "index.npz")
+        sort_sequences_by_similarity(sequences, k=3, guide_tree="knn", index_file=index_file)
+        assert KmerIndex.load(index_file).alphabet == "full"
+        sort_sequences_by_similarity(sequences, k=3, guide_tree="knn", index_file=index_file,
+                                     alphabet="murphy10")
+        assert KmerIndex.load(index_file).alphabet == "murphy10"
+
+def test_sort_sequences_index_file_tracks_edits():
+    """Test a reused index file follows proteins edited between runs."""
+    sequences = _random_sequences(12, seed=5)
+    edited = dict(sequences)
+    edited["seq0"] = {"amino_acid": "ACDEXACDEX"}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        index_file = os.path.join(tmpdir, "index.npz")
+        sort_sequences_by_similarity(sequences, k=2, guide_tree="knn", index_file=index_file)
+        reused = sort_sequences_by_similarity(edited, k=2, guide_tree="knn", index_file=index_file)
+        loaded = KmerIndex.load(index_file)
+    assert list(reused) == index_order(KmerIndex.build(edited, 2), edited)
+    assert loaded.query("ACDEX", top_k=12) == KmerIndex.build(edited, 2).query("ACDEX", top_k=12)
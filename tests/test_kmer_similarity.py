@@ -3,9 +3,14 @@
 Unit tests for k-mer similarity module.
 """
 
+import os
+import tempfile
+import random
 import pytest
 from msaligner.kmer_similarity import (
-    generate_kmers, kmer_frequency, cosine_similarity, sort_sequences_by_similarity
+    generate_kmers, kmer_frequency, cosine_similarity, sort_sequences_by_similarity,
+    compute_kmer_similarity, kmer_count_matrix, sparse_cosine_similarity,
+    dense_kmer_counts, dense_cosine_similarity, paired_cosine_similarity
 )
 
 def test_generate_kmers():
@@ -27,6 +32,73 @@ def test_cosine_similarity():
     similarity = cosine_similarity(vec1, vec2)
     assert 0 <= similarity <= 1
 
+def test_kmer_count_matrix():
+    """Test sparse k-mer counts per sequence."""
+    sequences = {"seq1": {"amino_acid": "MAGMAG"}, "seq2": {"amino_acid": "MA"}}
+    counts = kmer_count_matrix(sequences, 3)
+    assert counts.shape == (2, 3)
+    assert sorted(counts[0].data) == [1, 1, 2]
+    assert counts[1].nnz == 0
+
+def test_sparse_cosine_matches_pairwise():
+    """Test the sparse similarity matrix equals pairwise cosine similarity."""
+    rng = random.Random(4)
+    sequences = {f"seq{i}": {"amino_acid": "".join(rng.choice("ACDX*") for _ in range(rng.randint(0, 15)))}
+                 for i in range(12)}
+    matrix, seq_ids = compute_kmer_similarity(sequences, k=2)
+    for i, seq1 in enumerate(seq_ids):
+        for j, seq2 in enumerate(seq_ids):
+            if i != j:
+                expected = cosine_similarity(kmer_frequency(sequences[seq1]["amino_acid"], 2),
+                                             kmer_frequency(sequences[seq2]["amino_acid"], 2))
+                assert matrix[i, j] == expected
+    assert (sparse_cosine_similarity(kmer_count_matrix(sequences, 2), block_rows=5) == matrix).all()
+
+def test_paired_cosine_matches_matrix():
+    """Test per-pair similarities equal the entries of the full matrix."""
+    import numpy as np
+    rng = random.Random(9)
+    sequences = {f"seq{i}": {"amino_acid": "".join(rng.choice("ACDEX*") for _ in range(rng.randint(0, 30)))}
+                 for i in range(10)}
+    matrix, seq_ids = compute_kmer_similarity(sequences, k=4)
+    index_pairs = [(i, j) for i in range(10) for j in range(10) if i != j]
+    residues = {seq_id: np.frombuffer(data["amino_acid"].encode(), dtype=np.uint8)
+                for seq_id, data in sequences.items()}
+    similarities = paired_cosine_similarity(
+        [(residues[seq_ids[i]], residues[seq_ids[j]]) for i, j in index_pairs], k=4
+    )
+    assert list(similarities) == [matrix[i, j] for i, j in index_pairs]
+    assert len(paired_cosine_similarity([], k=4)) == 0
+
+def test_reduced_alphabet_merges_groups():
+    """Test residues of one reduced-alphabet group count as the same k-mer."""
+    sequences = {"seq1": {"amino_acid": "ILMVIL"}, "seq2": {"amino_acid": "VVVVMM"},
+                 "seq3": {"amino_acid": "DENQDE"}}
+    matrix, _ = compute_kmer_similarity(sequences, k=2, alphabet="dayhoff6")
+    assert matrix[0, 1] == pytest.approx(1.0)
+    assert matrix[0, 2] == 0.0
+    full, _ = compute_kmer_similarity(sequences, k=2)
+    assert full[0, 1] < 1.0
+
+def test_dense_counts_match_sparse():
+    """Test dense counting gives the same similarities as sparse counting."""
+    rng = random.Random(6)
+    sequences = {f"seq{i}": {"amino_acid": "".join(rng.choice("ACDEFGHIKLMNPQRSTVWY*") for _ in range(30))}
+                 for i in range(10)}
+    for alphabet in ("murphy10", "dayhoff6"):
+        dense = dense_cosine_similarity(dense_kmer_counts(sequences, 3, alphabet))
+        sparse_matrix = sparse_cosine_similarity(kmer_count_matrix(sequences, 3, alphabet))
+        assert (dense == sparse_matrix).all()
+
+def test_long_kmers():
+    """Test k-mers too long for exact integer codes are still compared."""
+    sequences = {"seq1": {"amino_acid": "M" + "AG" * 20}, "seq2": {"amino_acid": "M" + "AG" * 20},
+                 "seq3": {"amino_acid": "M" + "GA" * 20 + "W"}}
+    matrix, _ = compute_kmer_similarity(sequences, k=23)
+    assert matrix[0, 1] == pytest.approx(1.0)
+    assert matrix[0, 2] == cosine_similarity(kmer_frequency(sequences["seq1"]["amino_acid"], 23),
+                                             kmer_frequency(sequences["seq3"]["amino_acid"], 23))
+
 def test_sort_sequences_by_similarity():
     """Test sequence sorting by similarity."""
     sequences = {
@@ -38,4 +110,102 @@ def test_sort_sequences_by_similarity():
     assert len(sorted_ids) == 3
     assert "seq1" in sorted_ids
     assert "seq2" in sorted_ids
-    assert "seq3" in sorted_ids
\ No newline at end of file
+    assert "seq3" in sorted_ids
+
+def test_compute_alignment_similarity():
+    """Test similarity from normalized alignment scores."""
+    sequences = {
+        "seq1": {"amino_acid": "MAGWKLTSPE"},
+        "seq2": {"amino_acid": "MAGWKLTSPE"},
+        "seq3": {"amino_acid": "MAGWRLTSE"},
+    }
+    matrix, seq_ids = compute_kmer_similarity(sequences, method="alignment")
+    assert seq_ids == ["seq1", "seq2", "seq3"]
+    assert matrix[0, 1] == pytest.approx(1.0)
+    assert 0 < matrix[0, 2] < 1
+    assert (matrix == matrix.T).all()
+
+def test_sort_sequences_tree_file_reuse():
+    """Test the guide tree is saved and reused across runs."""
+    sequences = {
+        "seq1": {"amino_acid": "MAAAAAG"},
+        "seq2": {"amino_acid": "MGGGGGA"},
+        "seq3": {"amino_acid": "MAAAAAA"},
+    }
+    with tempfile.TemporaryDirectory() as tmpdir:
+        tree_file = os.path.join(tmpdir, "guide_tree.nwk")
+        first = sort_sequences_by_similarity(sequences, k=3, tree_file=tree_file)
+        assert os.path.isfile(tree_file)
+        with open(tree_file, "w") as f:
+            f.write("((seq2,seq3),seq1);")
+        second = sort_sequences_by_similarity(sequences, k=3, tree_file=tree_file)
+    assert list(second) == ["seq2", "seq3", "seq1"]
+    assert sorted(first) == sorted(second)
+
+def test_similarity_matrix_file_reuse():
+    """Test the memory-mapped matrix matches the dense one and is reopened."""
+    sequences = {
+        "seq1": {"amino_acid": "MAGWKLTSPE"},
+        "seq2": {"amino_acid": "MAGWKLTSPQ"},
+        "seq3": {"amino_acid": "MGGGGGAAAA"},
+    }
+    dense, _ = compute_kmer_similarity(sequences, k=3)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        matrix_file = os.path.join(tmpdir, "similarity.f32")
+        mapped, seq_ids = compute_kmer_similarity(sequences, k=3, matrix_file=matrix_file)
+        assert seq_ids == list(sequences)
+        assert mapped.dtype == "float32"
+        assert mapped == pytest.approx(dense, abs=1e-6)
+        
+        # Same input and k: the file is reopened, not recomputed
+        modified = os.path.getmtime(matrix_file)
+        reopened, _ = compute_kmer_similarity(sequences, k=3, matrix_file=matrix_file)
+        assert os.path.getmtime(matrix_file) == modified
+        assert (reopened == mapped).all()
+        
+        # A different k recomputes the matrix
+        other, _ = compute_kmer_similarity(sequences, k=2, matrix_file=matrix_file)
+        assert other == pytest.approx(compute_kmer_similarity(sequences, k=2)[0], abs=1e-6)
+
+def test_guide_tree_reads_similarity_memmap(tmp_path, monkeypatch):
+    """Test the tree builder gets the memmap and works on a memory-mapped copy."""
+    import numpy as np
+    from msaligner import guide_tree
+    received = []
+    
+    def recording_upgma(similarity_matrix, labels):
+        distances = guide_tree._distance_matrix(similarity_matrix)
+        received.append((similarity_matrix, distances))
+        return upgma(similarity_matrix, labels)
+    
+    upgma = guide_tree.upgma
+    monkeypatch.setitem(guide_tree.TREE_METHODS, "upgma", recording_upgma)
+    rng = random.Random(3)
+    sequences = {f"seq{i}": {"amino_acid": "".join(rng.choice("ACDEFG") for _ in range(30))}
+                 for i in range(8)}
+    matrix_file = str(tmp_path / "similarity.f32")
+    ordered = sort_sequences_by_similarity(sequences, k=3, matrix_file=matrix_file)
+    
+    assert sorted(ordered) == sorted(sequences)
+    (similarity_matrix, distances), = received
+    assert isinstance(similarity_matrix, np.memmap)
+    assert isinstance(distances, np.memmap)
+
+def test_sparse_cosine_tiles_bound_memory(tmp_path):
+    """Test the similarity matrix is written tile by tile into a memmap."""
+    import tracemalloc
+    import numpy as np
+    from scipy import sparse
+    n_rows, block_rows = 3000, 128
+    counts = sparse.random(n_rows, 400, density=0.02, random_state=0, format="csr")
+    counts.data = np.ceil(counts.data * 4)
+    out = np.memmap(str(tmp_path / "similarity.f32"), dtype=np.float32, mode="w+",
+                    shape=(n_rows, n_rows))
+    tracemalloc.start()
+    sparse_cosine_similarity(counts, block_rows, out=out)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    # One block_rows x N float64 strip is what an untiled row block needs
+    assert peak < block_rows * n_rows * 8
+    reference = sparse_cosine_similarity(counts[:200], block_rows)
+    assert out[:200, :200] == pytest.approx(reference, abs=1e-6)
@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+"""
+Unit tests for ORF cache module.
+"""
+
+import pytest
+from msaligner.orf_cache import OrfCache, cache_key
+
+def test_cache_key_depends_on_parameters_and_sequence():
+    """Test keys change with either the parameters or the sequence."""
+    key = cache_key(b"min_length=30", b"ATGTAA")
+    assert len(key) == 16
+    assert key == cache_key(b"min_length=30", b"ATGTAA")
+    assert key != cache_key(b"min_length=60", b"ATGTAA")
+    assert key != cache_key(b"min_length=30", b"ATGTAG")
+
+def test_cache_round_trip(tmp_path):
+    """Test stored rows are found in bulk and persist across connections."""
+    path = str(tmp_path / "orfs.db")
+    cache = OrfCache(path)
+    rows = {cache_key(b"p", str(i).encode()): (i % 2 == 0, i, i + 30, 1, b"M" * i, 0) for i in range(1200)}
+    cache.put_many(rows.items())
+    cache.close()
+    
+    cache = OrfCache(path)
+    assert len(cache) == 1200
+    assert cache.get_many(list(rows) + [b"missing"]) == rows
+    cache.close()
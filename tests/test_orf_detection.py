@@ -4,6 +4,7 @@ Unit tests for ORF detection module.
 """
 
 import pytest
+import numpy as np
 import tempfile
 import os
 from Bio.Seq import Seq
@@ -11,7 +12,8 @@ from Bio.SeqRecord import SeqRecord
 from Bio import SeqIO
 
 from msaligner.orf_detection import (
-    detect_orf, translate_sequence, read_fasta, 
+    detect_orf, detect_orf_reference, detect_orf_six_frame, translate_sequence, read_fasta, 
+    translate_orf, resolve_ambiguous_codon,
     has_ambiguous_bases, process_sequences
 )
 
@@ -30,6 +32,44 @@ def test_detect_orf_no_start():
     orf_coords = detect_orf(sequence)
     assert orf_coords is None
 
+def test_detect_orf_matches_reference():
+    """Test vectorized ORF detection reproduces the forward scan exactly."""
+    import random
+    rng = random.Random(0)
+    for _ in range(300):
+        sequence = ''.join(rng.choice("ACGTNacgt") for _ in range(rng.randint(0, 150)))
+        for min_length in (0, 9, 30):
+            assert detect_orf(sequence, min_length) == detect_orf_reference(sequence, min_length)
+
+def test_detect_orf_tie_prefers_first_frame():
+    """Test equally long ORFs resolve to the earliest frame and start."""
+    orf = "ATG" + "GCC" * 9 + "TAA"
+    sequence = orf + "C" + orf
+    assert detect_orf(sequence) == (0, len(orf))
+
+def test_detect_orf_six_frame_minus_strand():
+    """Test a reverse-strand ORF is found, mapped to plus coordinates and translated."""
+    orf = "ATG" + "GCC" * 10 + "TAA"
+    minus = orf.translate(str.maketrans("ACGT", "TGCA"))[::-1]
+    sequence = "CC" + minus + "G"
+    assert detect_orf(sequence) is None
+    start, end, strand = detect_orf_six_frame(sequence)
+    assert (start, end, strand) == (2, 2 + len(orf), -1)
+    assert translate_sequence(sequence, (start, end), strand) == "M" + "A" * 10 + "*"
+
+def test_detect_orf_six_frame_prefers_forward_on_tie():
+    """Test forward results match detect_orf unless the minus strand is longer."""
+    import random
+    rng = random.Random(1)
+    for _ in range(200):
+        sequence = ''.join(rng.choice("ACGT") for _ in range(rng.randint(0, 200)))
+        six_frame = detect_orf_six_frame(sequence)
+        forward = detect_orf(sequence)
+        if six_frame is not None and six_frame[2] == 1:
+            assert six_frame[:2] == forward
+        elif forward is not None:
+            assert six_frame[1] - six_frame[0] > forward[1] - forward[0]
+
 def test_translate_sequence():
     """Test sequence translation."""
     sequence = "ATGGCTTGA"  # M A *
@@ -37,11 +77,27 @@ def test_translate_sequence():
     aa_seq = translate_sequence(sequence, orf_coords)
     assert aa_seq == "MA*"
 
+def test_translate_orf_resolves_ambiguous_codons():
+    """Test ambiguous codons resolve when all expansions agree and are counted."""
+    assert translate_orf("ATGGCNNNNTARCT") == ("MAX*", 3)
+    assert resolve_ambiguous_codon("YTR") == "L"
+    assert resolve_ambiguous_codon("ATN") == "X"
+    assert translate_sequence("atgGCT", (0, 6)) == "XA"
+
 def test_has_ambiguous_bases():
     """Test ambiguous base detection."""
     assert has_ambiguous_bases("ATCG") == False
     assert has_ambiguous_bases("ATCN") == True
     assert has_ambiguous_bases("ATCR") == True
+    assert has_ambiguous_bases(b"ATC\xffG") == False
+    assert has_ambiguous_bases(np.frombuffer(b"ATCY", dtype=np.uint8)) == True
+
+def test_process_sequences_replaces_non_ascii_bytes(tmp_path):
+    """Test non-ASCII bytes are stored as '?', one per byte."""
+    fasta = tmp_path / "input.fasta"
+    fasta.write_bytes(b">a\nATG" + b"GCC" * 15 + b"TAA\xc3\xa9\n")
+    store = process_sequences(str(fasta))
+    assert store["a"]["nucleotide"] == "ATG" + "GCC" * 15 + "TAA??"
 
 def test_read_fasta():
     """Test FASTA file reading."""
@@ -55,4 +111,170 @@ def test_read_fasta():
         assert "seq1" in sequences
         assert sequences["seq1"] == "ATCG"
     finally:
-        os.unlink(temp_file)
\ No newline at end of file
+        os.unlink(temp_file)
+def test_process_sequences_keeps_last_duplicate():
+    """Test a repeated ID keeps its first position and its last sequence."""
+    orf = "ATG" + "GCC" * 10 + "TAA"
+    with tempfile.NamedTemporaryFile(mode='w', suffix='.fasta', delete=False) as f:
+        f.write(f">a\n{orf}\n>b\n{orf}\n>a\nCC{orf}\n")
+        temp_file = f.name
+    
+    try:
+        store = process_sequences(temp_file)
+        assert list(store) == ["a", "b"]
+        assert store["a"]["orf_start"] == 2
+    finally:
+        os.unlink(temp_file)
+
+def test_process_sequences_parallel_matches_serial():
+    """Test chunked processing over a pool returns the same store in input order."""
+    import random
+    rng = random.Random(2)
+    with tempfile.NamedTemporaryFile(mode='w', suffix='.fasta', delete=False) as f:
+        for i in range(40):
+            body = ''.join(rng.choice("ACGT") for _ in range(rng.randint(20, 120)))
+            f.write(f">s{i % 30}\nATG{body}TAA\n")
+        temp_file = f.name
+    
+    try:
+        serial = process_sequences(temp_file)
+        parallel = process_sequences(temp_file, threads=2, chunk_size=3)
+        assert list(parallel) == list(serial)
+        for seq_id in serial:
+            assert dict(parallel[seq_id]) == dict(serial[seq_id])
+    finally:
+        os.unlink(temp_file)
+
+def test_process_sequences_faidx_reads_nucleotides_lazily():
+    """Test the faidx-backed store holds no nucleotides but gives the same records."""
+    orf = "ATG" + "GCC" * 30 + "TAA"
+    with tempfile.NamedTemporaryFile(mode='w', suffix='.fasta', delete=False) as f:
+        for i in range(3):
+            sequence = "C" * i + orf
+            f.write(f">s{i}\n" + "\n".join(sequence[j:j + 40] for j in range(0, len(sequence), 40)) + "\n")
+        temp_file = f.name
+    
+    try:
+        in_memory = process_sequences(temp_file)
+        lazy = process_sequences(temp_file, use_faidx=True)
+        assert os.path.exists(temp_file + ".fai")
+        assert lazy.nbytes < in_memory.nbytes
+        for seq_id in in_memory:
+            assert dict(lazy[seq_id]) == dict(in_memory[seq_id])
+            assert lazy.orf_view(seq_id).tobytes() == orf.encode()
+    finally:
+        os.unlink(temp_file)
+        if os.path.exists(temp_file + ".fai"):
+            os.unlink(temp_file + ".fai")
+
+def test_process_sequences_cache_reuses_results(tmp_path):
+    """Test a cached run returns the same store and keys include min_length."""
+    from msaligner.orf_cache import OrfCache
+    orf = "ATG" + "GCC" * 15 + "TAA"
+    fasta = tmp_path / "input.fasta"
+    fasta.write_text(f">a\n{orf}\n>b\nCC{orf}\n>c\nGGGG\n")
+    cache_file = str(tmp_path / "orfs.db")
+    
+    fresh = process_sequences(str(fasta), cache_file=cache_file)
+    cached = process_sequences(str(fasta), cache_file=cache_file)
+    assert list(cached) == list(fresh) == ["a", "b"]
+    for seq_id in fresh:
+        assert dict(cached[seq_id]) == dict(fresh[seq_id])
+    
+    assert len(process_sequences(str(fasta), cache_file=cache_file, min_length=60)) == 0
+    cache = OrfCache(cache_file)
+    assert len(cache) == 6
+    cache.close()
+
+def test_process_sequences_closes_empty_cache(tmp_path, monkeypatch, caplog):
+    """Test a cache is closed and reported even when it is still empty."""
+    import logging
+    from msaligner import orf_detection
+    closed = []
+    
+    class RecordingCache(orf_detection.OrfCache):
+        __slots__ = ()
+        
+        def __len__(self):
+            raise AssertionError("cache size must not be queried")
+        
+        def close(self):
+            closed.append(self.path)
+            super().close()
+    
+    monkeypatch.setattr(orf_detection, "OrfCache", RecordingCache)
+    fasta = tmp_path / "input.fasta"
+    fasta.write_text(">c\nGGGG\n")
+    cache_file = str(tmp_path / "orfs.db")
+    with caplog.at_level(logging.INFO):
+        assert len(process_sequences(str(fasta), cache_file=cache_file)) == 0
+    assert closed == [cache_file]
+    assert "Reused 0 cached ORFs" in caplog.text
+
+def test_process_sequences_closes_cache_on_error(tmp_path, monkeypatch):
+    """Test a failing run closes the cache and keeps the chunks stored before it."""
+    from msaligner import orf_detection
+    from msaligner.orf_cache import OrfCache
+    orf = "ATG" + "GCC" * 15 + "TAA"
+    fasta = tmp_path / "input.fasta"
+    fasta.write_text(f">a\n{orf}\n>b\nCC{orf}\n")
+    cache_file = str(tmp_path / "orfs.db")
+    process_chunk = orf_detection._process_chunk
+    calls = []
+    
+    def failing_chunk(*args):
+        calls.append(1)
+        if len(calls) > 1:
+            raise RuntimeError("worker failed")
+        return process_chunk(*args)
+    
+    closed = []
+    
+    class RecordingCache(OrfCache):
+        __slots__ = ()
+        
+        def close(self):
+            closed.append(self.path)
+            super().close()
+    
+    monkeypatch.setattr(orf_detection, "_process_chunk", failing_chunk)
+    monkeypatch.setattr(orf_detection, "OrfCache", RecordingCache)
+    with pytest.raises(RuntimeError):
+        process_sequences(str(fasta), cache_file=cache_file, chunk_size=1)
+    assert closed == [cache_file]
+    cache = OrfCache(cache_file)
+    assert len(cache) == 1
+    cache.close()
+
+def test_process_sequences_faidx_store_closes_file(tmp_path, monkeypatch):
+    """Test the indexed FASTA is released by closing the store or by a failed run."""
+    from msaligner import orf_detection
+    orf = "ATG" + "GCC" * 15 + "TAA"
+    fasta = tmp_path / "input.fasta"
+    fasta.write_text(f">a\n{orf}\n>b\nCC{orf}\n")
+    
+    with process_sequences(str(fasta), use_faidx=True) as store:
+        assert store.orf_view("b").tobytes() == orf.encode()
+        indexed = store._fasta
+        assert indexed._data is not None
+    assert indexed._data is None
+    
+    opened = []
+    
+    class RecordingFasta(orf_detection.IndexedFasta):
+        __slots__ = ()
+        
+        def __init__(self, *args):
+            super().__init__(*args)
+            self.fetch("a", 0, 3)
+            opened.append(self)
+    
+    def failing_records(*args):
+        raise RuntimeError("read failed")
+        yield
+    
+    monkeypatch.setattr(orf_detection, "IndexedFasta", RecordingFasta)
+    monkeypatch.setattr(orf_detection, "_processed_records", failing_records)
+    with pytest.raises(RuntimeError):
+        process_sequences(str(fasta), use_faidx=True)
+    assert opened and opened[0]._data is None
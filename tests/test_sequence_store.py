@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Unit tests for sequence store module.
+"""
+
+import pytest
+import numpy as np
+from msaligner.sequence_store import (
+    SequenceStore, select_sequences, amino_acid_bytes, orf_bytes
+)
+
+SEQUENCES = {
+    "seq1": {
+        "nucleotide": "CCATGGCTGGTTAA",
+        "amino_acid": "MAG*",
+        "orf_start": 2,
+        "orf_end": 14,
+        "has_ambiguous": False,
+        "strand": 1
+    },
+    "seq2": {
+        "nucleotide": "ATGGGNTAA",
+        "amino_acid": "MX*",
+        "orf_start": 0,
+        "orf_end": 9,
+        "has_ambiguous": True,
+        "strand": 1
+    },
+}
+
+def test_store_behaves_like_dict():
+    """Test records expose the same fields as the processed dictionaries."""
+    store = SequenceStore.from_dict(SEQUENCES)
+    assert list(store) == ["seq1", "seq2"]
+    assert "seq2" in store and "seq3" not in store
+    for seq_id, seq_data in SEQUENCES.items():
+        assert dict(store[seq_id]) == seq_data
+
+def test_store_views_are_zero_copy():
+    """Test views share the packed buffers."""
+    store = SequenceStore.from_dict(SEQUENCES)
+    orf = store.orf_view("seq1")
+    assert orf.tobytes() == b"ATGGCTGGTTAA"
+    assert np.shares_memory(orf, store.nucleotide_view("seq1"))
+    assert store.amino_acid_view("seq2").tobytes() == b"MX*"
+
+def test_select_sequences_subset():
+    """Test reordering a store keeps it a store over the same buffers."""
+    store = SequenceStore.from_dict(SEQUENCES)
+    reordered = select_sequences(store, ["seq2", "seq1"])
+    assert isinstance(reordered, SequenceStore)
+    assert list(reordered) == ["seq2", "seq1"]
+    assert np.shares_memory(reordered.amino_acid_view("seq1"), store.amino_acid_view("seq1"))
+    assert list(select_sequences(SEQUENCES, ["seq2"])) == ["seq2"]
+
+def test_byte_accessors_accept_dicts():
+    """Test byte accessors give the same bytes for stores and dictionaries."""
+    store = SequenceStore.from_dict(SEQUENCES)
+    for seq_id in SEQUENCES:
+        assert amino_acid_bytes(store, seq_id).tobytes() == amino_acid_bytes(SEQUENCES, seq_id).tobytes()
+        assert orf_bytes(store, seq_id).tobytes() == orf_bytes(SEQUENCES, seq_id).tobytes()
+
+
+def test_minus_strand_orf_is_reverse_complemented():
+    """Test minus-strand ORFs read in coding orientation from either source."""
+    sequences = {"rev": {"nucleotide": "GGTTAGCCCATCC", "amino_acid": "MG*",
+                         "orf_start": 2, "orf_end": 11, "has_ambiguous": False,
+                         "strand": -1}}
+    store = SequenceStore.from_dict(sequences)
+    assert store["rev"]["strand"] == -1
+    assert orf_bytes(store, "rev").tobytes() == b"ATGGGCTAA"
+    assert orf_bytes(sequences, "rev").tobytes() == b"ATGGGCTAA"
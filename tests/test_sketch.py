@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Unit tests for sketch module.
+"""
+
+import random
+import numpy as np
+from scipy import sparse
+from msaligner.kmer_similarity import encode_kmers, compute_sketch_graph, sort_sequences_by_similarity
+from msaligner.sketch import minhash_sketches, lsh_candidate_pairs, knn_order, EMPTY_HASH
+
+def _families(n_families, members, length=120, mutations=4, seed=0):
+    """Build dictionaries of mutated copies of random protein sequences."""
+    rng = random.Random(seed)
+    alphabet = "ACDEFGHIKLMNPQRSTVWY"
+    sequences = {}
+    roots = ["".join(rng.choice(alphabet) for _ in range(length)) for _ in range(n_families)]
+    for index in range(n_families * members):
+        seq = list(roots[index % n_families])
+        for _ in range(mutations):
+            seq[rng.randrange(length)] = rng.choice(alphabet)
+        sequences[f"f{index % n_families}_{index}"] = {"amino_acid": "".join(seq)}
+    return sequences
+
+def test_minhash_estimates_jaccard():
+    """Test identical k-mer sets give identical sketches and empty rows stay empty."""
+    residues = [np.frombuffer(seq, dtype=np.uint8) for seq in (b"MAGWKLTSPE", b"MAGWKLTSPE", b"MA")]
+    rows, codes = encode_kmers(residues, 3)
+    sketches = minhash_sketches(rows, codes, 3)
+    assert (sketches[0] == sketches[1]).all()
+    assert (sketches[2] == EMPTY_HASH).all()
+
+def test_lsh_candidates_within_families():
+    """Test LSH pairs near-identical sequences but not unrelated ones."""
+    sequences = _families(3, 4)
+    residues = [np.frombuffer(data["amino_acid"].encode(), dtype=np.uint8)
+                for data in sequences.values()]
+    rows, codes = encode_kmers(residues, 5)
+    pairs = lsh_candidate_pairs(minhash_sketches(rows, codes, len(residues)))
+    assert len(pairs) > 0
+    assert all(i % 3 == j % 3 for i, j in pairs)
+
+def test_knn_graph_symmetric():
+    """Test the kNN graph is symmetric and bounded in size."""
+    graph, seq_ids = compute_sketch_graph(_families(4, 6), k=5, n_neighbors=3)
+    assert graph.shape == (24, 24)
+    assert (graph != graph.T).nnz == 0
+    assert graph.nnz <= 2 * 3 * 24
+
+def test_sketch_ordering_keeps_families_together():
+    """Test ordering along the kNN graph keeps each family contiguous."""
+    sequences = _families(4, 6)
+    sorted_ids = list(sort_sequences_by_similarity(sequences, k=5, method="sketch"))
+    assert sorted(sorted_ids) == sorted(sequences)
+    families = [seq_id.split("_")[0] for seq_id in sorted_ids]
+    assert sum(a != b for a, b in zip(families, families[1:])) == 3
+
+def test_knn_order_disconnected():
+    """Test every sequence is ordered when the graph has no edges."""
+    assert knn_order(sparse.csr_matrix((3, 3)), ["a", "b", "c"]) == ["a", "b", "c"]
+
+def test_lsh_candidate_pairs_dedups_per_band():
+    """Test identical sketches do not hold every band's pairs at once."""
+    import tracemalloc
+    n_rows = 4000
+    sketches = np.zeros((n_rows, 64), dtype=np.uint64)
+    tracemalloc.start()
+    pairs = lsh_candidate_pairs(sketches, band_rows=4, max_bucket=32)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    distinct = sum(n_rows - distance for distance in range(1, 32))
+    assert len(pairs) == distinct
+    # All 16 bands find the same pairs; holding them all takes 16x the output
+    assert peak < 16 * distinct * 8
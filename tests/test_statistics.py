@@ -5,7 +5,10 @@ Unit tests for statistics module.
 
 import pytest
 import pandas as pd
-from msaligner.statistics import calculate_codon_statistics, calculate_overall_statistics
+from msaligner.statistics import (
+    calculate_codon_statistics, calculate_codon_statistics_reference, calculate_overall_statistics
+)
+from msaligner.alignment_matrix import AlignmentMatrix
 
 def test_calculate_codon_statistics():
     """Test codon statistics calculation."""
@@ -19,6 +22,21 @@ def test_calculate_codon_statistics():
     assert "variability_score" in stats_df.columns
     assert "gap_fraction" in stats_df.columns
 
+def test_calculate_codon_statistics_matches_reference():
+    """Test the vectorized statistics equal the per-codon loop, including short rows."""
+    import random
+    rng = random.Random(0)
+    for _ in range(100):
+        length = rng.randint(0, 15)
+        nt_alignment = {
+            f"seq{i}": ''.join(rng.choice("ACGT-N") for _ in range(rng.choice([length, rng.randint(0, 18)])))
+            for i in range(rng.randint(1, 5))
+        }
+        expected = calculate_codon_statistics_reference(nt_alignment)
+        for alignment in (nt_alignment, AlignmentMatrix.from_dict(nt_alignment)):
+            pd.testing.assert_frame_equal(calculate_codon_statistics(alignment), expected,
+                                          check_exact=True)
+
 def test_calculate_overall_statistics():
     """Test overall statistics calculation."""
     stats_df = pd.DataFrame({